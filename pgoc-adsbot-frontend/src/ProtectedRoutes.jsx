@@ -2,6 +2,7 @@ import React from "react";
 import { Navigate, Outlet } from "react-router-dom";
 import Cookies from "js-cookie";
 import CryptoJS from "crypto-js";
+import { useSessionKeepAlive } from "./services/session_keepalive";
 
 const SECRET_KEY = import.meta.env.VITE_COOKIE_SECRET;
 
@@ -18,6 +19,7 @@ const decryptData = (cipherText) => {
 
 const ProtectedRoute = () => {
   const isAuthenticated = decryptData(Cookies.get("isxd")) === "true"; 
+  useSessionKeepAlive();
 
   return isAuthenticated ? <Outlet /> : <Navigate to="/" replace />;
 };
@@ -8,6 +8,9 @@ import Typography from "@mui/material/Typography";
 import Divider from "@mui/material/Divider";
 import { Avatar, Box, Chip } from "@mui/material";
 import Logo from "../../assets/icon.png"; // Your logo path
+import { getUserData } from "../../services/user_data";
+
+const apiUrl = import.meta.env.VITE_API_URL;
 
 const Sidebar = ({
   open: propOpen,
@@ -27,8 +30,8 @@ const Sidebar = ({
   const [hoverTimeout, setHoverTimeout] = useState(null);
 
   const userName = userData?.username || "Guest";
-  const profilePicture = userData?.profile_image
-    ? `data:image/jpeg;base64,${userData.profile_image}`
+  const profilePicture = userData?.profile_image_url
+    ? `${apiUrl}${userData.profile_image_url}`
     : null;
 
   const handleMouseEnter = () => {
@@ -195,6 +198,17 @@ const Sidebar = ({
                     localStorage.removeItem("selectedSegment");
                     localStorage.removeItem("authToken");
 
+                    // End the server-side session before dropping its cookie
+                    const { redisKey } = getUserData();
+                    if (redisKey) {
+                      fetch(`${apiUrl}/api/v1/auth/logout`, {
+                        method: "POST",
+                        headers: { "Content-Type": "application/json", "skip_zrok_interstitial": "true" },
+                        body: JSON.stringify({ redis_key: redisKey }),
+                        keepalive: true,
+                      }).catch((error) => console.error("Logout error:", error));
+                    }
+
                     // List of cookies to remove
                     const cookiesToRemove = ["xsid", "xsid_g", "usr", "rsid", "isxd"];
 
@@ -28,7 +28,7 @@ import CloudExportIcon from "@mui/icons-material/BackupRounded";
 import RunIcon from "@mui/icons-material/PlayCircle";
 import DeleteIcon from "@mui/icons-material/Delete";
 import DownloadIcon from "@mui/icons-material/FileDownload";
-import { EventSource } from "extended-eventsource";
+import { subscribeMessages } from "../../services/message_socket";
 import Cookies from "js-cookie";
 import CampaignCreationTerminal from "../widgets/campaign_creation_widgets/campaign_terminal.jsx";
 
@@ -69,7 +69,6 @@ const CampaignCreationPage = () => {
   const [isVerified, setIsVerified] = useState(false);
   const fileInputRef = useRef(null);
   const isRunningRef = useRef(false);
-  const eventSourceRef = useRef(null);
   const [openDialog, setOpenDialog] =useState(false);
   const handleOpenDialog = () => setOpenDialog(true);
   const handleCloseDialog = () => setOpenDialog(false);
@@ -165,46 +164,18 @@ const CampaignCreationPage = () => {
 
   useEffect(() => {
     const { id: user_id } = getUserData();
-    const eventSourceUrl = `${apiUrl}/api/v1/messageevents-campaign-creations?keys=${user_id}-key`;
 
-    if (eventSourceRef.current) {
-      eventSourceRef.current.close(); // Close any existing SSE connection
-    }
-
-    const eventSource = new EventSource(eventSourceUrl, {
-      headers: {
-        "ngrok-skip-browser-warning": "true",
-        skip_zrok_interstitial: "true",
-      },
-      retry: 1500, // Auto-retry every 1.5s on failure
-    });
+    // The shared message socket resumes after the last message received when it reconnects
+    const unsubscribe = subscribeMessages("campaign_creations", `${user_id}-key`, (messages) => {
+      if (messages?.length) {
+        const messageText = messages[messages.length - 1]; // ✅ Extract latest message
 
-    eventSource.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        if (data && data.data && data.data.message) {
-          const messageText = data.data.message[0]; // ✅ Extract first message
-
-          // ✅ Always add the message to the message list
-          addMessage(data.data.message);
-        }
-      } catch (error) {
-        console.error("Error parsing SSE message:", error);
+        // ✅ Always add the message to the message list
+        addMessage(messages);
       }
-    };
-
-    eventSource.onerror = (error) => {
-      console.error("SSE connection error:", error);
-      eventSource.close();
-    };
-
-    eventSourceRef.current = eventSource;
+    });
 
-    return () => {
-      if (eventSourceRef.current) {
-        eventSourceRef.current.close();
-      }
-    };
+    return unsubscribe;
   }, []);
 
   const addMessage = (newMessages) => {
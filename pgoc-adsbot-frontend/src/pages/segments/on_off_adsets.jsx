@@ -15,7 +15,7 @@ import RunIcon from "@mui/icons-material/PlayCircle";
 import DeleteIcon from "@mui/icons-material/Delete";
 import DownloadIcon from "@mui/icons-material/FileDownload";
 import AdsetTerminal from "../widgets/on_off_adsets/on_off_adsets_terminal.jsx";
-import { EventSource } from "extended-eventsource";
+import { subscribeMessages } from "../../services/message_socket";
 import Cookies from "js-cookie";
 
 const REQUIRED_HEADERS = [
@@ -63,7 +63,6 @@ const OnOffAdsets = () => {
   const [selectedAdsetsData, setSelectedAdsetsData] = useState([]); // Store selected data
   const [messages, setMessages] = useState([]); // Ensure it's an array
   const fileInputRef = useRef(null);
-  const eventSourceRef = useRef(null);
 
   // Persist data in cookies whenever state changes
   useEffect(() => {
@@ -373,122 +372,94 @@ const OnOffAdsets = () => {
 
   useEffect(() => {
     const { id } = getUserData();
-    const eventSourceUrl = `${apiUrl}/api/v1/messageevents-adsets?keys=${id}-key`;
 
-    if (eventSourceRef.current) {
-      eventSourceRef.current.close(); // Close any existing SSE connection
-    }
-
-    const eventSource = new EventSource(eventSourceUrl, {
-      headers: {
-        "ngrok-skip-browser-warning": "true",
-        // skip_zrok_interstitial: "true",
-      },
-      retry: 1500, // Auto-retry every 1.5s on failure
-    });
-
-    eventSource.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        if (data && data.data && data.data.message) {
-          const messageText = data.data.message[0]; // ✅ Extract first message
-
-          // ✅ Always add the message to the message list
-          addAdsetsMessage(data.data.message);
-
-          // ✅ Check if it's a "Last Message"
-          const lastMessageMatch = messageText.match(/\[(.*?)\] (.*)/);
-
-          if (lastMessageMatch) {
-            const timestamp = lastMessageMatch[1]; // e.g., "2025-03-13 11:34:03"
-            const messageContent = lastMessageMatch[2]; // e.g., "Campaign updates completed for 1152674286244491 (OFF)"
-
-            setTableAdsetsData((prevData) =>
-              prevData.map((entry) =>
-                entry.key === `${id}-key`
-                  ? {
-                      ...entry,
-                      lastMessage: `${timestamp} - ${messageContent}`,
-                    }
-                  : entry
-              )
-            );
-          }
-
-          // ✅ Handle "Fetching Campaign Data for {ad_account_id} ({operation})"
-          const fetchingMatch = messageText.match(
-            /\[(.*?)\] Fetching Campaign Data for (\S+) \((ON|OFF)\), schedule (.+)/
+    // The shared message socket resumes after the last message received when it reconnects
+    const unsubscribe = subscribeMessages("adsets", `${id}-key`, (messages) => {
+      if (messages?.length) {
+        const messageText = messages[messages.length - 1]; // ✅ Extract latest message
+
+        // ✅ Always add the message to the message list
+        addAdsetsMessage(messages);
+
+        // ✅ Check if it's a "Last Message"
+        const lastMessageMatch = messageText.match(/\[(.*?)\] (.*)/);
+
+        if (lastMessageMatch) {
+          const timestamp = lastMessageMatch[1]; // e.g., "2025-03-13 11:34:03"
+          const messageContent = lastMessageMatch[2]; // e.g., "Campaign updates completed for 1152674286244491 (OFF)"
+
+          setTableAdsetsData((prevData) =>
+            prevData.map((entry) =>
+              entry.key === `${id}-key`
+                ? {
+                    ...entry,
+                    lastMessage: `${timestamp} - ${messageContent}`,
+                  }
+                : entry
+            )
           );
+        }
 
-          if (fetchingMatch) {
-            const adAccountId = fetchingMatch[2];
-            const onOffStatus = fetchingMatch[3];
-
-            setTableAdsetsData((prevData) =>
-              prevData.map((entry) =>
-                entry.ad_account_id === adAccountId &&
-                entry.on_off === onOffStatus
-                  ? { ...entry, status: "Fetching ⏳" }
-                  : entry
-              )
-            );
-          }
-
-          // ✅ Handle "Campaign updates completed"
-          const successMatch = messageText.match(
-            /\[(.*?)\] Campaign updates completed for (\S+) \((ON|OFF)\)/
+        // ✅ Handle "Fetching Campaign Data for {ad_account_id} ({operation})"
+        const fetchingMatch = messageText.match(
+          /\[(.*?)\] Fetching Campaign Data for (\S+) \((ON|OFF)\), schedule (.+)/
+        );
+
+        if (fetchingMatch) {
+          const adAccountId = fetchingMatch[2];
+          const onOffStatus = fetchingMatch[3];
+
+          setTableAdsetsData((prevData) =>
+            prevData.map((entry) =>
+              entry.ad_account_id === adAccountId &&
+              entry.on_off === onOffStatus
+                ? { ...entry, status: "Fetching ⏳" }
+                : entry
+            )
           );
+        }
 
-          if (successMatch) {
-            const adAccountId = successMatch[2];
-            const onOffStatus = successMatch[3];
-
-            setTableAdsetsData((prevData) =>
-              prevData.map((entry) =>
-                entry.ad_account_id === adAccountId &&
-                entry.on_off === onOffStatus
-                  ? { ...entry, status: `Success ✅` }
-                  : entry
-              )
-            );
-          }
-
-          // ❌ Handle 401 Unauthorized error
-          const unauthorizedMatch = messageText.match(
-            /Error during campaign fetch for Ad Account (\S+) \((ON|OFF)\): 401 Client Error/
+        // ✅ Handle "Campaign updates completed"
+        const successMatch = messageText.match(
+          /\[(.*?)\] Campaign updates completed for (\S+) \((ON|OFF)\)/
+        );
+
+        if (successMatch) {
+          const adAccountId = successMatch[2];
+          const onOffStatus = successMatch[3];
+
+          setTableAdsetsData((prevData) =>
+            prevData.map((entry) =>
+              entry.ad_account_id === adAccountId &&
+              entry.on_off === onOffStatus
+                ? { ...entry, status: `Success ✅` }
+                : entry
+            )
           );
+        }
 
-          if (unauthorizedMatch) {
-            const adAccountId = unauthorizedMatch[1];
-            const onOffStatus = unauthorizedMatch[2];
-
-            setTableAdsetsData((prevData) =>
-              prevData.map((entry) =>
-                entry.ad_account_id === adAccountId &&
-                entry.on_off === onOffStatus
-                  ? { ...entry, status: "Failed ❌" }
-                  : entry
-              )
-            );
-          }
+        // ❌ Handle 401 Unauthorized error
+        const unauthorizedMatch = messageText.match(
+          /Error during campaign fetch for Ad Account (\S+) \((ON|OFF)\): 401 Client Error/
+        );
+
+        if (unauthorizedMatch) {
+          const adAccountId = unauthorizedMatch[1];
+          const onOffStatus = unauthorizedMatch[2];
+
+          setTableAdsetsData((prevData) =>
+            prevData.map((entry) =>
+              entry.ad_account_id === adAccountId &&
+              entry.on_off === onOffStatus
+                ? { ...entry, status: "Failed ❌" }
+                : entry
+            )
+          );
         }
-      } catch (error) {
-        console.error("Error parsing SSE message:", error);
       }
-    };
-
-    eventSource.onerror = (error) => {
-      console.error("SSE connection error:", error);
-      eventSource.close();
-    };
-
-    eventSourceRef.current = eventSource;
+    });
 
-    return () => {
-      if (eventSourceRef.current) {
-        eventSourceRef.current.close();
-      }
-    };
+    return unsubscribe;
   }, []);
 
   const handleClearAll = () => {
@@ -15,7 +15,7 @@ import RunIcon from "@mui/icons-material/PlayCircle";
 import DeleteIcon from "@mui/icons-material/Delete";
 import DownloadIcon from "@mui/icons-material/FileDownload";
 import CampaignNameTerminal from "../widgets/on_off_campaignname/terminal_on_off.jsx";
-import { EventSource } from "extended-eventsource";
+import { subscribeMessages } from "../../services/message_socket";
 import Cookies from "js-cookie";
 
 const REQUIRED_HEADERS = [
@@ -55,7 +55,6 @@ const CreateOnOFFPage = () => {
   const [selectedData, setSelectedData] = useState([]); // Store selected data
   const [messages, setMessages] = useState([]); // Ensure it's an array
   const fileInputRef = useRef(null);
-  const eventSourceRef = useRef(null);
 
   // Persist data in cookies whenever state changes
   useEffect(() => {
@@ -352,122 +351,94 @@ const CreateOnOFFPage = () => {
 
   useEffect(() => {
     const { id: user_id } = getUserData();
-    const eventSourceUrl = `${apiUrl}/api/v1/messageevents-off?keys=${user_id}-key`;
 
-    if (eventSourceRef.current) {
-      eventSourceRef.current.close(); // Close any existing SSE connection
-    }
-
-    const eventSource = new EventSource(eventSourceUrl, {
-      headers: {
-        "ngrok-skip-browser-warning": "true",
-        skip_zrok_interstitial: "true",
-      },
-      retry: 1500, // Auto-retry every 1.5s on failure
-    });
+    // The shared message socket resumes after the last message received when it reconnects
+    const unsubscribe = subscribeMessages("off", `${user_id}-key`, (messages) => {
+      if (messages?.length) {
+        const messageText = messages[messages.length - 1]; // ✅ Extract latest message
+
+        // ✅ Always add the message to the message list
+        addMessage(messages);
+
+        // ✅ Check if it's a "Last Message"
+        const lastMessageMatch = messageText.match(/\[(.*?)\] (.*)/);
+
+        if (lastMessageMatch) {
+          const timestamp = lastMessageMatch[1]; // e.g., "2025-03-13 11:34:03"
+          const messageContent = lastMessageMatch[2]; // e.g., "Campaign updates completed for 1152674286244491 (OFF)"
+
+          setTableData((prevData) =>
+            prevData.map((entry) =>
+              entry.key === `${user_id}-key`
+                ? {
+                    ...entry,
+                    lastMessage: `${timestamp} - ${messageContent}`,
+                  }
+                : entry
+            )
+          );
+        }
 
-    eventSource.onmessage = (event) => {
-      try {
-        const data = JSON.parse(event.data);
-        if (data && data.data && data.data.message) {
-          const messageText = data.data.message[0]; // ✅ Extract first message
-
-          // ✅ Always add the message to the message list
-          addMessage(data.data.message);
-
-          // ✅ Check if it's a "Last Message"
-          const lastMessageMatch = messageText.match(/\[(.*?)\] (.*)/);
-
-          if (lastMessageMatch) {
-            const timestamp = lastMessageMatch[1]; // e.g., "2025-03-13 11:34:03"
-            const messageContent = lastMessageMatch[2]; // e.g., "Campaign updates completed for 1152674286244491 (OFF)"
-
-            setTableData((prevData) =>
-              prevData.map((entry) =>
-                entry.key === `${user_id}-key`
-                  ? {
-                      ...entry,
-                      lastMessage: `${timestamp} - ${messageContent}`,
-                    }
-                  : entry
-              )
-            );
-          }
+        // ✅ Handle "Fetching Campaign Data for {ad_account_id} ({operation})"
+        const fetchingMatch = messageText.match(
+          /\[(.*?)\] Fetching Campaign Data for (\S+) \((ON|OFF)\), schedule (.+)/
+        );
 
-          // ✅ Handle "Fetching Campaign Data for {ad_account_id} ({operation})"
-          const fetchingMatch = messageText.match(
-            /\[(.*?)\] Fetching Campaign Data for (\S+) \((ON|OFF)\), schedule (.+)/
+        if (fetchingMatch) {
+          const adAccountId = fetchingMatch[2];
+          const onOffStatus = fetchingMatch[3];
+
+          setTableData((prevData) =>
+            prevData.map((entry) =>
+              entry.ad_account_id === adAccountId &&
+              entry.on_off === onOffStatus
+                ? { ...entry, status: "Fetching ⏳" }
+                : entry
+            )
           );
+        }
 
-          if (fetchingMatch) {
-            const adAccountId = fetchingMatch[2];
-            const onOffStatus = fetchingMatch[3];
-
-            setTableData((prevData) =>
-              prevData.map((entry) =>
-                entry.ad_account_id === adAccountId &&
-                entry.on_off === onOffStatus
-                  ? { ...entry, status: "Fetching ⏳" }
-                  : entry
-              )
-            );
-          }
+        // ✅ Handle "Campaign updates completed"
+        const successMatch = messageText.match(
+          /\[(.*?)\] Campaign updates completed for (\S+) \((ON|OFF)\)/
+        );
 
-          // ✅ Handle "Campaign updates completed"
-          const successMatch = messageText.match(
-            /\[(.*?)\] Campaign updates completed for (\S+) \((ON|OFF)\)/
+        if (successMatch) {
+          const adAccountId = successMatch[2];
+          const onOffStatus = successMatch[3];
+
+          setTableData((prevData) =>
+            prevData.map((entry) =>
+              entry.ad_account_id === adAccountId &&
+              entry.on_off === onOffStatus
+                ? { ...entry, status: `Success ✅` }
+                : entry
+            )
           );
+        }
 
-          if (successMatch) {
-            const adAccountId = successMatch[2];
-            const onOffStatus = successMatch[3];
-
-            setTableData((prevData) =>
-              prevData.map((entry) =>
-                entry.ad_account_id === adAccountId &&
-                entry.on_off === onOffStatus
-                  ? { ...entry, status: `Success ✅` }
-                  : entry
-              )
-            );
-          }
+        // ❌ Handle 401 Unauthorized error
+        const unauthorizedMatch = messageText.match(
+          /Error during campaign fetch for Ad Account (\S+) \((ON|OFF)\): 401 Client Error/
+        );
 
-          // ❌ Handle 401 Unauthorized error
-          const unauthorizedMatch = messageText.match(
-            /Error during campaign fetch for Ad Account (\S+) \((ON|OFF)\): 401 Client Error/
+        if (unauthorizedMatch) {
+          const adAccountId = unauthorizedMatch[1];
+          const onOffStatus = unauthorizedMatch[2];
+
+          setTableData((prevData) =>
+            prevData.map((entry) =>
+              entry.ad_account_id === adAccountId &&
+              entry.on_off === onOffStatus
+                ? { ...entry, status: "Failed ❌" }
+                : entry
+            )
           );
-
-          if (unauthorizedMatch) {
-            const adAccountId = unauthorizedMatch[1];
-            const onOffStatus = unauthorizedMatch[2];
-
-            setTableData((prevData) =>
-              prevData.map((entry) =>
-                entry.ad_account_id === adAccountId &&
-                entry.on_off === onOffStatus
-                  ? { ...entry, status: "Failed ❌" }
-                  : entry
-              )
-            );
-          }
         }
-      } catch (error) {
-        console.error("Error parsing SSE message:", error);
       }
-    };
-
-    eventSource.onerror = (error) => {
-      console.error("SSE connection error:", error);
-      eventSource.close();
-    };
-
-    eventSourceRef.current = eventSource;
+    });
 
-    return () => {
-      if (eventSourceRef.current) {
-        eventSourceRef.current.close();
-      }
-    };
+    return unsubscribe;
   }, []);
 
   const handleClearAll = () => {
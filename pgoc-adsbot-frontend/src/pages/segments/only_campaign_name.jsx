@@ -18,7 +18,7 @@ import notify from "../components/toast.jsx";
 import OnlyOnOffTerminal from "../widgets/only_campaign_name/only_terminal.jsx";
 import { getUserData } from "../../services/user_data.js";
 import CampaignNameImportWidget from "../widgets/only_campaign_name/only_import_dialog.jsx";
-import { EventSource } from "extended-eventsource";
+import { subscribeMessages } from "../../services/message_socket";
 
 const apiUrl = import.meta.env.VITE_API_URL;
 
@@ -33,7 +33,8 @@ const CampaignNameOnlyPage = ({ userData }) => {
   const [importProgress, setImportProgress] = useState({});
   const [isVisible, setIsVisible] = useState(true); // Track visibility
 
-  const eventSourceRef = useRef(null);
+  const unsubscribeRef = useRef(null); // Stops the selected account's message subscription
+  const lastEventIdsRef = useRef({}); // Last message ID received per stream key
   const lastUpdateTimeRef = useRef(0);
   const timeoutRef = useRef(null); // Track timeout for no messagE
 
@@ -44,12 +45,12 @@ const CampaignNameOnlyPage = ({ userData }) => {
 
   useEffect(() => {
     if (selectedAccount?.ad_account_id) {
-      createEventSource(selectedAccount.ad_account_id);
+      subscribeAccountMessages(selectedAccount.ad_account_id);
     } else {
-      destroyEventSource();
+      unsubscribeAccountMessages();
     }
 
-    return () => destroyEventSource();
+    return () => unsubscribeAccountMessages();
   }, [selectedAccount]);
 
   useEffect(() => {
@@ -113,71 +114,46 @@ const CampaignNameOnlyPage = ({ userData }) => {
     }, 5000); // Set to 5 seconds
   };
 
-  const createEventSource = (adAccountId) => {
-    if (eventSourceRef.current) {
-      console.log("EventSource already exists. Skipping new instance.");
+  const subscribeAccountMessages = (adAccountId) => {
+    if (unsubscribeRef.current) {
+      console.log("Already subscribed to account messages. Skipping.");
       return;
     }
 
     const redisKey = `${userData.id}-${adAccountId}-key`;
-    const eventSource = new EventSource(
-      `${apiUrl}/api/v1/messageevents-only?keys=${redisKey}`,
-      {
-        headers: {
-          "ngrok-skip-browser-warning": "true",
-          skip_zrok_interstitial: "true",
-        },
-        retry: 1500, // Auto-retry every 1.5s on failure
-      }
-    );
 
-    eventSource.onopen = () => {
-      console.log("Connected to SSE:", redisKey);
-    };
+    // Resumes after the last message this page received for the key, so nothing is appended twice
+    unsubscribeRef.current = subscribeMessages(
+      "only",
+      redisKey,
+      (messages, id) => {
+        lastEventIdsRef.current[redisKey] = id;
 
-    eventSource.onmessage = (event) => {
-      try {
-        const parsedData = JSON.parse(event.data);
-        console.log("Received SSE:", parsedData);
-
-        if (parsedData.data?.message?.length) {
-          addMessage(adAccountId, parsedData.data.message);
-          console.log("Updated Messages via SSE");
+        if (messages?.length) {
+          addMessage(adAccountId, messages);
 
           // Reset timeout to ensure bot messages display
           resetMessageTimeout(adAccountId);
         }
-      } catch (error) {
-        console.error("Error parsing SSE data:", error);
-      }
-    };
-
-    eventSource.onerror = () => {
-      console.error("SSE connection error. Reconnecting...");
-      eventSource.close();
-      eventSourceRef.current = null;
-
-      setTimeout(() => createEventSource(adAccountId), 3000);
-    };
-
-    eventSourceRef.current = eventSource;
+      },
+      lastEventIdsRef.current[redisKey]
+    );
   };
 
-  const destroyEventSource = () => {
-    if (eventSourceRef.current) {
-      eventSourceRef.current.close();
-      eventSourceRef.current = null;
-      console.log("❌ EventSource closed.");
+  const unsubscribeAccountMessages = () => {
+    if (unsubscribeRef.current) {
+      unsubscribeRef.current();
+      unsubscribeRef.current = null;
     }
   };
 
   const handleVisibilityChange = () => {
     if (document.visibilityState === "visible") {
       if (selectedAccount?.ad_account_id) {
-        createEventSource(selectedAccount.ad_account_id);
+        subscribeAccountMessages(selectedAccount.ad_account_id);
       }
     } else {
-      destroyEventSource();
+      unsubscribeAccountMessages();
     }
   };
 
@@ -0,0 +1,87 @@
+import { io } from "socket.io-client";
+import { getUserData } from "./user_data";
+
+const apiUrl = import.meta.env.VITE_API_URL;
+const eventsUrl = import.meta.env.VITE_EVENTS_URL || apiUrl;
+
+// One Socket.IO connection to the events service carries every message key the pages follow.
+// "domain:key" -> { domain, key, lastId, onMessages }
+const subscriptions = new Map();
+let socket = null;
+
+const subscriptionId = (domain, key) => `${domain}:${key}`;
+
+const subscriptionPayload = (entries) => ({
+  subscriptions: entries.map(({ domain, key, lastId }) =>
+    lastId ? { domain, key, last_id: lastId } : { domain, key }
+  ),
+});
+
+const logAckError = (response) => {
+  if (response?.error) {
+    console.error("Message socket subscription error:", response.error);
+  }
+};
+
+const getSocket = () => {
+  if (socket) return socket;
+
+  socket = io(eventsUrl, {
+    transports: ["websocket"],
+    // Read on every (re)connect, so a new login token is picked up
+    auth: (callback) => callback({ token: getUserData().accessToken }),
+  });
+
+  // A fresh connection has no subscriptions on the server; resume every key after the last message received
+  socket.on("connect", () => {
+    if (subscriptions.size) {
+      socket.emit("subscribe", subscriptionPayload([...subscriptions.values()]), logAckError);
+    }
+  });
+
+  socket.on("messages", ({ domain, key, id, message }) => {
+    const subscription = subscriptions.get(subscriptionId(domain, key));
+    if (!subscription) return;
+
+    subscription.lastId = id;
+    subscription.onMessages(message, id);
+  });
+
+  socket.on("connect_error", (error) => {
+    console.error("Message socket connection error:", error.message);
+  });
+
+  return socket;
+};
+
+/**
+ * Follow a message key over the shared socket.
+ *
+ * `onMessages(messages, id)` receives each batch with the ID of its last entry; pass that ID back as
+ * `lastId` when subscribing again to get only what was missed instead of the recent history.
+ * Returns a function that unsubscribes.
+ */
+export const subscribeMessages = (domain, key, onMessages, lastId = null) => {
+  const id = subscriptionId(domain, key);
+  const subscription = { domain, key, lastId, onMessages };
+  const alreadySubscribed = subscriptions.has(id);
+  subscriptions.set(id, subscription);
+
+  const messageSocket = getSocket();
+  if (!alreadySubscribed && messageSocket.connected) {
+    messageSocket.emit("subscribe", subscriptionPayload([subscription]), logAckError);
+  }
+
+  return () => {
+    if (subscriptions.get(id) !== subscription) return;
+    subscriptions.delete(id);
+
+    if (socket?.connected) {
+      socket.emit("unsubscribe", subscriptionPayload([subscription]), logAckError);
+    }
+    if (!subscriptions.size && socket) {
+      socket.disconnect();
+      socket = null;
+    }
+  };
+};
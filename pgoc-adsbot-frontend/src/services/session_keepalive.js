@@ -0,0 +1,38 @@
+import { useEffect } from "react";
+import { useLocation } from "react-router-dom";
+import { getUserData } from "./user_data";
+
+const apiUrl = import.meta.env.VITE_API_URL;
+
+// Pings /auth/session at most this often while the user is active, which refreshes the session's TTL
+const SESSION_PING_INTERVAL_MS = 5 * 60 * 1000;
+const ACTIVITY_EVENTS = ["click", "keydown"];
+
+let lastPing = 0;
+
+const pingSession = () => {
+  const now = Date.now();
+  if (now - lastPing < SESSION_PING_INTERVAL_MS) return;
+
+  const { redisKey } = getUserData();
+  if (!redisKey) return;
+
+  lastPing = now;
+  fetch(`${apiUrl}/api/v1/auth/session`, {
+    method: "GET",
+    headers: { "X-Session-Id": redisKey, "skip_zrok_interstitial": "true" },
+  }).catch((error) => console.error("Session refresh error:", error));
+};
+
+export const useSessionKeepAlive = () => {
+  const location = useLocation();
+
+  useEffect(() => {
+    pingSession();
+  }, [location.pathname]);
+
+  useEffect(() => {
+    ACTIVITY_EVENTS.forEach((event) => window.addEventListener(event, pingSession));
+    return () => ACTIVITY_EVENTS.forEach((event) => window.removeEventListener(event, pingSession));
+  }, []);
+};
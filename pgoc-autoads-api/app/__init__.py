@@ -17,11 +17,17 @@ from routes.verify_accounts import verify_ad_accounts_bp
 from routes.campaign_off_only_routes import schedule_campaign_only_bp
 from routes.on_off_campaign_name import campaign_on_off
 from routes.on_off_adsets_route import adsets_on_off
+from routes.message_history_routes import message_history_bp
 import logging
 from flask_mail import Mail
 from models.models import db, PHRegionTable  # Import PHRegionTable
+from models.migrations import add_missing_columns, migrate_json_columns_to_jsonb, normalize_schedule_times, partition_campaign_table
 from app.on_off_sse import message_events_blueprint
+from app.message_socket import MESSAGE_SOCKET_ORIGINS, socketio
 from workers.on_off_functions.account_message import append_redis_message
+from workers.message_archive import ensure_message_archive_partitions
+from workers.delete_campaign_data_auto import ensure_campaign_partitions
+from redis_registry import redis_health, redis_metrics
 # from workers.scheduler_celery import check_scheduled_adaccounts
 # from workers.only_campaign_fetcher import check_campaign_off_only
 
@@ -103,6 +109,12 @@ def create_app():
     # Create database tables if they don't exist and seed regions
     with app.app_context():
         db.create_all()
+        add_missing_columns()
+        migrate_json_columns_to_jsonb()
+        normalize_schedule_times()
+        partition_campaign_table()
+        ensure_campaign_partitions()
+        ensure_message_archive_partitions()
         configure_mail(app)
         seed_regions()  # Call the seed function after creating tables
 
@@ -110,6 +122,12 @@ def create_app():
     @app.route("/")
     def home():
         return "Welcome to the Ads Manager API PGOC"
+
+    @app.route("/health/redis")
+    def redis_health_route():
+        """Ping every Redis DB this worker uses and report its connection pools."""
+        healthy, databases = redis_health()
+        return jsonify({"healthy": healthy, "databases": databases, "pools": redis_metrics()}), 200 if healthy else 503
     
     @app.route("/append_message", methods=["POST"])
     def append_message_route():
@@ -143,6 +161,24 @@ def create_app():
     app.register_blueprint(campaign_on_off, url_prefix="/api/v1/off-on-campaign")
     app.register_blueprint(adsets_on_off, url_prefix="/api/v1/off-on-adsets")
     app.register_blueprint(schedule_campaign_only_bp, url_prefix="/api/v1/campaign-only")
+    app.register_blueprint(message_history_bp, url_prefix="/api/v1/message-history")
+
+    return app
+
+def create_events_app():
+    """Lightweight app that only serves the message streams: SSE endpoints and the socket (run by events_server.py)."""
+    app = Flask(__name__)
+    load_dotenv()
+    CORS(app)
+
+    app.logger.setLevel(logging.INFO)
+    app.config['SECRET_KEY'] = os.getenv('SECRET_KEY')
+    JWTManager(app)  # Same secret as the API, so the socket can verify login tokens
+
+    app.register_blueprint(message_events_blueprint, url_prefix="/api/v1")
+
+    # Multiplexed message socket at /socket.io (subscribe to many of the user's keys across all domains)
+    socketio.init_app(app, cors_allowed_origins=MESSAGE_SOCKET_ORIGINS, async_mode="gevent")
 
     return app
 
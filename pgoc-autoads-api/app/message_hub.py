@@ -0,0 +1,112 @@
+import logging
+import queue
+import threading
+import time
+from workers.on_off_functions.message_bus import (
+    CHANNEL_PREFIX,
+    latest_entry_id,
+    message_bus_redis,
+    parse_notify_channel,
+    read_entries,
+)
+
+# Per-client buffer; a client that falls this far behind starts losing batches
+CLIENT_QUEUE_SIZE = 1000
+
+
+class MessageHub:
+    """Holds one message-bus subscription per web worker and fans stream entries out to clients.
+
+    Each connected client gets an in-memory queue. When a watched stream is appended to,
+    the hub reads the new entries once and pushes them to every queue for that key, so Redis
+    load stays the same no matter how many browser tabs are open.
+    """
+
+    def __init__(self):
+        self._subscribers = {}  # {(domain, key): set of queues}
+        self._cursors = {}  # {(domain, key): last entry ID fanned out}
+        self._lock = threading.Lock()
+        self._listener = None
+
+    def subscribe(self, domain, specific_key, client_queue=None):
+        """Register a client for a stream key and return its queue of `[(entry_id, message), ...]` batches.
+
+        Pass `client_queue` (anything with `put_nowait`) to deliver several keys into one client queue.
+        """
+        self._ensure_listener()
+        if client_queue is None:
+            client_queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        channel_key = (domain, specific_key)
+
+        with self._lock:
+            if channel_key not in self._cursors:
+                self._cursors[channel_key] = latest_entry_id(domain, specific_key)
+            self._subscribers.setdefault(channel_key, set()).add(client_queue)
+
+        logging.info(f"Hub subscribed client to {specific_key} in {domain}")
+        return client_queue
+
+    def unsubscribe(self, domain, specific_key, client_queue):
+        channel_key = (domain, specific_key)
+
+        with self._lock:
+            subscribers = self._subscribers.get(channel_key)
+            if subscribers is None:
+                return
+            subscribers.discard(client_queue)
+            if not subscribers:
+                del self._subscribers[channel_key]
+                self._cursors.pop(channel_key, None)
+
+        logging.info(f"Hub unsubscribed client from {specific_key} in {domain}")
+
+    def _ensure_listener(self):
+        with self._lock:
+            if self._listener is not None and self._listener.is_alive():
+                return
+            self._listener = threading.Thread(target=self._listen_forever, name="message-hub", daemon=True)
+            self._listener.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logging.error(f"Message hub lost its Redis subscription: {e}. Reconnecting...")
+                time.sleep(1)
+
+    def _listen(self):
+        pubsub = message_bus_redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"{CHANNEL_PREFIX}:*")
+        logging.info(f"Message hub listening on {CHANNEL_PREFIX}:*")
+
+        try:
+            for message in pubsub.listen():
+                if message.get("type") == "pmessage":
+                    self._dispatch(message["channel"])
+        finally:
+            pubsub.close()
+
+    def _dispatch(self, channel):
+        # Channel looks like "message-events:{domain}:{key}"; every publish follows an XADD
+        channel_key = parse_notify_channel(channel)
+
+        with self._lock:
+            if channel_key not in self._subscribers:
+                return
+            last_id = self._cursors[channel_key]
+
+        # Stream IDs are time based, so a stream recreated after expiry still sorts after the cursor
+        entries = read_entries(*channel_key, last_id)
+        if not entries:
+            return
+
+        with self._lock:
+            self._cursors[channel_key] = entries[-1][0]
+            subscribers = list(self._subscribers.get(channel_key, ()))
+
+        for client_queue in subscribers:
+            try:
+                client_queue.put_nowait(entries)
+            except queue.Full:
+                logging.warning(f"Client queue for {channel_key[1]} is full, dropping {len(entries)} messages.")
@@ -0,0 +1,287 @@
+import logging
+import os
+import queue
+import threading
+from flask import request
+from flask_jwt_extended import decode_token
+from flask_socketio import SocketIO, emit
+from app.message_hub import CLIENT_QUEUE_SIZE
+from app.on_off_sse import SSE_HEARTBEAT_SECONDS, SSE_HISTORY_LIMIT, message_hub
+from workers.on_off_functions.message_bus import (
+    ACCOUNT_DOMAINS,
+    MESSAGE_DOMAINS,
+    parse_message_key,
+    read_entries,
+    read_messages,
+    read_recent_messages,
+)
+from workers.on_off_functions.message_stream import stream_id_tuple
+
+# Multiplexed message channel: one socket per browser, many (domain, key) subscriptions on it.
+# Clients connect with their login JWT (`auth: {token}`) and may only follow their own message keys.
+socketio = SocketIO()
+
+# Frontend origins allowed to open the socket, comma separated
+MESSAGE_SOCKET_ORIGINS = [
+    origin.strip()
+    for origin in os.getenv("MESSAGE_SOCKET_ORIGINS", "http://localhost:5173,http://127.0.0.1:5173").split(",")
+    if origin.strip()
+]
+
+# Keys a single socket may follow at once
+MAX_SUBSCRIPTIONS_PER_CLIENT = 200
+
+# Entries read from Redis when catching up a key whose live batches were dropped
+RESYNC_BATCH_SIZE = 500
+
+# {sid: SocketClient}
+socket_clients = {}
+socket_clients_lock = threading.Lock()
+
+
+class KeySink:
+    """Tags the hub's batches for one key before they land in the client's shared queue."""
+
+    def __init__(self, client, domain, specific_key):
+        self.client = client
+        self.domain = domain
+        self.specific_key = specific_key
+
+    def put_nowait(self, entries):
+        try:
+            self.client.queue.put_nowait((self.domain, self.specific_key, entries))
+        except queue.Full:
+            # Backpressure: drop the batch and read it back from the stream once the client catches up
+            with self.client.lock:
+                self.client.stale.add((self.domain, self.specific_key))
+            raise
+
+
+class SocketClient:
+    """State for one connected socket: its bounded queue and the last entry sent per key."""
+
+    def __init__(self, sid, user_id):
+        self.sid = sid
+        self.user_id = user_id  # JWT identity (marketing_users.id) the socket authenticated as
+        self.queue = queue.Queue(maxsize=CLIENT_QUEUE_SIZE)
+        self.sinks = {}  # {(domain, key): KeySink}
+        self.last_ids = {}  # {(domain, key): last entry ID sent}
+        self.stale = set()  # Keys with dropped batches, resynced from Redis
+        self.lock = threading.Lock()
+        self.connected = True
+
+
+def emit_messages(client, domain, specific_key, entries):
+    """Send the entries newer than what the client already has for this key."""
+    channel_key = (domain, specific_key)
+    last_id = client.last_ids.get(channel_key)
+    if last_id is None:
+        return  # Unsubscribed while the batch was queued
+
+    new_entries = [(entry_id, message) for entry_id, message in entries if stream_id_tuple(entry_id) > stream_id_tuple(last_id)]
+    if not new_entries:
+        return
+
+    client.last_ids[channel_key] = new_entries[-1][0]
+    socketio.emit("messages", {
+        "domain": domain,
+        "key": specific_key,
+        "id": new_entries[-1][0],
+        "message": [message for _, message in new_entries],
+    }, to=client.sid)
+
+
+def resync_stale_keys(client):
+    """Catch up keys whose live batches were dropped by reading the missed entries back from Redis."""
+    with client.lock:
+        stale, client.stale = client.stale, set()
+
+        for domain, specific_key in stale:
+            last_id = client.last_ids.get((domain, specific_key))
+            if last_id is None:
+                continue
+
+            while True:
+                entries = read_entries(domain, specific_key, last_id, count=RESYNC_BATCH_SIZE)
+                if not entries:
+                    break
+                emit_messages(client, domain, specific_key, entries)
+                last_id = entries[-1][0]
+
+            logging.info(f"Resynced {specific_key} in {domain} for socket {client.sid}")
+
+
+def pump_client_messages(client):
+    """Background task: drain the client's queue and emit batches until it disconnects."""
+    while client.connected:
+        try:
+            domain, specific_key, entries = client.queue.get(timeout=SSE_HEARTBEAT_SECONDS)
+        except queue.Empty:
+            if client.stale:
+                resync_stale_keys(client)
+            continue
+
+        try:
+            with client.lock:
+                emit_messages(client, domain, specific_key, entries)
+
+            if client.stale and client.queue.empty():
+                resync_stale_keys(client)
+        except Exception as e:
+            logging.error(f"Error sending messages to socket {client.sid}: {e}")
+
+
+def subscribe_key(client, domain, specific_key, last_event_id=None):
+    """Subscribe one key and send what the client is missing: entries after `last_event_id`, or recent history."""
+    channel_key = (domain, specific_key)
+
+    with client.lock:
+        if channel_key in client.sinks:
+            return
+
+        sink = KeySink(client, domain, specific_key)
+        client.sinks[channel_key] = sink
+        message_hub.subscribe(domain, specific_key, sink)
+
+        if last_event_id:
+            last_id, messages = read_messages(domain, specific_key, last_id=last_event_id)
+        else:
+            last_id, messages = read_recent_messages(domain, specific_key, SSE_HISTORY_LIMIT)
+
+        client.last_ids[channel_key] = last_id if messages else (last_event_id or "0-0")
+
+        # Sent under the lock so live batches for this key can't overtake the history
+        if messages:
+            emit("messages", {"domain": domain, "key": specific_key, "id": last_id, "message": messages})
+
+
+def unsubscribe_key(client, domain, specific_key):
+    channel_key = (domain, specific_key)
+
+    with client.lock:
+        sink = client.sinks.pop(channel_key, None)
+        client.last_ids.pop(channel_key, None)
+        client.stale.discard(channel_key)
+
+    if sink is not None:
+        message_hub.unsubscribe(domain, specific_key, sink)
+
+
+def key_owned_by(user_id, domain, specific_key):
+    """True when a message key belongs to `user_id`: `{user_id}-key`, or `{user_id}-{ad_account_id}-key` per account."""
+    if not specific_key.endswith("-key"):
+        return False
+    owner_id, ad_account_id = parse_message_key(domain, specific_key)
+    if domain in ACCOUNT_DOMAINS and not ad_account_id:
+        return False
+    return owner_id == user_id
+
+
+def authenticated_user_id(auth):
+    """JWT identity from the socket's `auth` payload, or None when the token is missing, invalid or expired."""
+    token = (auth or {}).get("token")
+    if not token:
+        return None
+    try:
+        return str(decode_token(token)["sub"])
+    except Exception as e:
+        logging.warning(f"Rejected message socket token: {e}")
+        return None
+
+
+def parse_subscriptions(data, user_id):
+    """Validate `{"subscriptions": [{"domain": ..., "key": ..., "last_id": ...}, ...]}` against the user's keys."""
+    subscriptions = (data or {}).get("subscriptions")
+    if not isinstance(subscriptions, list):
+        return None, "Missing 'subscriptions' list"
+
+    parsed = []
+    for subscription in subscriptions:
+        if not isinstance(subscription, dict):
+            return None, f"Invalid subscription: {subscription}"
+        domain = subscription.get("domain")
+        specific_key = subscription.get("key")
+        if domain not in MESSAGE_DOMAINS or not isinstance(specific_key, str) or not specific_key:
+            return None, f"Invalid subscription: {subscription}"
+        if not key_owned_by(user_id, domain, specific_key):
+            return None, f"Not allowed to subscribe to {specific_key}"
+
+        last_event_id = subscription.get("last_id")
+        if last_event_id:
+            try:
+                stream_id_tuple(last_event_id)
+            except ValueError:
+                logging.warning(f"Ignoring malformed last_id for {specific_key}: {last_event_id}")
+                last_event_id = None
+
+        parsed.append((domain, specific_key, last_event_id))
+
+    return parsed, None
+
+
+@socketio.on("connect")
+def handle_connect(auth=None):
+    user_id = authenticated_user_id(auth)
+    if user_id is None:
+        raise ConnectionRefusedError("unauthorized")
+
+    client = SocketClient(request.sid, user_id)
+    with socket_clients_lock:
+        socket_clients[request.sid] = client
+
+    socketio.start_background_task(pump_client_messages, client)
+    logging.info(f"Message socket connected: {request.sid} (user {user_id})")
+
+
+@socketio.on("disconnect")
+def handle_disconnect():
+    with socket_clients_lock:
+        client = socket_clients.pop(request.sid, None)
+    if client is None:
+        return
+
+    client.connected = False
+    for domain, specific_key in list(client.sinks):
+        unsubscribe_key(client, domain, specific_key)
+
+    logging.info(f"Message socket disconnected: {request.sid}")
+
+
+@socketio.on("subscribe")
+def handle_subscribe(data):
+    """Follow many message keys across all domains on this one socket."""
+    client = socket_clients.get(request.sid)
+    if client is None:
+        return {"error": "Not connected"}
+
+    subscriptions, error = parse_subscriptions(data, client.user_id)
+    if error:
+        return {"error": error}
+
+    if len(client.sinks) + len(subscriptions) > MAX_SUBSCRIPTIONS_PER_CLIENT:
+        return {"error": f"At most {MAX_SUBSCRIPTIONS_PER_CLIENT} subscriptions per connection"}
+
+    for domain, specific_key, last_event_id in subscriptions:
+        try:
+            subscribe_key(client, domain, specific_key, last_event_id)
+        except Exception as e:
+            logging.error(f"Error subscribing socket {request.sid} to {specific_key}: {e}")
+            return {"error": f"Could not subscribe to {specific_key}"}
+
+    return {"subscribed": len(client.sinks)}
+
+
+@socketio.on("unsubscribe")
+def handle_unsubscribe(data):
+    client = socket_clients.get(request.sid)
+    if client is None:
+        return {"error": "Not connected"}
+
+    subscriptions, error = parse_subscriptions(data, client.user_id)
+    if error:
+        return {"error": error}
+
+    for domain, specific_key, _ in subscriptions:
+        unsubscribe_key(client, domain, specific_key)
+
+    return {"subscribed": len(client.sinks)}
@@ -1,8 +1,13 @@
 import logging
-import time
 import json
+import os
+import queue
+import threading
+import time
 from flask import Blueprint, Response, request
-import redis
+from app.message_hub import MessageHub
+from workers.on_off_functions.message_bus import read_messages, read_recent_messages
+from workers.on_off_functions.message_stream import stream_id_tuple
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -10,150 +15,200 @@ logging.basicConfig(level=logging.DEBUG)
 # Blueprint for SSE events
 message_events_blueprint = Blueprint("message_events", __name__)
 
-# Redis connections
-redis_websocket = redis.Redis(host="redisAds", port=6379, db=10, decode_responses=True)
-redis_websocket_only = redis.Redis(host="redisAds", port=6379, db=11, decode_responses=True)
-redis_websocket_off = redis.Redis(host="redisAds", port=6379, db=13, decode_responses=True)  # Redis DB 13
-# Redis connection for Create Campaigns
-redis_websocket_cc = redis.Redis(host="redisAds", port=6379, db=14, decode_responses=True)
-# Redis connection for Create Campaigns
-redis_websocket_as = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=15,
-    decode_responses=True  # Ensures Redis returns strings
-)
-
-# Ensure Redis keyspace notifications are enabled
-redis_websocket.config_set("notify-keyspace-events", "KEA")
-redis_websocket_only.config_set("notify-keyspace-events", "KEA")
-redis_websocket_off.config_set("notify-keyspace-events", "KEA")
-redis_websocket_cc.config_set("notify-keyspace-events", "KEA")
-redis_websocket_as.config_set("notify-keyspace-events", "KEA")
-
-def send_initial_data(redis_instance, specific_key):
-    """Fetch and send the latest Redis key data when client connects."""
-    existing_data = redis_instance.get(specific_key)
-    
-    if existing_data:
-        try:
-            parsed_data = json.loads(existing_data)
-            logging.info(f"Sending initial data for key {specific_key}: {parsed_data}")
-            yield f"data: {json.dumps({'key': specific_key, 'data': f" Last Message: {parsed_data}"})}\n\n"
-        except json.JSONDecodeError:
-            logging.error(f"Invalid JSON format in Redis key: {specific_key}")
-            yield f"data: {json.dumps({'key': specific_key, 'error': 'Invalid JSON format'})}\n\n"
+# One message-bus subscription per web worker, shared by every SSE client
+message_hub = MessageHub()
+
+# Idle clients get a comment line this often so dead connections are noticed and released
+SSE_HEARTBEAT_SECONDS = int(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
+# Streams with no messages for this long are closed; EventSource reconnects on its own
+SSE_IDLE_TIMEOUT_SECONDS = int(os.getenv("SSE_IDLE_TIMEOUT_SECONDS", 1800))
+# Open streams allowed per web worker before new clients get a 503
+SSE_MAX_CONNECTIONS = int(os.getenv("SSE_MAX_CONNECTIONS", 5000))
+# Reconnect delay suggested to EventSource clients
+SSE_RETRY_MS = 3000
+# Messages sent on a fresh connection; reconnects with Last-Event-ID get exactly what they missed
+SSE_HISTORY_LIMIT = int(os.getenv("SSE_HISTORY_LIMIT", 200))
+
+_open_streams = 0
+_open_streams_lock = threading.Lock()
+
+
+def acquire_stream_slot():
+    """Reserve one of the SSE_MAX_CONNECTIONS stream slots. Returns False when the cap is reached."""
+    global _open_streams
+    with _open_streams_lock:
+        if _open_streams >= SSE_MAX_CONNECTIONS:
+            return False
+        _open_streams += 1
+        return True
+
+
+def release_stream_slot():
+    global _open_streams
+    with _open_streams_lock:
+        _open_streams -= 1
+
+def format_sse_event(specific_key, last_id, messages):
+    """One SSE event carrying only `messages`, tagged with the stream ID of the last one."""
+    return f"id: {last_id}\ndata: {json.dumps({'key': specific_key, 'data': {'message': messages}})}\n\n"
+
+
+def get_last_event_id():
+    """Stream entry ID the client already has, from the EventSource reconnect header or `?lastEventId=`."""
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId")
+    if not last_event_id:
+        return None
+
+    try:
+        stream_id_tuple(last_event_id)
+    except ValueError:
+        logging.warning(f"Ignoring malformed Last-Event-ID: {last_event_id}")
+        return None
+
+    return last_event_id
+
+
+def send_stream_history(domain, specific_key, last_event_id=None):
+    """Send what the client is missing when it connects. Returns the last entry ID sent.
+
+    A resuming client gets only the entries after its Last-Event-ID; a fresh client gets
+    the newest SSE_HISTORY_LIMIT messages.
+    """
+    if last_event_id:
+        last_id, messages = read_messages(domain, specific_key, last_id=last_event_id)
+        if messages:
+            logging.info(f"Resuming {specific_key} after {last_event_id} with {len(messages)} missed messages")
+            yield format_sse_event(specific_key, last_id, messages)
+        return last_id
+
+    last_id, messages = read_recent_messages(domain, specific_key, SSE_HISTORY_LIMIT)
+
+    if messages:
+        logging.info(f"Sending {len(messages)} stored messages for key {specific_key}")
+        yield format_sse_event(specific_key, last_id, messages)
     else:
         logging.warning(f"Key {specific_key} does not exist at connection time.")
         yield f"data: {json.dumps({'key': specific_key, 'error': 'Key does not exist'})}\n\n"
 
+    return last_id
 
-def listen_for_changes(redis_instance, specific_key, db_number):
-    """Continuously listens for changes and polls Redis for rapid updates."""
-    pubsub = redis_instance.pubsub()
-    channel_pattern = f"__keyspace@{db_number}__:{specific_key}"
-    pubsub.subscribe(channel_pattern)
-    
-    last_sent_data = None  
-    last_sent_time = 0  
-    logging.info(f"Listening for updates on Redis DB {db_number}, key: {specific_key}")
 
-    try:
-        while True:
-            new_data = redis_instance.get(specific_key)
-            if new_data and new_data != last_sent_data:
-                try:
-                    parsed_data = json.loads(new_data)
-                    current_time = time.time()
-
-                    if current_time - last_sent_time >= 0.05:
-                        logging.info(f"Sending update for key {specific_key}: {parsed_data}")
-                        yield f"data: {json.dumps({'key': specific_key, 'data': parsed_data})}\n\n"
-                        last_sent_data = new_data
-                        last_sent_time = current_time
-                except json.JSONDecodeError:
-                    logging.error(f"Invalid JSON format in Redis key: {specific_key}")
-
-            message = pubsub.get_message(timeout=0.1)
-            if message and message.get("type") == "message":
-                event_type = message.get("data")
-                if event_type == "del":
-                    logging.warning(f"Key {specific_key} deleted, notifying clients.")
-                    yield f"data: {json.dumps({'key': specific_key, 'error': 'Key no longer exists'})}\n\n"
-                    break  
-
-            time.sleep(0.1)  
+def listen_for_stream_entries(client_queue, specific_key, last_id):
+    """Waits on the hub queue and sends only the messages appended after `last_id`.
+    Sends heartbeats while idle and ends the stream after SSE_IDLE_TIMEOUT_SECONDS without messages.
+    """
+    logging.info(f"Listening for hub updates on {specific_key} after entry {last_id}")
+    last_message_time = time.monotonic()
+
+    while True:
+        try:
+            entries = client_queue.get(timeout=SSE_HEARTBEAT_SECONDS)
+        except queue.Empty:
+            if time.monotonic() - last_message_time >= SSE_IDLE_TIMEOUT_SECONDS:
+                logging.info(f"Closing idle SSE stream for {specific_key}")
+                return
+            yield ": keep-alive\n\n"
+            continue
+
+        # The hub may hand us entries that were already part of the initial history
+        new_entries = [(entry_id, message) for entry_id, message in entries if stream_id_tuple(entry_id) > stream_id_tuple(last_id)]
+        if not new_entries:
+            continue
+
+        last_id = new_entries[-1][0]
+        last_message_time = time.monotonic()
+        messages = [message for _, message in new_entries]
+        logging.info(f"Sending {len(messages)} new messages for key {specific_key}")
+        yield format_sse_event(specific_key, last_id, messages)
+
+
+def send_stream_sse_signal(domain, specific_key, last_event_id=None):
+    """Generates the SSE stream for a message stream key: stored history first, then new entries only."""
+    client_queue = message_hub.subscribe(domain, specific_key)
 
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        last_id = yield from send_stream_history(domain, specific_key, last_event_id)
+        yield from listen_for_stream_entries(client_queue, specific_key, last_id)
     except Exception as e:
-        logging.error(f"Error in Redis listener for {specific_key}: {e}")
+        logging.error(f"Error in SSE stream for {specific_key}: {e}")
     finally:
-        pubsub.close()
+        message_hub.unsubscribe(domain, specific_key, client_queue)
+
 
+def sse_response(domain, specific_key):
+    """Wrap the SSE generator in a streaming response, enforcing the per-worker connection cap."""
+    if not acquire_stream_slot():
+        logging.warning(f"SSE connection cap ({SSE_MAX_CONNECTIONS}) reached, rejecting {specific_key}")
+        return Response("Too many open event streams, retry shortly", status=503, headers={"Retry-After": "5"})
 
-def send_sse_signal(redis_instance, specific_key, db_number):
-    """Generates the SSE stream for a Redis key, sends initial data, and listens for changes."""
-    yield from send_initial_data(redis_instance, specific_key)  
-    yield from listen_for_changes(redis_instance, specific_key, db_number)
+    response = Response(
+        send_stream_sse_signal(domain, specific_key, get_last_event_id()),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+    response.call_on_close(release_stream_slot)
+    return response
 
 
 @message_events_blueprint.route("/messageevents")
 def message_events():
-    """SSE endpoint that streams Redis key updates from DB 10."""
+    """SSE endpoint that streams the 'on_off' message domain."""
     room = request.args.get("keys")
 
     if not room:
         return "Missing 'keys' query parameter", 400
     
-    logging.info(f"Client connected to SSE for key: {room} on DB 10")
+    logging.info(f"Client connected to SSE for key: {room} in on_off")
     
-    return Response(send_sse_signal(redis_websocket, room, 10), content_type="text/event-stream")
+    return sse_response("on_off", room)
 
 
 @message_events_blueprint.route("/messageevents-only")
 def message_events_only():
-    """SSE endpoint that streams Redis key updates from DB 11."""
+    """SSE endpoint that streams the 'only' message domain."""
     room = request.args.get("keys")
 
     if not room:
         return "Missing 'keys' query parameter", 400
     
-    logging.info(f"Client connected to SSE for key: {room} on DB 11")
+    logging.info(f"Client connected to SSE for key: {room} in only")
     
-    return Response(send_sse_signal(redis_websocket_only, room, 11), content_type="text/event-stream")
+    return sse_response("only", room)
 
 
 @message_events_blueprint.route("/messageevents-off")
 def message_events_off():
-    """SSE endpoint that streams Redis key updates from DB 13."""
+    """SSE endpoint that streams the 'off' message domain."""
     room = request.args.get("keys")
 
     if not room:
         return "Missing 'keys' query parameter", 400
     
-    logging.info(f"Client connected to SSE for key: {room} on DB 13")
+    logging.info(f"Client connected to SSE for key: {room} in off")
     
-    return Response(send_sse_signal(redis_websocket_off, room, 13), content_type="text/event-stream")
+    return sse_response("off", room)
 
 @message_events_blueprint.route("/messageevents-campaign-creations")
 def messageevents_campaign_creations():
-    """SSE endpoint that streams Redis key updates from DB 14."""
+    """SSE endpoint that streams the 'campaign_creations' message domain."""
     room = request.args.get("keys")
 
     if not room:
         return "Missing 'keys' query parameter", 400
     
-    logging.info(f"Client connected to SSE for key: {room} on DB 14")
+    logging.info(f"Client connected to SSE for key: {room} in campaign_creations")
     
-    return Response(send_sse_signal(redis_websocket_cc, room, 14), content_type="text/event-stream")
+    return sse_response("campaign_creations", room)
 
 @message_events_blueprint.route("/messageevents-adsets")
 def messageevents_adsets():
-    """SSE endpoint that streams Redis key updates from DB 15."""
+    """SSE endpoint that streams the 'adsets' message domain."""
     room = request.args.get("keys")
 
     if not room:
         return "Missing 'keys' query parameter", 400
     
-    logging.info(f"Client connected to SSE for key: {room} on DB 15")
+    logging.info(f"Client connected to SSE for key: {room} in adsets")
     
-    return Response(send_sse_signal(redis_websocket_as, room, 15), content_type="text/event-stream")
\ No newline at end of file
+    return sse_response("adsets", room)
\ No newline at end of file
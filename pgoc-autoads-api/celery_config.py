@@ -18,7 +18,7 @@ def celery_init_app(app: Flask) -> Celery:
         task_cls=FlaskTask,
         broker=app.config.get("CELERY_BROKER_URL", "redis://redisAds:6379/0"),
         backend=app.config.get("CELERY_RESULT_BACKEND", "redis://redisAds:6379/0"),
-        include=["workers.scheduler_celery", "workers.only_campaign_fetcher", "workers.delete_campaign_data_auto"],  # Auto-discover tasks
+        include=["workers.scheduler_celery", "workers.only_campaign_fetcher", "workers.delete_campaign_data_auto", "workers.message_archive", "workers.insights_warehouse"],  # Auto-discover tasks
     )
 
     celery_app.conf.update(
@@ -40,6 +40,14 @@ def celery_init_app(app: Flask) -> Celery:
                 "task": "workers.delete_campaign_data_auto.delete_old_campaigns",
                 "schedule": crontab(hour=0, minute=0),
             },
+            "archive_message_streams_every_minute": {
+                "task": "workers.message_archive.archive_message_streams",
+                "schedule": crontab(minute="*"),
+            },
+            "sync_insights_every_15_minutes": {
+                "task": "workers.insights_warehouse.sync_all_insights",
+                "schedule": crontab(minute="*/15"),
+            },
         },
     )
 
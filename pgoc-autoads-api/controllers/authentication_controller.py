@@ -2,17 +2,17 @@ from flask import request, jsonify
 from flask_jwt_extended import create_access_token
 from datetime import timedelta, datetime
 from flask_bcrypt import Bcrypt
-import base64
 import random
 import pytz
-import redis
 from werkzeug.utils import secure_filename
 from PIL import Image
 from models.models import User, db
+from user_cache import invalidate_user
+from controllers.profile_image_controller import prepare_profile_image, profile_image_url
+from session_store import create_session, delete_session, touch_session
 
 
 bcrypt = Bcrypt()
-redis_db = redis.Redis(host='redis', port=6379, db=1, decode_responses=True)
 
 
 def register():
@@ -43,9 +43,9 @@ def register():
     while User.query.filter_by(user_id=user_id).first():
         user_id = str(random.randint(1000000000, 9999999999))
 
-    # Read the profile image as binary data
+    # Read the profile image as binary data and pre-generate its thumbnail
     with open(image_path, 'rb') as image_file:
-        image_data = image_file.read()
+        profile_image_columns = prepare_profile_image(image_file.read())
 
     manila_tz = pytz.timezone("Asia/Manila")
     current_time_manila = datetime.now(manila_tz)
@@ -58,7 +58,7 @@ def register():
         password=hashed_password,
         gender=gender,
         userdomain=data['domain'],
-        profile_image=image_data,
+        **profile_image_columns,
         full_name=data['full_name'],
         user_status='active',
         created_at=current_time_manila
@@ -67,6 +67,7 @@ def register():
     # Save the user to the database
     db.session.add(new_user)
     db.session.commit()
+    invalidate_user(new_user.id)  # Drop any cached "user not found"
 
     return jsonify({'message': 'User registered successfully', 'user_id': user_id}), 201
 
@@ -107,49 +108,48 @@ def login():
     # Generate JWT token
     access_token = create_access_token(identity=str(user.id), expires_delta=timedelta(days=2))
 
-    redis_key = f"{user.id}-access-key"
-    keys = redis_db.keys(f"*{redis_key}*")
-    if keys:
-        print(f"Redis key(s) found for user ID '{user.id}'")
-    else:
-        print(f"No Redis key(s) found for user ID '{user.id}'")
-    
+    # Direct session key plus a per-user index: no keyspace scan on login
+    session_id = create_session(user.id, user.username)
+
     manila_tz = pytz.timezone("Asia/Manila")
-    current_time_manila = datetime.now(manila_tz)
-    user.last_active = current_time_manila
+    user.last_active = datetime.now(manila_tz)
     db.session.commit()
 
-    existing_redis_key = keys
-    if existing_redis_key:
-        return jsonify({
-            'message': 'Login successful',
-            'user_id': user.user_id,
-            'id': user.id,
-            'access_token': access_token,
-            'redis_key': redis_key
-        }), 200
-    
-    else:
-        redis_value = user.username
-        redis_db.setex(redis_key, timedelta(days=7), redis_value)
+    return jsonify({
+        'message': 'Login successful',
+        'user_id': user.user_id,
+        'id': user.id,
+        'access_token': access_token,
+        'redis_key': session_id
+    }), 200
 
-        # Update the user's last_active timestamp
-        manila_tz = pytz.timezone("Asia/Manila")
-        user.last_active = current_time_manila
-        db.session.commit()
 
-        return jsonify({
-            'message': 'Login successful',
-            'user_id': user.id,
-            'access_token': access_token,
-            'redis_key': redis_key
-        }), 200
+def logout():
+    data = request.get_json(silent=True) or {}
+    session_id = data.get('redis_key') or request.headers.get('X-Session-Id')
 
+    if not session_id:
+        return jsonify({'message': 'redis_key is required'}), 400
+
+    if not delete_session(session_id):
+        return jsonify({'message': 'Session not found or already expired'}), 404
+
+    return jsonify({'message': 'Logged out successfully'}), 200
+
+
+def get_session_status():
+    """Validate a session and refresh its TTL, so active users stay logged in."""
+    session_id = request.headers.get('X-Session-Id') or request.args.get('redis_key')
+
+    if not session_id:
+        return jsonify({'message': 'X-Session-Id header is required'}), 400
+
+    session = touch_session(session_id)
+    if not session:
+        return jsonify({'message': 'Session expired'}), 401
+
+    return jsonify({'message': 'Session active', 'id': session['user_id'], 'username': session['username']}), 200
 
-import base64
-from flask import request, jsonify
-from models.models import User
-from datetime import datetime
 
 def get_user_data_by_id():
     user_id = request.args.get('user_id')
@@ -160,9 +160,6 @@ def get_user_data_by_id():
     user = User.query.get(user_id)
 
     if user:
-        # Convert profile_image (binary) to Base64
-        profile_image_base64 = base64.b64encode(user.profile_image).decode('utf-8') if user.profile_image else None
-
         # Ensure last_active is formatted in +08:00 timezone
         last_active = user.last_active.strftime('%Y-%m-%d %H:%M:%S.%f') if user.last_active else None
 
@@ -173,7 +170,7 @@ def get_user_data_by_id():
             'gender': user.gender,
             'last_active': last_active,  # Already in local time (+08:00)
             'status': user.user_status,
-            'profile_image': profile_image_base64
+            'profile_image_url': profile_image_url(user)  # Served with ETag/Cache-Control instead of inline base64
         }
 
         return jsonify({
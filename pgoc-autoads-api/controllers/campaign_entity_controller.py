@@ -0,0 +1,84 @@
+import logging
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert
+from models.models import db, CampaignEntity, EntitySyncState
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 1000
+
+UPSERT_COLUMNS = ("parent_id", "level", "campaign_type", "name", "status", "cpp")
+ENTITY_COLUMNS = ("entity_id",) + UPSERT_COLUMNS
+
+def upsert_campaign_entities(ad_account_id, entities, levels=None, campaign_types=None):
+    """
+    Replace the stored campaign/ad set snapshot for an ad account.
+
+    Args:
+        ad_account_id (str): Facebook Ad account ID.
+        entities (list[dict]): Rows with entity_id, parent_id, level, campaign_type, name, status and cpp.
+        levels (iterable | None): Levels the fetch covered; rows of other levels are left alone.
+        campaign_types (iterable | None): Campaign types the fetch covered; rows of other types are left alone.
+
+    Only rows whose values changed are rewritten, and entities that no longer exist are deleted,
+    so an unchanged account costs no row writes at all.
+    """
+    for start in range(0, len(entities), UPSERT_BATCH_SIZE):
+        batch = [{"ad_account_id": ad_account_id, **entity} for entity in entities[start:start + UPSERT_BATCH_SIZE]]
+        stmt = insert(CampaignEntity).values(batch)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CampaignEntity.ad_account_id, CampaignEntity.entity_id],
+            set_={**{column: stmt.excluded[column] for column in UPSERT_COLUMNS}, "updated_at": func.now()},
+            where=tuple_(*[CampaignEntity.__table__.c[column] for column in UPSERT_COLUMNS]).is_distinct_from(
+                tuple_(*[stmt.excluded[column] for column in UPSERT_COLUMNS])
+            ),
+        )
+        db.session.execute(stmt)
+
+    # Drop campaigns/ad sets that were deleted or renamed out of the so1/so2 groups
+    entity_ids = [entity["entity_id"] for entity in entities]
+    stale = CampaignEntity.query.filter(CampaignEntity.ad_account_id == ad_account_id)
+    if levels is not None:
+        stale = stale.filter(CampaignEntity.level.in_(list(levels)))
+    if campaign_types is not None:
+        stale = stale.filter(CampaignEntity.campaign_type.in_(list(campaign_types)))
+    if entity_ids:
+        stale = stale.filter(CampaignEntity.entity_id.notin_(entity_ids))
+    deleted = stale.delete(synchronize_session=False)
+
+    logging.info(f"Upserted {len(entities)} campaign entities for {ad_account_id}, removed {deleted} stale ones")
+
+
+def update_campaign_entity_status(ad_account_id, entity_id, status):
+    """Targeted status UPDATE for one campaign or ad set; the caller commits."""
+    CampaignEntity.query.filter_by(ad_account_id=ad_account_id, entity_id=entity_id).update(
+        {"status": status, "updated_at": func.now()}, synchronize_session=False
+    )
+
+
+def stored_entities(ad_account_id, levels, campaign_types):
+    """The stored snapshot rows of the given levels and campaign types, as upsert_campaign_entities dicts."""
+    rows = db.session.query(*[CampaignEntity.__table__.c[column] for column in ENTITY_COLUMNS]).filter(
+        CampaignEntity.ad_account_id == ad_account_id,
+        CampaignEntity.level.in_(list(levels)),
+        CampaignEntity.campaign_type.in_(list(campaign_types)),
+    )
+    return [dict(zip(ENTITY_COLUMNS, row)) for row in rows]
+
+
+def record_entity_sync(ad_account_id, started_at, levels=None, campaign_types=None):
+    """
+    Move the account's watermark to `started_at`; the caller commits.
+
+    A full sync passes the levels and campaign types it stored, which become the snapshot's scope.
+    An incremental sync passes neither and keeps the scope and last_full_sync_at.
+    """
+    state = db.session.get(EntitySyncState, ad_account_id)
+    if levels is not None:
+        if not state:
+            state = EntitySyncState(ad_account_id=ad_account_id)
+            db.session.add(state)
+        state.levels = sorted(levels)
+        state.campaign_types = sorted(campaign_types)
+        state.last_full_sync_at = started_at
+    if state:
+        state.updated_since = started_at
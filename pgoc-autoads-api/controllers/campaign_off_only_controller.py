@@ -1,19 +1,19 @@
 import json
 from flask import jsonify
-import redis
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import JSONB, insert
 from sqlalchemy.orm.attributes import flag_modified
-from models.models import User, db, CampaignOffOnly
+from models.models import db, CampaignOffOnly
+from models.json_queries import schedule_time
+from user_cache import invalidate_account_owner, user_exists
+from workers.campaign_name_matcher import compile_name_patterns
+from workers.on_off_functions.message_bus import delete_messages
+from workers.on_off_functions.only_add_message import MESSAGE_DOMAIN
 from datetime import datetime
 import pytz
 
 manila_tz = pytz.timezone("Asia/Manila")
 
-redis_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=11,  # Updated to Redis DB 11
-    decode_responses=True
-)
 
 def add_schedule_logic(data):
     ad_account_id = data.get("ad_account_id")
@@ -43,16 +43,21 @@ def add_schedule_logic(data):
         if schedule["on_off"] not in ["ON", "OFF"]:
             return {"error": f"Invalid on_off value for {campaign_names}. Use 'ON' or 'OFF'"}, 400
 
+        try:
+            name_patterns = compile_name_patterns(campaign_names)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+
         validated_schedule_data[f"time{index}"] = {
-            "time": schedule["time"],
+            "time": schedule_time(schedule["time"]),
             "campaign_name": campaign_names,
+            "name_patterns": name_patterns,
             "on_off": schedule["on_off"],
             "status": schedule.get("status", "Running")
         }
 
     # Validate user existence
-    user_exists = User.query.filter_by(id=user_id).first()
-    if not user_exists:
+    if not user_exists(user_id):
         return {"error": f"User with user_id {user_id} does not exist"}, 400
 
     existing_schedule = CampaignOffOnly.query.filter_by(ad_account_id=ad_account_id).first()
@@ -77,6 +82,7 @@ def add_schedule_logic(data):
 
     try:
         db.session.commit()
+        invalidate_account_owner(CampaignOffOnly, ad_account_id)
     except Exception as e:
         db.session.rollback()
         return {"error": f"Database error: {str(e)}"}, 500
@@ -137,10 +143,16 @@ def append_schedule_logic(data):
         if tuple(campaign_names) in existing_campaigns_map:
             return {"error": f"Duplicate campaign {campaign_names} already exists."}, 400
         else:
+            try:
+                name_patterns = compile_name_patterns(campaign_names)
+            except ValueError as e:
+                return {"error": str(e)}, 400
+
             new_key = f"time{len(current_schedule_data) + len(filtered_new_campaigns) + 1}"
             filtered_new_campaigns[new_key] = {
-                "time": schedule["time"],
+                "time": schedule_time(schedule["time"]),
                 "campaign_name": campaign_names,
+                "name_patterns": name_patterns,
                 "on_off": schedule["on_off"],
                 "status": "Running" 
             }
@@ -169,13 +181,12 @@ def append_schedule_logic(data):
 def remove_schedule_time_logic(data):
     user_id = str(data.get("id"))  # Convert to string to match database format
     ad_account_id = str(data.get("ad_account_id"))  # Ensure consistent string format
-    time_to_remove = str(data.get("time"))
+    time_to_remove = schedule_time(data.get("time"))
 
     if not user_id or not ad_account_id:
         return jsonify({"error": "Missing required parameters: 'id' and 'ad_account_id'"}), 400
 
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return jsonify({"error": f"User with id {user_id} not found"}), 404
 
     if time_to_remove is None:
@@ -192,7 +203,7 @@ def remove_schedule_time_logic(data):
     # Find the matching entry based on `time` and `cpp_metric`
     key_to_remove = None
     for key, entry in current_schedule_data.items():
-        if str(entry.get("time")) == time_to_remove:
+        if schedule_time(entry.get("time")) == time_to_remove:
             key_to_remove = key
             break
 
@@ -225,8 +236,7 @@ def delete_schedule_logic(data):
         return {"error": "Missing required parameters: 'id' and 'ad_account_id'"}, 400
 
     # Verify if the user exists
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return {"error": f"User with id {user_id} not found"}, 404
 
     # Check if a schedule exists for this user and ad_account_id
@@ -238,10 +248,11 @@ def delete_schedule_logic(data):
         # Delete the schedule from the database
         db.session.delete(existing_schedule)
         db.session.commit()
+        invalidate_account_owner(CampaignOffOnly, ad_account_id)
 
         # Construct Redis key and delete it
         redis_key = f"{user_id}-{ad_account_id}-key"
-        redis_websocket.delete(redis_key)  # Delete the key from Redis
+        delete_messages(MESSAGE_DOMAIN, redis_key)  # Delete the message stream
 
         return {
             "message": f"Schedule for ad_account_id {ad_account_id} linked to user {user_id} has been deleted, along with Redis key {redis_key}"
@@ -264,8 +275,7 @@ def edit_schedule_logic(data):
         return {"error": "Missing required parameters: 'id', 'ad_account_id', and 'time'"}, 400
 
     # Verify if the user exists
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return {"error": f"User with id {user_id} not found"}, 404
 
     # Fetch existing schedule
@@ -278,7 +288,7 @@ def edit_schedule_logic(data):
     # Find the schedule entry by `time`
     key_to_edit = None
     for key, entry in current_schedule_data.items():
-        if str(entry.get("time")) == str(time_to_edit):
+        if schedule_time(entry.get("time")) == schedule_time(time_to_edit):
             key_to_edit = key
             break
 
@@ -287,11 +297,19 @@ def edit_schedule_logic(data):
 
     # Apply modifications
     if new_campaign_name:
-        current_schedule_data[key_to_edit]["campaign_name"] = (
-            new_campaign_name if isinstance(new_campaign_name, list) else [new_campaign_name]
-        )
+        campaign_names = new_campaign_name if isinstance(new_campaign_name, list) else [new_campaign_name]
+        try:
+            current_schedule_data[key_to_edit]["name_patterns"] = compile_name_patterns(campaign_names)
+        except ValueError as e:
+            return {"error": str(e)}, 400
+        current_schedule_data[key_to_edit]["campaign_name"] = campaign_names
     if new_time:
-        current_schedule_data[key_to_edit]["time"] = new_time
+        new_time = schedule_time(new_time)
+        try:
+            datetime.strptime(new_time, "%H:%M")  # Validate time format
+            current_schedule_data[key_to_edit]["time"] = new_time
+        except ValueError:
+            return {"error": f"Invalid time format: {new_time}. Use HH:MM"}, 400
     if new_on_off:
         if new_on_off not in ["ON", "OFF"]:
             return {"error": "Invalid 'new_on_off' value. Use 'ON' or 'OFF'."}, 400
@@ -314,4 +332,44 @@ def edit_schedule_logic(data):
         }, 200
     except Exception as e:
         db.session.rollback()
-        return {"error": f"Database error: {str(e)}"}, 500
\ No newline at end of file
+        return {"error": f"Database error: {str(e)}"}, 500
+
+
+def record_off_only_check(ad_account_id, user_id, access_token, status, message, campaigns_data=None, merge=True):
+    """
+    Write one phase of an off-only check in a single INSERT ... ON CONFLICT statement.
+
+    Args:
+        status (str): "Ongoing", "Success" or "Failed".
+        message (str): Stored as last_check_message.
+        campaigns_data (dict | None): Campaign results for this phase; None leaves the stored ones untouched.
+        merge (bool): Merge into the stored campaigns with JSONB `||` instead of replacing them.
+
+    No row is read or locked beforehand, so nothing is held while the Graph API is being called.
+    """
+    values = {
+        "ad_account_id": ad_account_id,
+        "user_id": user_id,
+        "access_token": access_token,
+        "schedule_data": {},  # Only used when the schedule row was deleted mid-check
+        "campaigns_data": campaigns_data or {},
+        "last_time_checked": datetime.now(),
+        "last_check_status": status,
+        "last_check_message": message,
+    }
+    stmt = insert(CampaignOffOnly).values(**values)
+
+    columns = CampaignOffOnly.__table__.c
+    set_ = {column: stmt.excluded[column] for column in ("last_time_checked", "last_check_status", "last_check_message")}
+    if campaigns_data is not None:
+        set_["campaigns_data"] = (
+            func.coalesce(columns.campaigns_data, cast({}, JSONB)).op("||")(stmt.excluded.campaigns_data)
+            if merge else stmt.excluded.campaigns_data
+        )
+
+    try:
+        db.session.execute(stmt.on_conflict_do_update(index_elements=[columns.ad_account_id], set_=set_))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
@@ -79,3 +79,93 @@ def extract_insights(insights):
     if insights and "data" in insights and len(insights["data"]) > 0:
         return insights["data"][0]  # Return the first item from the "data" array
     return {}  # Return an empty dictionary if no insights or data are available
+
+
+REPORT_GRAPH_URL = "https://graph.facebook.com/v22.0"
+
+# Each level is paged on its own account-level edge, so rows stream as soon as a page arrives
+REPORT_LEVELS = {
+    "campaign": ("campaigns", "id,name,status,objective,daily_budget,bid_strategy"),
+    "adset": ("adsets", "id,name,status,campaign_id,daily_budget"),
+    "ad": ("ads", "id,name,status,campaign_id,adset_id"),
+}
+
+REPORT_INSIGHT_FIELDS = {
+    "cpp", "cpm", "cpc", "ctr", "spend", "impressions", "reach", "clicks", "frequency",
+    "actions", "cost_per_action_type",
+}
+DEFAULT_REPORT_INSIGHT_FIELDS = ("cpp", "cpm", "spend", "impressions")
+
+REPORT_DATE_PRESETS = {
+    "today", "yesterday", "this_week_mon_today", "this_week_sun_today", "last_week_mon_sun", "last_week_sun_sat",
+    "this_month", "last_month", "this_quarter", "last_quarter", "this_year", "last_year",
+    "last_3d", "last_7d", "last_14d", "last_28d", "last_30d", "last_90d", "maximum",
+}
+DEFAULT_REPORT_DATE_PRESET = "last_30d"
+
+REPORT_PAGE_SIZE = 100
+REPORT_REQUEST_TIMEOUT = 60
+
+
+def parse_report_options(args):
+    """
+    Validate the report query string.
+
+    Returns:
+        tuple: ({"levels", "insight_fields", "date_preset"}, None) or (None, error message).
+    """
+    levels = [level.strip() for level in args.get("levels", ",".join(REPORT_LEVELS)).split(",") if level.strip()]
+    unknown_levels = [level for level in levels if level not in REPORT_LEVELS]
+    if not levels or unknown_levels:
+        return None, f"levels must be a comma-separated subset of {', '.join(REPORT_LEVELS)}"
+
+    insight_fields = [field.strip() for field in args.get("fields", ",".join(DEFAULT_REPORT_INSIGHT_FIELDS)).split(",") if field.strip()]
+    unknown_fields = [field for field in insight_fields if field not in REPORT_INSIGHT_FIELDS]
+    if not insight_fields or unknown_fields:
+        return None, f"Unsupported insight fields: {', '.join(unknown_fields) or 'none given'}"
+
+    date_preset = args.get("date_preset", DEFAULT_REPORT_DATE_PRESET)
+    if date_preset not in REPORT_DATE_PRESETS:
+        return None, f"Unsupported date_preset: {date_preset}"
+
+    return {"levels": levels, "insight_fields": insight_fields, "date_preset": date_preset}, None
+
+
+def stream_insights_report(ad_account_id, access_token, levels, insight_fields, date_preset):
+    """
+    Yield one report row per campaign, ad set and ad, page by page.
+
+    Rows look like {"level": "adset", "id": ..., "name": ..., "campaign_id": ..., "insights": {...}}.
+    A final {"level": "end", "rows": n} row marks a complete report; {"level": "error", ...} ends it early.
+    """
+    insights = f"insights.date_preset({date_preset}){{{','.join(insight_fields)}}}"
+    rows = 0
+
+    with requests.Session() as session:
+        for level in levels:
+            edge, fields = REPORT_LEVELS[level]
+            url = f"{REPORT_GRAPH_URL}/act_{ad_account_id}/{edge}"
+            params = {"fields": f"{fields},{insights}", "limit": REPORT_PAGE_SIZE, "access_token": access_token}
+
+            while url:
+                try:
+                    response = session.get(url, params=params, timeout=REPORT_REQUEST_TIMEOUT)
+                except requests.exceptions.RequestException as e:
+                    yield {"level": "error", "error": "Failed to fetch data", "details": str(e)}
+                    return
+
+                if response.status_code != 200:
+                    yield {"level": "error", "error": "Failed to fetch data", "details": response.text}
+                    return
+
+                data = response.json()
+                for entity in data.get("data", []):
+                    entity_insights = extract_insights(entity.pop("insights", None))
+                    yield {"level": level, **entity, "insights": entity_insights}
+                    rows += 1
+
+                # `next` already carries every query parameter
+                url = data.get("paging", {}).get("next")
+                params = None
+
+    yield {"level": "end", "rows": rows}
@@ -0,0 +1,157 @@
+import logging
+import os
+from datetime import datetime, timedelta
+import pytz
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from models.models import db, AdsetDailyInsight, InsightsSyncState
+
+manila_tz = pytz.timezone("Asia/Manila")
+
+# Rows per INSERT ... ON CONFLICT statement
+UPSERT_BATCH_SIZE = 1000
+
+# Warehouse numbers older than this are not trusted for decisions; callers fall back to the live API
+INSIGHTS_MAX_STALENESS_MINUTES = int(os.getenv("INSIGHTS_MAX_STALENESS_MINUTES", 30))
+
+# Action types counted as a checkout by the CPP rules, in order of preference
+CHECKOUT_ACTION_TYPES = ("onsite_conversion.initiate_checkout", "omni_initiated_checkout")
+
+UPSERT_COLUMNS = ("campaign_id", "spend", "impressions", "initiate_checkouts", "actions")
+
+
+def insight_row(ad_account_id, item):
+    """Map one daily adset-level Graph insights item to an adset_daily_insights row."""
+    actions = {action["action_type"]: float(action["value"]) for action in item.get("actions", [])}
+    initiate_checkouts = next((actions[action_type] for action_type in CHECKOUT_ACTION_TYPES if action_type in actions), 0)
+
+    return {
+        "ad_account_id": ad_account_id,
+        "adset_id": item["adset_id"],
+        "date_start": item["date_start"],
+        "campaign_id": item.get("campaign_id", ""),
+        "spend": float(item.get("spend", 0)),
+        "impressions": int(item.get("impressions", 0)),
+        "initiate_checkouts": initiate_checkouts,
+        "actions": actions,
+    }
+
+
+def upsert_adset_insights(rows):
+    """Idempotent upsert of daily adset insight rows; re-syncing a day simply overwrites it. The caller commits."""
+    for start in range(0, len(rows), UPSERT_BATCH_SIZE):
+        stmt = insert(AdsetDailyInsight).values(rows[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[AdsetDailyInsight.ad_account_id, AdsetDailyInsight.adset_id, AdsetDailyInsight.date_start],
+            set_={**{column: stmt.excluded[column] for column in UPSERT_COLUMNS}, "synced_at": func.now()},
+        )
+        db.session.execute(stmt)
+
+
+def warehouse_covers(ad_account_id, since, until):
+    """True if the account's synced days include [since, until] and were refreshed recently."""
+    state = db.session.get(InsightsSyncState, ad_account_id)
+    if not state or not state.backfilled_since or not state.synced_until or not state.last_synced_at:
+        return False
+
+    fresh = datetime.now() - state.last_synced_at <= timedelta(minutes=INSIGHTS_MAX_STALENESS_MINUTES)
+    return fresh and state.backfilled_since <= since and until <= state.synced_until
+
+
+def warehouse_totals(ad_account_id, level, since, until):
+    """[(entity_id, spend, impressions, initiate_checkouts), ...] summed per campaign or adset over [since, until]."""
+    entity_column = AdsetDailyInsight.campaign_id if level == "campaign" else AdsetDailyInsight.adset_id
+    return (
+        db.session.query(
+            entity_column,
+            func.sum(AdsetDailyInsight.spend),
+            func.sum(AdsetDailyInsight.impressions),
+            func.sum(AdsetDailyInsight.initiate_checkouts),
+        )
+        .filter(
+            AdsetDailyInsight.ad_account_id == ad_account_id,
+            AdsetDailyInsight.date_start.between(since, until),
+        )
+        .group_by(entity_column)
+        .all()
+    )
+
+
+def warehouse_cpp(ad_account_id, level, since, until):
+    """
+    CPP per campaign or adset from the local warehouse.
+
+    Returns:
+        dict | None: {entity_id: cpp}, or None when the warehouse can't answer and the live API should be used.
+    """
+    if not warehouse_covers(ad_account_id, since, until):
+        return None
+
+    cpp_data = {
+        entity_id: float(spend) / checkouts if checkouts > 0 else 0
+        for entity_id, spend, _, checkouts in warehouse_totals(ad_account_id, level, since, until)
+    }
+    logging.info(f"Read {len(cpp_data)} {level} CPP values for {ad_account_id} from the insights warehouse")
+    return cpp_data
+
+
+def warehouse_spend_checkouts(ad_account_id, level, since, until):
+    """
+    Spend and checkouts per campaign or adset from the local warehouse, for rules on those metrics.
+
+    Returns:
+        dict | None: {entity_id: (spend, checkouts)}, or None when the warehouse doesn't cover the range.
+    """
+    if not warehouse_covers(ad_account_id, since, until):
+        return None
+
+    return {
+        entity_id: (float(spend), float(checkouts))
+        for entity_id, spend, _, checkouts in warehouse_totals(ad_account_id, level, since, until)
+    }
+
+
+def last_30d_range():
+    """The days Graph's default last_30d preset covers: the 30 days before today."""
+    today = datetime.now(manila_tz).date()
+    return today - timedelta(days=30), today - timedelta(days=1)
+
+
+def get_warehouse_insights(args):
+    """Spend, impressions, checkouts and CPP per campaign or adset from the warehouse."""
+    ad_account_id = args.get("ad_account_id")
+    level = args.get("level", "adset")
+
+    if not ad_account_id:
+        return {"error": "Missing required query parameter: ad_account_id"}, 400
+    if level not in ("campaign", "adset"):
+        return {"error": "level must be 'campaign' or 'adset'"}, 400
+
+    try:
+        default_since, default_until = last_30d_range()
+        since = datetime.strptime(args["since"], "%Y-%m-%d").date() if args.get("since") else default_since
+        until = datetime.strptime(args["until"], "%Y-%m-%d").date() if args.get("until") else default_until
+    except ValueError:
+        return {"error": "since and until must be YYYY-MM-DD"}, 400
+
+    state = db.session.get(InsightsSyncState, ad_account_id)
+    rows = [
+        {
+            f"{level}_id": entity_id,
+            "spend": float(spend),
+            "impressions": int(impressions),
+            "initiate_checkouts": checkouts,
+            "cpp": float(spend) / checkouts if checkouts > 0 else 0,
+        }
+        for entity_id, spend, impressions, checkouts in warehouse_totals(ad_account_id, level, since, until)
+    ]
+
+    return {
+        "ad_account_id": ad_account_id,
+        "level": level,
+        "since": since.isoformat(),
+        "until": until.isoformat(),
+        "synced_until": state.synced_until.isoformat() if state and state.synced_until else None,
+        "last_synced_at": state.last_synced_at.strftime("%Y-%m-%d %H:%M:%S") if state and state.last_synced_at else None,
+        "data": rows,
+    }, 200
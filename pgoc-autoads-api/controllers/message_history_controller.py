@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from flask import jsonify
+from sqlalchemy import tuple_
+from models.models import MessageArchive
+from workers.on_off_functions.message_bus import MESSAGE_DOMAINS
+from workers.on_off_functions.message_stream import stream_id_tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Page cursors are "{entry_id}@{redis_key}": entry IDs repeat across streams, so the stream key breaks ties
+CURSOR_SEPARATOR = "@"
+
+
+def page_cursor(row):
+    return f"{row.entry_id}{CURSOR_SEPARATOR}{row.redis_key}"
+
+
+def parse_page_cursor(cursor):
+    """(ts, seq, redis_key) of a page cursor; raises ValueError when it is malformed."""
+    entry_id, separator, redis_key = cursor.partition(CURSOR_SEPARATOR)
+    if not separator or not redis_key:
+        raise ValueError(f"Invalid page cursor: {cursor}")
+    before_ms, before_seq = stream_id_tuple(entry_id)
+    return datetime.fromtimestamp(before_ms / 1000, tz=timezone.utc), before_seq, redis_key
+
+
+def get_message_history(args):
+    """Archived messages for a user (optionally one ad account), newest first.
+
+    Paginate by passing the returned `next_before` back as `before`.
+    """
+    user_id = args.get("user_id")
+    ad_account_id = args.get("ad_account_id")
+    domain = args.get("domain")
+    before = args.get("before")
+
+    if not user_id:
+        return jsonify({"error": "Missing required query parameter: user_id"}), 400
+
+    if domain and domain not in MESSAGE_DOMAINS:
+        return jsonify({"error": f"Invalid domain. Expected one of: {', '.join(MESSAGE_DOMAINS)}"}), 400
+
+    try:
+        limit = max(1, min(int(args.get("limit", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE))
+        before_cursor = parse_page_cursor(before) if before else None
+    except (ValueError, OverflowError):
+        return jsonify({"error": "Invalid 'limit' or 'before' parameter"}), 400
+
+    # Filters follow the (user_id, ad_account_id, ts) index
+    query = MessageArchive.query.filter(MessageArchive.user_id == str(user_id))
+    if ad_account_id:
+        query = query.filter(MessageArchive.ad_account_id == ad_account_id)
+    if domain:
+        query = query.filter(MessageArchive.domain == domain)
+    if before_cursor:
+        query = query.filter(tuple_(MessageArchive.ts, MessageArchive.seq, MessageArchive.redis_key) < before_cursor)
+
+    rows = query.order_by(
+        MessageArchive.ts.desc(), MessageArchive.seq.desc(), MessageArchive.redis_key.desc()
+    ).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    return jsonify({
+        "messages": [
+            {
+                "id": row.entry_id,
+                "domain": row.domain,
+                "ad_account_id": row.ad_account_id,
+                "timestamp": row.ts.isoformat(),
+                "message": row.message,
+            }
+            for row in rows
+        ],
+        "next_before": page_cursor(rows[-1]) if has_more else None,
+    }), 200
@@ -1,16 +1,8 @@
 import time
 from flask import Blueprint, request, jsonify
-import redis
-import json
 from workers.on_off_adsets_worker import fetch_adsets
-
-# Initialize Redis connection
-redis_websocket_as = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=15,  
-    decode_responses=True
-)
+from workers.on_off_functions.message_bus import message_key_exists
+from workers.on_off_functions.on_off_adsets import MESSAGE_DOMAIN, append_redis_message_adsets
 
 def add_adset_off(data):
     data = request.get_json()
@@ -25,8 +17,8 @@ def add_adset_off(data):
 
     # Create WebSocket Redis key if it doesn’t exist
     websocket_key = f"{user_id}-key"
-    if not redis_websocket_as.exists(websocket_key):
-        redis_websocket_as.set(websocket_key, json.dumps({"message": ["User-Id Created"]}))
+    if not message_key_exists(MESSAGE_DOMAIN, websocket_key):
+        append_redis_message_adsets(user_id, "User-Id Created")
 
     # Since every call has only one schedule, directly process it
     schedule = schedule_data[0]
@@ -1,16 +1,9 @@
 import time
 from flask import Blueprint, request, jsonify
-import redis
-import json
 from workers.on_off_campaign_name_worker import fetch_campaign_off
-
-# Initialize Redis connection
-redis_on_off_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=13,  
-    decode_responses=True
-)
+from workers.campaign_name_matcher import compile_name_patterns
+from workers.on_off_functions.message_bus import message_key_exists
+from workers.on_off_functions.on_off_campaign_name import MESSAGE_DOMAIN, append_redis_message_campaigns
 
 def add_campaign_off(data):
     data = request.get_json()
@@ -25,8 +18,8 @@ def add_campaign_off(data):
 
     # Create WebSocket Redis key if it doesn’t exist
     websocket_key = f"{user_id}-key"
-    if not redis_on_off_websocket.exists(websocket_key):
-        redis_on_off_websocket.set(websocket_key, json.dumps({"message": ["User-Id Created"]}))
+    if not message_key_exists(MESSAGE_DOMAIN, websocket_key):
+        append_redis_message_campaigns(user_id, "User-Id Created")
 
     # Since every call has only one schedule, directly process it
     schedule = schedule_data[0]
@@ -43,7 +36,12 @@ def add_campaign_off(data):
     if schedule["on_off"] not in ["ON", "OFF"]:
         return jsonify({"error": f"Invalid on_off value for {campaign_names}. Use 'ON' or 'OFF'"}), 400
 
+    try:
+        schedule["name_patterns"] = compile_name_patterns(campaign_names)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Introduce a delay before calling Celery Task (delay of 3 seconds)
-    fetch_campaign_off.apply_async(args=[user_id, ad_account_id, access_token, schedule_data[0]], countdown=2)
+    fetch_campaign_off.apply_async(args=[user_id, ad_account_id, access_token, schedule], countdown=2)
 
     return jsonify({"message": "Schedule will be processed after a short delay."}), 201
@@ -0,0 +1,95 @@
+import hashlib
+import io
+import logging
+from flask import request, jsonify, make_response
+from PIL import Image
+from models.models import User, db
+
+# Longest side of the thumbnail shown in the dashboard sidebar
+THUMBNAIL_SIZE = (128, 128)
+THUMBNAIL_QUALITY = 80
+
+# URLs carry the ETag as ?v=, so browsers may reuse an image until the user uploads a new one
+PROFILE_IMAGE_CACHE_CONTROL = "private, max-age=86400"
+
+
+def prepare_profile_image(image_data):
+    """
+    Build the profile image columns for an uploaded image.
+
+    Returns:
+        dict: profile_image, profile_thumbnail (JPEG), profile_image_mimetype and profile_image_etag.
+    """
+    with Image.open(io.BytesIO(image_data)) as image:
+        mimetype = Image.MIME.get(image.format, "application/octet-stream")
+
+        thumbnail = image.convert("RGBA")
+        thumbnail.thumbnail(THUMBNAIL_SIZE)
+
+        # JPEG has no alpha channel, so flatten transparent areas onto white
+        background = Image.new("RGB", thumbnail.size, (255, 255, 255))
+        background.paste(thumbnail, mask=thumbnail.getchannel("A"))
+
+        buffer = io.BytesIO()
+        background.save(buffer, format="JPEG", quality=THUMBNAIL_QUALITY, optimize=True)
+
+    return {
+        "profile_image": image_data,
+        "profile_thumbnail": buffer.getvalue(),
+        "profile_image_mimetype": mimetype,
+        "profile_image_etag": hashlib.sha256(image_data).hexdigest()[:32],
+    }
+
+
+def profile_image_url(user, size="thumb"):
+    if not user.profile_image_etag:
+        return f"/api/v1/auth/profile-image/{user.id}?size={size}"
+    return f"/api/v1/auth/profile-image/{user.id}?size={size}&v={user.profile_image_etag}"
+
+
+def backfill_profile_image(user_id):
+    """Generate the thumbnail and ETag for a user whose image predates them. Returns the new etag or None."""
+    image_data = db.session.query(User.profile_image).filter(User.id == user_id).scalar()
+    if not image_data:
+        return None
+
+    try:
+        columns = prepare_profile_image(image_data)
+    except Exception as e:
+        logging.error(f"Failed to generate profile thumbnail for user {user_id}: {e}")
+        return None
+
+    User.query.filter_by(id=user_id).update(columns, synchronize_session=False)
+    db.session.commit()
+    return columns["profile_image_etag"]
+
+
+def get_profile_image(user_id):
+    size = request.args.get("size", "thumb")
+    if size not in ("thumb", "full"):
+        return jsonify({'message': "size must be 'thumb' or 'full'"}), 400
+
+    # Narrow read first, so revalidations never touch the blobs
+    row = db.session.query(User.profile_image_etag, User.profile_image_mimetype).filter(User.id == user_id).first()
+    if not row:
+        return jsonify({'message': 'User not found'}), 404
+
+    etag, mimetype = row
+    if not etag:
+        etag = backfill_profile_image(user_id)
+        if not etag:
+            return jsonify({'message': 'Profile image not found'}), 404
+        mimetype = db.session.query(User.profile_image_mimetype).filter(User.id == user_id).scalar()
+
+    # Thumbnail and full image share one upload, so each gets its own validator
+    etag = f"{etag}-{size}"
+    if etag in request.if_none_match:
+        response = make_response("", 304)
+    else:
+        column = User.profile_thumbnail if size == "thumb" else User.profile_image
+        response = make_response(db.session.query(column).filter(User.id == user_id).scalar())
+        response.mimetype = "image/jpeg" if size == "thumb" else mimetype
+
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = PROFILE_IMAGE_CACHE_CONTROL
+    return response
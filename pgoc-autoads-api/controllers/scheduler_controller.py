@@ -1,36 +1,46 @@
 from flask import json
-import redis
-from models.models import User, db, CampaignsScheduled
+from models.models import db, CampaignsScheduled
+from user_cache import account_owner, invalidate_account_owner, user_exists
+from models.json_queries import matching_schedules
+from workers.on_off_functions.account_message import MESSAGE_DOMAIN
+from workers.on_off_functions.message_bus import delete_messages
 from datetime import datetime
 import pytz
 from sqlalchemy.orm.attributes import flag_modified
 
 manila_tz = pytz.timezone("Asia/Manila")
 
-redis_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=10,
-    decode_responses=True
-)
 
 # Function to check for duplicate times in the database
 def check_duplicate_times(ad_account_id, schedule_data):
-    existing_schedule = CampaignsScheduled.query.filter_by(ad_account_id=ad_account_id).first()
-    
-    if existing_schedule:
-        existing_times = existing_schedule.schedule_data
-        duplicate_times = set(existing_times.values()) & set(schedule_data)
-        if duplicate_times:
-            return True, list(duplicate_times)
+    """Return (True, times) when a requested time/campaign_type/watch already exists, checked in one SQL query."""
+    existing = db.session.query(
+        matching_schedules(
+            CampaignsScheduled.schedule_data,
+            [
+                {"time": schedule["time"], "campaign_type": schedule["campaign_type"], "what_to_watch": schedule["watch"]}
+                for schedule in schedule_data
+            ],
+        )
+    ).filter(CampaignsScheduled.ad_account_id == ad_account_id).all()
+
+    existing_combos = {(entry["time"], entry["campaign_type"], entry["what_to_watch"]) for (entry,) in existing}
+    duplicate_times = [
+        schedule["time"]
+        for schedule in schedule_data
+        if (schedule["time"], schedule["campaign_type"], schedule["watch"]) in existing_combos
+    ]
+
+    if duplicate_times:
+        return True, duplicate_times
     return False, []
 
 # Function to check if the ad_account_id is already assigned to a different user
 def check_ad_account_assigned(ad_account_id, user_id):
-    existing_schedule = CampaignsScheduled.query.filter_by(ad_account_id=ad_account_id).first()
-    
-    if existing_schedule and existing_schedule.user_id != user_id:
-        return True, existing_schedule.user_id
+    owner_id = account_owner(CampaignsScheduled, ad_account_id)
+
+    if owner_id is not None and owner_id != str(user_id):
+        return True, owner_id
     return False, None
 
 def add_schedule_logic(data):
@@ -82,8 +92,7 @@ def add_schedule_logic(data):
         }, 400
 
     # Validate user existence
-    user_exists = User.query.filter_by(id=user_id).first()
-    if not user_exists:
+    if not user_exists(user_id):
         return {"error": f"User with user_id {user_id} does not exist"}, 400
 
     # Fetch existing schedule
@@ -171,6 +180,7 @@ def add_schedule_logic(data):
 
     try:
         db.session.commit()
+        invalidate_account_owner(CampaignsScheduled, ad_account_id)
     except Exception as e:
         db.session.rollback()
         return {"error": f"Database error: {str(e)}"}, 500
@@ -190,8 +200,7 @@ def remove_schedule_time_logic(data):
     if not user_id or not ad_account_id:
         return {"error": "Missing required parameters: 'id' and 'ad_account_id'"}, 400
 
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return {"error": f"User with id {user_id} not found"}, 404
 
     if not (time_to_remove and campaign_type and watch):
@@ -261,6 +270,11 @@ def append_schedule_logic(data):
         if schedule["on_off"] not in ["ON", "OFF"]:
             return {"error": f"Invalid on_off for {time_value}. Use 'ON' or 'OFF'"}, 400
 
+    # Reject duplicates before loading the schedule blob
+    has_duplicates, duplicate_times = check_duplicate_times(ad_account_id, new_schedule_data)
+    if has_duplicates:
+        return {"error": f"Duplicate time {duplicate_times[0]} already exists with the same campaign_type and watch."}, 400
+
     # Fetch existing schedule
     existing_schedule = CampaignsScheduled.query.filter_by(ad_account_id=ad_account_id).first()
     
@@ -269,29 +283,18 @@ def append_schedule_logic(data):
 
     current_schedule_data = existing_schedule.schedule_data or {}
 
-    # Convert existing schedule into a dictionary for quick lookup
-    existing_times_map = {
-        (entry["time"], entry["campaign_type"], entry["what_to_watch"]): key
-        for key, entry in current_schedule_data.items()
-    }
-
     filtered_new_times = {}
 
     for schedule in new_schedule_data:
-        time_combo = (schedule["time"], schedule["campaign_type"], schedule["watch"])
-
-        if time_combo in existing_times_map:
-            return {"error": f"Duplicate time {schedule['time']} already exists with the same campaign_type and watch."}, 400
-        else:
-            new_key = f"time{len(current_schedule_data) + len(filtered_new_times) + 1}"
-            filtered_new_times[new_key] = {
-                "time": schedule["time"],
-                "campaign_type": schedule["campaign_type"],
-                "what_to_watch": schedule["watch"],
-                "cpp_metric": schedule.get("cpp_metric", ""),
-                "on_off": schedule["on_off"],
-                "status": "Running"
-            }
+        new_key = f"time{len(current_schedule_data) + len(filtered_new_times) + 1}"
+        filtered_new_times[new_key] = {
+            "time": schedule["time"],
+            "campaign_type": schedule["campaign_type"],
+            "what_to_watch": schedule["watch"],
+            "cpp_metric": schedule.get("cpp_metric", ""),
+            "on_off": schedule["on_off"],
+            "status": "Running"
+        }
 
     if not filtered_new_times:
         return {"error": "No new schedule entries added (all are duplicates)."}, 400
@@ -321,8 +324,7 @@ def delete_schedule_logic(data):
         return {"error": "Missing required parameters: 'id' and 'ad_account_id'"}, 400
 
     # Verify if the user exists
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return {"error": f"User with id {user_id} not found"}, 404
 
     # Check if a schedule exists for this user and ad_account_id
@@ -334,10 +336,11 @@ def delete_schedule_logic(data):
         # Delete the schedule from the database
         db.session.delete(existing_schedule)
         db.session.commit()
+        invalidate_account_owner(CampaignsScheduled, ad_account_id)
 
         # Construct Redis key and delete it
         redis_key = f"{user_id}-{ad_account_id}-key"
-        redis_websocket.delete(redis_key)  # Delete the key from Redis
+        delete_messages(MESSAGE_DOMAIN, redis_key)  # Delete the message stream
 
         return {
             "message": f"Schedule for ad_account_id {ad_account_id} linked to user {user_id} has been deleted, along with Redis key {redis_key}"
@@ -361,8 +364,7 @@ def edit_schedule_campaign_logic(data):
         return {"error": "Missing required parameters: 'id', 'ad_account_id', and 'time'"}, 400
 
     # Verify if the user exists
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return {"error": f"User with id {user_id} not found"}, 404
 
     # Fetch existing schedule
@@ -1,6 +1,7 @@
 import requests
 from flask import jsonify
-from models.models import db, User
+from models.models import db
+from user_cache import user_exists
 
 FACEBOOK_GRAPH_API_URL = "https://graph.facebook.com/v22.0"
 
@@ -33,8 +34,7 @@ def verify_ad_accounts(data):
     user_id = data.get("user_id")
     campaigns = data.get("campaigns", [])
 
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    if not user_exists(user_id):
         return jsonify({"error": "Unauthorized: Not a user of Facebook-Marketing-Automation WebApp"}), 403
 
     access_token_map = {}
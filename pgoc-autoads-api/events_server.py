@@ -0,0 +1,21 @@
+from gevent import monkey
+
+# Patch sockets, threads and queues before anything imports redis or flask
+monkey.patch_all()
+
+import logging
+import os
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIServer
+from app import create_events_app
+from app.on_off_sse import SSE_MAX_CONNECTIONS
+
+app = create_events_app()
+
+if __name__ == "__main__":
+    port = int(os.getenv("EVENTS_PORT", 5096))
+
+    # Each SSE stream is a greenlet; leave a little room above the cap for rejected/plain requests
+    server = WSGIServer(("0.0.0.0", port), app, spawn=Pool(SSE_MAX_CONNECTIONS + 100), log=None)
+    logging.info(f"Serving SSE message endpoints with gevent on port {port}")
+    server.serve_forever()
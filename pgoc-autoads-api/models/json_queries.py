@@ -0,0 +1,29 @@
+import json
+from sqlalchemy import cast, func
+from sqlalchemy.dialects.postgresql import JSONB, JSONPATH
+
+
+def schedule_time(value):
+    """Schedule time as stored in schedule_data and matched by the schedulers: HH:MM, any seconds dropped."""
+    return str(value)[:5]
+
+
+def schedule_condition(equals=None, not_equals=None):
+    conditions = [f"@.{key} == {json.dumps(value)}" for key, value in (equals or {}).items()]
+    conditions += [f"@.{key} != {json.dumps(value)}" for key, value in (not_equals or {}).items()]
+    return f"({' && '.join(conditions)})"
+
+
+def any_schedule_matches(column, equals=None, not_equals=None):
+    """
+    SQL predicate: some entry of a `{"time1": {...}, "time2": {...}}` JSONB column matches.
+
+    Builds `column @? '$.* ? (@.key == "value" && ...)'` so Postgres can answer it from the GIN index.
+    """
+    return column.op("@?", is_comparison=True)(cast(f"$.* ? {schedule_condition(equals, not_equals)}", JSONPATH))
+
+
+def matching_schedules(column, equals_any):
+    """Set-returning SQL: the entries of a schedule_data column that match any of the `equals_any` dicts."""
+    conditions = " || ".join(schedule_condition(equals) for equals in equals_any)
+    return func.jsonb_path_query(column, cast(f"$.* ? ({conditions})", JSONPATH), type_=JSONB)
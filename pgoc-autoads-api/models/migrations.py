@@ -0,0 +1,183 @@
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from models.models import db, AppliedMigration, Campaign, manila_tz
+
+# Columns created as plain JSON before the switch to JSONB
+JSONB_COLUMNS = {
+    "campaign_table": ("interests_list", "exclude_ph_regions", "adsets_ads_creatives"),
+    "campaigns_scheduled": ("schedule_data", "test_campaign_data", "regular_campaign_data"),
+    "campaign_off_only": ("schedule_data", "campaigns_data"),
+}
+
+# GIN indexes backing the jsonpath (@?) schedule lookups; create_all only adds them to new tables
+JSONB_GIN_INDEXES = {
+    "ix_campaigns_scheduled_schedule_data": ("campaigns_scheduled", "schedule_data"),
+    "ix_campaign_off_only_schedule_data": ("campaign_off_only", "schedule_data"),
+}
+
+# Columns added to existing tables after they were first created; create_all never alters a table
+ADDED_COLUMNS = {
+    "marketing_users": {
+        "profile_thumbnail": "BYTEA",
+        "profile_image_mimetype": "VARCHAR(50)",
+        "profile_image_etag": "VARCHAR(64)",
+    },
+}
+
+# Serializes startup migrations when the API, Celery worker and beat boot together
+MIGRATION_LOCK_ID = 5095_0037
+
+
+# Holds rows no daily partition exists for yet, e.g. while the cleanup beat has been down past the lookahead
+CAMPAIGN_DEFAULT_PARTITION = f"{Campaign.__tablename__}_default"
+
+
+def manila_now():
+    """Naive Manila wall-clock time, which is what the writers store in campaign_table.created_at."""
+    return datetime.now(manila_tz).replace(tzinfo=None)
+
+
+def campaign_partition_name(day):
+    return f"{Campaign.__tablename__}_{day:%Y_%m_%d}"
+
+
+def create_campaign_default_partition():
+    db.session.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {CAMPAIGN_DEFAULT_PARTITION} PARTITION OF {Campaign.__tablename__} DEFAULT"
+    ))
+
+
+def create_campaign_partition(day):
+    """
+    Create the campaign_table partition holding rows created on `day` (a date).
+
+    Rows for that day that already landed in the default partition are moved into the new one,
+    since Postgres refuses to add a partition whose range the default partition still holds.
+    """
+    partition = campaign_partition_name(day)
+    if db.session.execute(text("SELECT to_regclass(:partition)"), {"partition": partition}).scalar():
+        return
+
+    bounds = {"start": day, "end": day + timedelta(days=1)}
+    db.session.execute(text(f"CREATE TABLE {partition} (LIKE {Campaign.__tablename__} INCLUDING DEFAULTS)"))
+    db.session.execute(text(
+        f"WITH moved AS (DELETE FROM {CAMPAIGN_DEFAULT_PARTITION} "
+        f"WHERE created_at >= :start AND created_at < :end RETURNING *) "
+        f"INSERT INTO {partition} SELECT * FROM moved"
+    ), bounds)
+    db.session.execute(text(
+        f"ALTER TABLE {Campaign.__tablename__} ATTACH PARTITION {partition} "
+        f"FOR VALUES FROM ('{bounds['start'].isoformat()}') TO ('{bounds['end'].isoformat()}')"
+    ))
+
+
+def migrate_json_columns_to_jsonb():
+    """Convert legacy JSON columns to JSONB and add the GIN indexes. Safe to run on every startup."""
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+
+    legacy_columns = db.session.execute(
+        text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND data_type = 'json' AND table_name = ANY(:tables)"
+        ),
+        {"tables": list(JSONB_COLUMNS)},
+    ).all()
+
+    for table_name, column_name in legacy_columns:
+        if column_name not in JSONB_COLUMNS[table_name]:
+            continue
+        logging.info(f"Migrating {table_name}.{column_name} from JSON to JSONB")
+        db.session.execute(text(f'ALTER TABLE {table_name} ALTER COLUMN {column_name} TYPE jsonb USING {column_name}::jsonb'))
+
+    for index_name, (table_name, column_name) in JSONB_GIN_INDEXES.items():
+        db.session.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} USING gin ({column_name})"))
+
+    db.session.commit()
+
+
+def claim_migration(name):
+    """True the first time a one-off migration is claimed; it is recorded as applied when the caller commits."""
+    claimed = db.session.execute(
+        insert(AppliedMigration).values(name=name).on_conflict_do_nothing().returning(AppliedMigration.name)
+    ).scalar()
+    return claimed is not None
+
+
+def normalize_schedule_times():
+    """Trim stored schedule times like "08:00:00" to the HH:MM the schedulers match. Runs once."""
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+
+    # New schedules are trimmed on write, so only rows stored before that need the full scan
+    if not claim_migration("normalize_schedule_times"):
+        db.session.commit()
+        return
+
+    for table_name, column_name in JSONB_GIN_INDEXES.values():
+        db.session.execute(text(
+            f"UPDATE {table_name} SET {column_name} = ("
+            f"SELECT jsonb_object_agg(key, CASE WHEN jsonb_typeof(value -> 'time') = 'string' "
+            f"THEN jsonb_set(value, '{{time}}', to_jsonb(left(value ->> 'time', 5))) ELSE value END) "
+            f"FROM jsonb_each({column_name})) "
+            f"WHERE {column_name} @? '$.* ? (@.time like_regex \"^.{{6,}}$\")'"
+        ))
+
+    db.session.commit()
+
+
+def partition_campaign_table(days_ahead=7):
+    """Rebuild a legacy unpartitioned campaign_table as daily partitions on created_at. Safe to run on every startup."""
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+
+    is_partitioned = db.session.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": Campaign.__tablename__},
+    ).scalar()
+    if is_partitioned:
+        db.session.commit()
+        return
+
+    # Retention keeps only a couple of days of rows, so copying them over is cheap
+    logging.info("Migrating campaign_table to daily partitions on created_at")
+    db.session.execute(text("ALTER TABLE campaign_table RENAME TO campaign_table_legacy"))
+    db.session.execute(text("ALTER TABLE campaign_table_legacy RENAME CONSTRAINT campaign_table_pkey TO campaign_table_legacy_pkey"))
+    now = manila_now()
+    db.session.execute(text("UPDATE campaign_table_legacy SET created_at = :now WHERE created_at IS NULL"), {"now": now})
+    Campaign.__table__.create(bind=db.session.connection(), checkfirst=True)  # checkfirst also skips the existing enum type
+    create_campaign_default_partition()
+
+    today = now.date()
+    first_day = db.session.execute(text("SELECT MIN(created_at)::date FROM campaign_table_legacy")).scalar() or today
+    day = first_day
+    while day <= today + timedelta(days=days_ahead):
+        create_campaign_partition(day)
+        day += timedelta(days=1)
+
+    columns = ", ".join(column.name for column in Campaign.__table__.columns)
+    db.session.execute(text(f"INSERT INTO campaign_table ({columns}) SELECT {columns} FROM campaign_table_legacy"))
+    db.session.execute(text("DROP TABLE campaign_table_legacy"))
+    db.session.commit()
+
+
+def add_missing_columns():
+    """Add the columns in ADDED_COLUMNS to tables created before them. Safe to run on every startup."""
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+
+    # ALTER TABLE takes an ACCESS EXCLUSIVE lock even with IF NOT EXISTS, so only run it for columns that are missing
+    existing_columns = set(db.session.execute(
+        text(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = current_schema() AND table_name = ANY(:tables)"
+        ),
+        {"tables": list(ADDED_COLUMNS)},
+    ).all())
+
+    for table_name, columns in ADDED_COLUMNS.items():
+        for column_name, column_type in columns.items():
+            if (table_name, column_name) in existing_columns:
+                continue
+            logging.info(f"Adding column {table_name}.{column_name}")
+            db.session.execute(text(f"ALTER TABLE {table_name} ADD COLUMN IF NOT EXISTS {column_name} {column_type}"))
+
+    db.session.commit()
@@ -2,7 +2,8 @@ from flask_sqlalchemy import SQLAlchemy
 import pytz
 from sqlalchemy.ext.mutable import MutableDict
 from sqlalchemy import func, ForeignKey
-from sqlalchemy.dialects.postgresql import JSON, BYTEA, ENUM, TIMESTAMP
+from sqlalchemy.orm import deferred
+from sqlalchemy.dialects.postgresql import JSONB, BYTEA, ENUM, TIMESTAMP
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -20,7 +21,11 @@ class User(db.Model):
     password = db.Column(db.String(255), nullable=False)
     gender = db.Column(ENUM('male', 'female', name='gender_enum'), nullable=False)
     userdomain = db.Column(db.String(100), nullable=False)
-    profile_image = db.Column(BYTEA)
+    # Image blobs are deferred so user lookups stay narrow; they are served by /api/v1/auth/profile-image
+    profile_image = deferred(db.Column(BYTEA))
+    profile_thumbnail = deferred(db.Column(BYTEA))  # JPEG generated at upload time
+    profile_image_mimetype = db.Column(db.String(50))
+    profile_image_etag = db.Column(db.String(64))  # SHA-256 prefix of profile_image
     user_status = db.Column(ENUM('active', 'inactive', name='status_enum'), default='active')
     
     # Set timezone-aware timestamp columns
@@ -36,8 +41,12 @@ class User(db.Model):
 
 class Campaign(db.Model):
     __tablename__ = 'campaign_table'
+    # Daily range partitions on created_at are created by workers.delete_campaign_data_auto.ensure_campaign_partitions
+    __table_args__ = (
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
 
-    campaign_id = db.Column(db.BigInteger, primary_key=True)  # Primary key without autoincrement
+    campaign_id = db.Column(db.BigInteger, primary_key=True, autoincrement=False)  # Primary key without autoincrement
     user_id = db.Column(db.BigInteger, ForeignKey('marketing_users.id'), nullable=False)  # Foreign key to user
     ad_account_id = db.Column(db.String(50), nullable=False)
     page_name = db.Column(db.String(255))
@@ -50,38 +59,99 @@ class Campaign(db.Model):
     primary_text = db.Column(db.Text)
     image_url = db.Column(db.String(255))
     product = db.Column(db.String(50))
-    interests_list = db.Column(JSON, nullable=True)
-    exclude_ph_regions = db.Column(JSON, nullable=True)
-    adsets_ads_creatives = db.Column(JSON, nullable=True)
+    interests_list = db.Column(JSONB, nullable=True)
+    exclude_ph_regions = db.Column(JSONB, nullable=True)
+    adsets_ads_creatives = db.Column(JSONB, nullable=True)
     is_ai = db.Column(db.Boolean, nullable=False, default=False)  # Indicates if AI generated the adsets
     access_token = db.Column(db.Text, nullable=False)
     status = db.Column(ENUM('Failed', 'Generating', 'Created', name='campaign_status_enum'), default='Generating')
     last_server_message = db.Column(db.Text)
-    created_at = db.Column(db.TIMESTAMP, server_default=func.now())
+    created_at = db.Column(db.TIMESTAMP, primary_key=True, server_default=func.now())  # Partition key, so part of the primary key
 
 class CampaignsScheduled(db.Model):
     __tablename__ = 'campaigns_scheduled'
+    # schedule_data keys (time1, time2, ...) vary, so jsonb_ops rather than jsonb_path_ops: it can serve `$.* ? (...)`
+    __table_args__ = (
+        db.Index('ix_campaigns_scheduled_schedule_data', 'schedule_data', postgresql_using='gin'),
+    )
 
     ad_account_id = db.Column(db.String(50), primary_key=True)  # Primary key as requested
     user_id = db.Column(db.BigInteger, ForeignKey('marketing_users.id'), nullable=False)
     access_token = db.Column(db.Text, nullable=False)
-    schedule_data = db.Column(MutableDict.as_mutable(JSON), nullable=False)
+    schedule_data = db.Column(MutableDict.as_mutable(JSONB), nullable=False)
     added_at = db.Column(TIMESTAMP, server_default=func.now(), nullable=False)
-    test_campaign_data = db.Column(MutableDict.as_mutable(JSON), nullable=True)
-    regular_campaign_data = db.Column(MutableDict.as_mutable(JSON), nullable=True)  # Stores multiple campaign IDs
+    test_campaign_data = db.Column(MutableDict.as_mutable(JSONB), nullable=True)
+    regular_campaign_data = db.Column(MutableDict.as_mutable(JSONB), nullable=True)  # Stores multiple campaign IDs
     last_time_checked = db.Column(TIMESTAMP, nullable=True, default=datetime.utcnow)
     last_check_status = db.Column(ENUM('Failed', 'Success', 'Ongoing', name='check_status_enum'), nullable=False, default='Success')  # Status for last check
     last_check_message = db.Column(db.Text, nullable=True)   # Tracks the last time campaigns were checked
     task_id = db.Column(db.String(255), nullable=True)
 
+class CampaignEntity(db.Model):
+    __tablename__ = 'campaign_entities'
+    # One row per campaign / ad set fetched for a scheduled ad account
+    __table_args__ = (
+        db.Index('ix_campaign_entities_account_type_level', 'ad_account_id', 'campaign_type', 'level'),
+    )
+
+    ad_account_id = db.Column(db.String(50), primary_key=True)
+    entity_id = db.Column(db.String(50), primary_key=True)  # Facebook campaign or ad set ID
+    parent_id = db.Column(db.String(50), nullable=True)  # Campaign ID for ad sets
+    level = db.Column(ENUM('campaign', 'adset', name='entity_level_enum'), nullable=False)
+    campaign_type = db.Column(ENUM('TEST', 'REGULAR', name='entity_campaign_type_enum'), nullable=False)
+    name = db.Column(db.String(255))
+    status = db.Column(db.String(20))
+    cpp = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class EntitySyncState(db.Model):
+    __tablename__ = 'entity_sync_state'
+    # What the campaign_entities snapshot of an ad account covers, for incremental fetches
+
+    ad_account_id = db.Column(db.String(50), primary_key=True)
+    levels = db.Column(JSONB, nullable=False)  # Levels the last full sync stored, e.g. ["adset", "campaign"]
+    campaign_types = db.Column(JSONB, nullable=False)  # Campaign types the last full sync stored
+    updated_since = db.Column(TIMESTAMP, nullable=False)  # Watermark (UTC): changes after this still need fetching
+    last_full_sync_at = db.Column(TIMESTAMP, nullable=False)  # UTC
+
+class AdsetDailyInsight(db.Model):
+    __tablename__ = 'adset_daily_insights'
+    # Local copy of daily ad set insights, synced by workers.insights_warehouse
+    __table_args__ = (
+        db.Index('ix_adset_daily_insights_account_date', 'ad_account_id', 'date_start'),
+    )
+
+    ad_account_id = db.Column(db.String(50), primary_key=True)
+    adset_id = db.Column(db.String(50), primary_key=True)
+    date_start = db.Column(db.Date, primary_key=True)  # Day in the ad account's timezone
+    campaign_id = db.Column(db.String(50), nullable=False)
+    spend = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    impressions = db.Column(db.BigInteger, nullable=False, default=0)
+    initiate_checkouts = db.Column(db.Float, nullable=False, default=0)  # Same action types the CPP rules use
+    actions = db.Column(JSONB, nullable=True)  # Raw {action_type: value}
+    synced_at = db.Column(TIMESTAMP, server_default=func.now(), onupdate=func.now(), nullable=False)
+
+class InsightsSyncState(db.Model):
+    __tablename__ = 'insights_sync_state'
+
+    ad_account_id = db.Column(db.String(50), primary_key=True)
+    backfilled_since = db.Column(db.Date, nullable=True)  # Oldest day held for this account
+    synced_until = db.Column(db.Date, nullable=True)  # Watermark: newest day synced
+    last_synced_at = db.Column(TIMESTAMP, nullable=True)
+    last_sync_status = db.Column(ENUM('Failed', 'Success', 'Ongoing', name='insights_sync_status_enum'), nullable=True)
+    last_sync_message = db.Column(db.Text, nullable=True)
+
 class CampaignOffOnly(db.Model):
     __tablename__ = 'campaign_off_only'
+    __table_args__ = (
+        db.Index('ix_campaign_off_only_schedule_data', 'schedule_data', postgresql_using='gin'),
+    )
 
     ad_account_id = db.Column(db.String(50), primary_key=True)  # Primary key
     user_id = db.Column(db.BigInteger, ForeignKey('marketing_users.id'), nullable=False)
     access_token = db.Column(db.Text, nullable=False)
-    schedule_data = db.Column(MutableDict.as_mutable(JSON), nullable=False)
-    campaigns_data = db.Column(MutableDict.as_mutable(JSON), nullable=True)  # Single field for campaigns data
+    schedule_data = db.Column(MutableDict.as_mutable(JSONB), nullable=False)
+    campaigns_data = db.Column(MutableDict.as_mutable(JSONB), nullable=True)  # Single field for campaigns data
     added_at = db.Column(TIMESTAMP, server_default=func.now(), nullable=False)
     last_time_checked = db.Column(TIMESTAMP, nullable=True, default=datetime.utcnow)
     last_check_status = db.Column(ENUM('Failed', 'Success', 'Ongoing', name='campaign_off_status_enum'),
@@ -90,6 +160,14 @@ class CampaignOffOnly(db.Model):
     task_id = db.Column(db.String(255), nullable=True)  # Celery task tracking
 
 
+class AppliedMigration(db.Model):
+    __tablename__ = "applied_migrations"
+    # One-off data migrations in models.migrations that already ran, so startup skips them
+
+    name = db.Column(db.String(100), primary_key=True)
+    applied_at = db.Column(TIMESTAMP, server_default=func.now(), nullable=False)
+
+
 class PHRegionTable(db.Model):
     __tablename__ = "ph_region_tables"
 
@@ -97,3 +175,21 @@ class PHRegionTable(db.Model):
     region_name = db.Column(db.String(100), nullable=False)
     region_key = db.Column(db.Integer, unique=True, nullable=False)
     country_code = db.Column(db.String(10), nullable=False, default="PH")
+
+
+class MessageArchive(db.Model):
+    __tablename__ = "message_archive"
+    # Monthly range partitions on ts are created by workers.message_archive.ensure_message_archive_partitions
+    __table_args__ = (
+        db.Index("ix_message_archive_user_account_ts", "user_id", "ad_account_id", "ts"),
+        {"postgresql_partition_by": "RANGE (ts)"},
+    )
+
+    redis_key = db.Column(db.String(255), primary_key=True)  # messages:{domain}:{key}
+    entry_id = db.Column(db.String(40), primary_key=True)  # Redis stream entry ID
+    ts = db.Column(TIMESTAMP(timezone=True), primary_key=True)  # Taken from the entry ID
+    seq = db.Column(db.Integer, nullable=False, default=0)  # Entry ID sequence, orders messages within one ms
+    domain = db.Column(db.String(30), nullable=False)
+    user_id = db.Column(db.String(50), nullable=False)
+    ad_account_id = db.Column(db.String(50), nullable=True)  # Only the on_off and only domains are per account
+    message = db.Column(db.Text, nullable=False)
@@ -0,0 +1,82 @@
+import logging
+import os
+import threading
+import time
+import redis
+from redis.backoff import ExponentialBackoff
+from redis.retry import Retry
+
+# One connection pool per logical DB, shared by every module in the process.
+# Connections are only opened by the first command, so a Redis outage never breaks imports.
+REDIS_HOST = os.getenv("REDIS_HOST", "redisAds")
+REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
+REDIS_PASSWORD = os.getenv("REDIS_PASSWORD") or None
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))  # Per DB, per process
+REDIS_POOL_TIMEOUT = int(os.getenv("REDIS_POOL_TIMEOUT", 5))  # Seconds to wait for a free connection
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", 10))
+REDIS_RETRIES = int(os.getenv("REDIS_RETRIES", 3))
+REDIS_HEALTH_CHECK_INTERVAL = 30  # Seconds idle before a pooled connection is PINGed on checkout
+
+_pools = {}  # {db: redis.BlockingConnectionPool}
+_clients = {}  # {db: redis.Redis}
+_registry_lock = threading.Lock()
+
+
+def _build_pool(db):
+    return redis.BlockingConnectionPool(
+        host=REDIS_HOST,
+        port=REDIS_PORT,
+        password=REDIS_PASSWORD,
+        db=db,
+        decode_responses=True,  # Ensures Redis returns strings
+        max_connections=REDIS_MAX_CONNECTIONS,
+        timeout=REDIS_POOL_TIMEOUT,
+        # Pub/sub listeners block on reads, so only connects get a timeout
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+        retry=Retry(ExponentialBackoff(cap=2, base=0.1), REDIS_RETRIES),
+        retry_on_error=[redis.exceptions.ConnectionError, redis.exceptions.TimeoutError],
+    )
+
+
+def get_redis(db):
+    """Shared client for a logical Redis DB; its pool is created on first use."""
+    client = _clients.get(db)
+    if client is not None:
+        return client
+
+    with _registry_lock:
+        if db not in _clients:
+            _pools[db] = _build_pool(db)
+            _clients[db] = redis.Redis(connection_pool=_pools[db])
+            logging.info(f"Created Redis pool for {REDIS_HOST}:{REDIS_PORT}/{db}")
+        return _clients[db]
+
+
+def redis_metrics():
+    """Connection counts for every pool created in this process."""
+    metrics = {}
+    for db, pool in list(_pools.items()):
+        created = len(getattr(pool, "_connections", []))
+        idle = sum(1 for connection in list(pool.pool.queue) if connection is not None)
+        metrics[db] = {
+            "max_connections": pool.max_connections,
+            "created_connections": created,
+            "in_use_connections": created - idle,
+            "idle_connections": idle,
+        }
+    return metrics
+
+
+def redis_health():
+    """PING every DB this process uses. Returns `(healthy, {db: {"ok", "latency_ms" | "error"}})`."""
+    results = {}
+    for db, client in list(_clients.items()):
+        started = time.monotonic()
+        try:
+            client.ping()
+            results[db] = {"ok": True, "latency_ms": round((time.monotonic() - started) * 1000, 2)}
+        except redis.exceptions.RedisError as e:
+            results[db] = {"ok": False, "error": str(e)}
+
+    return all(result["ok"] for result in results.values()), results
@@ -1,7 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import create_access_token
 from datetime import timedelta, datetime
-from controllers.authentication_controller import register, login, get_user_data_by_id
+from controllers.authentication_controller import register, login, logout, get_session_status, get_user_data_by_id
+from controllers.profile_image_controller import get_profile_image
 
 # Create Blueprint
 auth_bp = Blueprint('auth', __name__)
@@ -16,7 +17,18 @@ def register_user():
 def login_user():
     return login()
 
+@auth_bp.route('/logout', methods=['POST'])
+def logout_user():
+    return logout()
+
+@auth_bp.route('/session', methods=['GET'])
+def session_status():
+    return get_session_status()
+
 @auth_bp.route('/get-user-data', methods=['GET'])
 def get_user_data():
     return get_user_data_by_id()
 
+@auth_bp.route('/profile-image/<int:user_id>', methods=['GET'])
+def profile_image(user_id):
+    return get_profile_image(user_id)
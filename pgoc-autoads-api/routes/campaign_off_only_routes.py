@@ -1,8 +1,5 @@
-from datetime import datetime, timedelta
-import json
 from flask import Blueprint, request, jsonify
 import pytz
-import redis
 from controllers.campaign_off_only_controller import (
     add_schedule_logic,
     remove_schedule_time_logic,
@@ -11,8 +8,9 @@ from controllers.campaign_off_only_controller import (
     edit_schedule_logic
 )
 from models.models import User, db, CampaignOffOnly
+from workers.on_off_functions.only_add_message import MESSAGE_DOMAIN, append_redis_message2
+from workers.on_off_functions.message_bus import message_key_exists
 manila_tz = pytz.timezone("Asia/Manila")
-redis_websocket = redis.Redis(host="redisAds", port=6379, db=11, decode_responses=True)
 
 schedule_campaign_only_bp = Blueprint("schedule", __name__)
 
@@ -50,15 +48,6 @@ def get_campaign_schedules():
 
     user_schedules = CampaignOffOnly.query.filter_by(user_id=user_id).all()
 
-    # Get current time in Manila timezone
-    now = datetime.now(manila_tz)
-    
-    # Get next midnight (12:00 AM Manila time)
-    tomorrow_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-    
-    # Convert to UNIX timestamp
-    expire_timestamp = int(tomorrow_midnight.timestamp())
-
     ad_accounts = []
     
     for schedule in user_schedules:
@@ -66,10 +55,9 @@ def get_campaign_schedules():
         redis_key = f"{user_id}-{ad_account_id}-key"
 
         # Check if the key exists in Redis
-        if not redis_websocket.exists(redis_key):
-            # Create default Redis entry with only a "message" field
-            redis_websocket.set(redis_key, json.dumps({"message": [f"Last Check Message: {schedule.last_check_message}"] or ["No recent activity"]}))
-            redis_websocket.expireat(redis_key, expire_timestamp)  # Expire at 12:00 AM Manila time
+        if not message_key_exists(MESSAGE_DOMAIN, redis_key):
+            # Seed the message stream with the last check message (expires at 12:00 AM)
+            append_redis_message2(user_id, ad_account_id, f"Last Check Message: {schedule.last_check_message or 'No recent activity'}")
 
         ad_accounts.append({
             "ad_account_id": ad_account_id,
@@ -1,17 +1,14 @@
 from datetime import datetime, timedelta
-import json
 import logging
 from flask import Blueprint, request, jsonify
 import pytz
-import redis
 from sqlalchemy import or_
 from controllers.create_ads_controller import create_campaign
 from workers.create_campaig_celery import create_full_campaign_task, create_simple_campaign_task
-from models.models import PHRegionTable, User, db, Campaign
-from datetime import datetime
+from models.models import PHRegionTable, db, Campaign
+from user_cache import user_exists
 from sqlalchemy.exc import SQLAlchemyError
 from controllers.insert_campaign_controller import upsert_campaign_data
-from datetime import datetime, timedelta
 
 from workers.on_off_functions.create_campaign_message import append_redis_message_create_campaigns
 
@@ -29,8 +26,7 @@ def create_full_campaign():
         # Validate user_id before proceeding
         if not user_id:
             raise ValueError("No user_id provided.")
-        user = db.session.query(User).filter_by(id=user_id).first()
-        if not user:
+        if not user_exists(user_id):
             raise ValueError(f"Invalid user_id: {user_id}. User not found.")
 
         results = []
@@ -170,14 +166,8 @@ def create_full_campaign():
         logging.error(f"Critical error during campaign creation: {str(e)}")
         return jsonify({"error": "An error occurred", "details": str(e)}), 500
         
-redis_on_off_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=14,  
-    decode_responses=True
-)
-
-from workers.on_off_functions.create_campaign_message import append_redis_message_create_campaigns
+from workers.on_off_functions.create_campaign_message import MESSAGE_DOMAIN, append_redis_message_create_campaigns
+from workers.on_off_functions.message_bus import message_key_exists
 
 @createbp.route('/create-campaigns', methods=['POST'])
 def create_multiple_simple_campaigns():
@@ -195,15 +185,14 @@ def create_multiple_simple_campaigns():
             append_redis_message_create_campaigns("Unknown", "[ERROR] No user_id provided.")
             raise ValueError("No user_id provided.")
         
-        user = db.session.query(User).filter_by(id=user_id).first()
-        if not user:
+        if not user_exists(user_id):
             append_redis_message_create_campaigns(user_id, f"[ERROR] Invalid user_id: {user_id}. User not found.")
             raise ValueError(f"Invalid user_id: {user_id}. User not found.")
         
         # Create WebSocket Redis key if it doesn’t exist
         websocket_key = f"{user_id}-key"
-        if not redis_on_off_websocket.exists(websocket_key):
-            redis_on_off_websocket.set(websocket_key, json.dumps({"message": ["User-Id Created"]}))
+        if not message_key_exists(MESSAGE_DOMAIN, websocket_key):
+            append_redis_message_create_campaigns(user_id, "User-Id Created")
             append_redis_message_create_campaigns(user_id, "[INFO] WebSocket key created.")
 
         tasks = []
@@ -346,8 +335,7 @@ def get_user_campaigns():
         if not user_id:
             return jsonify({"error": "User ID is required"}), 400
 
-        user = db.session.query(User).filter_by(id=user_id).first()
-        if not user:
+        if not user_exists(user_id):
             return jsonify({"error": f"User with ID {user_id} not found"}), 404
 
         campaigns = db.session.query(Campaign).filter_by(user_id=user_id).all()
@@ -1,5 +1,7 @@
-from flask import Blueprint, request, jsonify
-from controllers.fetch_ads_controller import fetch_campaigns_with_insights  # Updated import
+import json
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from controllers.fetch_ads_controller import fetch_campaigns_with_insights, parse_report_options, stream_insights_report
+from controllers.insights_warehouse_controller import get_warehouse_insights
 
 # Create the Blueprint for the route
 fetch_campaign_adsets_ads_creatives_bp = Blueprint('fetch_campaign_adsets_ads_creatives_bp', __name__)
@@ -20,3 +22,34 @@ def fetch_campaign_adsets_ads_creatives_route():
 
     # Return the result as JSON
     return jsonify(result)
+
+
+# Streaming report: one NDJSON row per campaign/adset/ad, sent as each Graph page arrives
+@fetch_campaign_adsets_ads_creatives_bp.route('/insights-report', methods=['GET'])
+def insights_report_route():
+    ad_account_id = request.args.get('ad_account_id')
+    access_token = request.args.get('access_token')
+
+    if not ad_account_id or not access_token:
+        return jsonify({"error": "Missing required parameters: ad_account_id and access_token"}), 400
+
+    options, error = parse_report_options(request.args)
+    if error:
+        return jsonify({"error": error}), 400
+
+    def generate():
+        for row in stream_insights_report(ad_account_id, access_token, **options):
+            yield json.dumps(row) + "\n"
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+# Aggregated insights from the local warehouse: no Graph API call
+@fetch_campaign_adsets_ads_creatives_bp.route('/warehouse-insights', methods=['GET'])
+def warehouse_insights_route():
+    response, status_code = get_warehouse_insights(request.args)
+    return jsonify(response), status_code
@@ -1,12 +1,13 @@
 from flask import Blueprint, render_template, request, jsonify
 import os
-import redis
 from flask_bcrypt import Bcrypt
 from dotenv import load_dotenv
 import uuid
 from sqlalchemy.exc import SQLAlchemyError
 from models.models import db, User
 from workers.send_email import send_email_task  # Import shared task
+from redis_registry import get_redis
+from session_store import delete_user_sessions
 
 # Load environment variables
 load_dotenv()
@@ -16,7 +17,7 @@ bcrypt = Bcrypt()
 password_reset_bp = Blueprint('password_reset', __name__)
 
 # Redis client for token management
-redis_client_password = redis.Redis(host='redis', port=6379, db=5, decode_responses=True)
+redis_client_password = get_redis(5)
 
 
 # Generate a unique reset token (UUID)
@@ -94,6 +95,7 @@ def reset_user_password(token):
         if user:
             user.password = hashed_password
             db.session.commit()
+            delete_user_sessions(user.id)  # Log out every device using the old password
 
         # Delete the token from Redis after successful reset
         redis_client_password.delete(f"reset_token:{token}")
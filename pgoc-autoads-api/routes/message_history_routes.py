@@ -0,0 +1,8 @@
+from flask import Blueprint, request
+from controllers.message_history_controller import get_message_history
+
+message_history_bp = Blueprint("message_history", __name__)
+
+@message_history_bp.route("", methods=["GET"])
+def message_history():
+    return get_message_history(request.args)
@@ -1,5 +1,4 @@
 from flask import Blueprint, request
-import redis
 from controllers.on_off_adsets_controller import add_adset_off
 
 adsets_on_off = Blueprint("adsets_on_off", __name__)
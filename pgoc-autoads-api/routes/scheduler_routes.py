@@ -1,14 +1,12 @@
-import json
 from flask import Blueprint, request, jsonify
 import pytz
-import redis
 from controllers.scheduler_controller import add_schedule_logic, append_schedule_logic, delete_schedule_logic, edit_schedule_campaign_logic, remove_schedule_time_logic
 from models.models import User, db, CampaignsScheduled
-from datetime import datetime, timedelta
+from workers.on_off_functions.account_message import MESSAGE_DOMAIN, append_redis_message
+from workers.on_off_functions.message_bus import message_key_exists
 
 schedule_bp = Blueprint("schedule_bp", __name__)
 
-redis_websocket = redis.Redis(host="redisAds", port=6379, db=10, decode_responses=True)
 manila_tz = pytz.timezone("Asia/Manila")
 
 @schedule_bp.route("/create-campaign-schedule", methods=["POST"])
@@ -70,15 +68,6 @@ def get_user_ad_accounts():
 
     user_schedules = CampaignsScheduled.query.filter_by(user_id=user_id).all()
 
-    # Get current time in Manila timezone
-    now = datetime.now(manila_tz)
-    
-    # Get next midnight (12:00 AM Manila time)
-    tomorrow_midnight = now.replace(hour=0, minute=0, second=0, microsecond=0) + timedelta(days=1)
-    
-    # Convert to UNIX timestamp
-    expire_timestamp = int(tomorrow_midnight.timestamp())
-
     ad_accounts = []
     
     for schedule in user_schedules:
@@ -86,10 +75,9 @@ def get_user_ad_accounts():
         redis_key = f"{user_id}-{ad_account_id}-key"
 
         # Check if the key exists in Redis
-        if not redis_websocket.exists(redis_key):
-            # Create default Redis entry with only a "message" field
-            redis_websocket.set(redis_key, json.dumps({"message": [f"Last Check Message: {schedule.last_check_message}"] or ["No recent activity"]}))
-            redis_websocket.expireat(redis_key, expire_timestamp)  # Expire at 12:00 AM Manila time
+        if not message_key_exists(MESSAGE_DOMAIN, redis_key):
+            # Seed the message stream with the last check message (expires at 12:00 AM)
+            append_redis_message(user_id, ad_account_id, f"Last Check Message: {schedule.last_check_message or 'No recent activity'}")
 
         ad_accounts.append({
             "ad_account_id": ad_account_id,
@@ -1,16 +1,16 @@
 from flask import Blueprint, request, jsonify, render_template
-import redis
 from models.models import db, User
 from datetime import datetime
 from uuid import uuid4
 from sqlalchemy.exc import SQLAlchemyError
 from workers.send_email import send_email_task  # Import shared task
+from redis_registry import get_redis
 
 # Initialize Blueprint
 email_verification_bp = Blueprint('email_verification', __name__)
 
 # Redis client for email verification (db=6)
-redis_client_email = redis.Redis(host='redis', port=6379, db=6, decode_responses=True)
+redis_client_email = get_redis(6)
 
 # Generate a unique verification code (UUID)
 def generate_verification_code():
@@ -0,0 +1,101 @@
+import os
+import secrets
+import time
+from redis_registry import get_redis
+
+# Login sessions: one hash per session plus a per-user index, so no lookup ever scans the keyspace.
+#   session:{sid}            -> hash {user_id, username, created_at, last_seen}, expires after SESSION_TTL_SECONDS idle
+#   user-sessions:{user_id}  -> sorted set {sid: last_seen}, used to cap and revoke a user's sessions
+SESSION_DB = 1
+SESSION_TTL_SECONDS = int(os.getenv("SESSION_TTL_SECONDS", 7 * 24 * 3600))
+MAX_SESSIONS_PER_USER = int(os.getenv("MAX_SESSIONS_PER_USER", 10))
+
+SESSION_PREFIX = "session"
+USER_SESSIONS_PREFIX = "user-sessions"
+
+session_redis = get_redis(SESSION_DB)
+
+
+def session_key(sid):
+    return f"{SESSION_PREFIX}:{sid}"
+
+
+def user_sessions_key(user_id):
+    return f"{USER_SESSIONS_PREFIX}:{user_id}"
+
+
+def create_session(user_id, username):
+    """Start a session for a user, evicting their least recently used ones past MAX_SESSIONS_PER_USER. Returns the sid."""
+    sid = secrets.token_urlsafe(32)
+    now = time.time()
+    index_key = user_sessions_key(user_id)
+
+    with session_redis.pipeline(transaction=True) as pipe:
+        pipe.hset(session_key(sid), mapping={
+            "user_id": str(user_id),
+            "username": username,
+            "created_at": int(now),
+            "last_seen": int(now),
+        })
+        pipe.expire(session_key(sid), SESSION_TTL_SECONDS)
+        pipe.zadd(index_key, {sid: now})
+        pipe.zremrangebyscore(index_key, "-inf", now - SESSION_TTL_SECONDS)  # Sessions that already expired
+        pipe.expire(index_key, SESSION_TTL_SECONDS)
+        pipe.zrange(index_key, 0, -(MAX_SESSIONS_PER_USER + 1))  # Oldest sessions over the cap
+        evicted = pipe.execute()[-1]
+
+    if evicted:
+        with session_redis.pipeline(transaction=True) as pipe:
+            pipe.delete(*[session_key(old_sid) for old_sid in evicted])
+            pipe.zrem(index_key, *evicted)
+            pipe.execute()
+
+    return sid
+
+
+def get_session(sid):
+    """The session hash, or None if it expired or was revoked."""
+    return session_redis.hgetall(session_key(sid)) or None
+
+
+def touch_session(sid):
+    """Refresh an active session's TTL. Returns the session, or None if it no longer exists."""
+    session = get_session(sid)
+    if not session:
+        return None
+
+    now = time.time()
+    index_key = user_sessions_key(session["user_id"])
+    with session_redis.pipeline(transaction=True) as pipe:
+        pipe.hset(session_key(sid), "last_seen", int(now))
+        pipe.expire(session_key(sid), SESSION_TTL_SECONDS)
+        pipe.zadd(index_key, {sid: now}, xx=True)
+        pipe.expire(index_key, SESSION_TTL_SECONDS)
+        pipe.execute()
+
+    return session
+
+
+def delete_session(sid):
+    session = get_session(sid)
+    if not session:
+        return False
+
+    with session_redis.pipeline(transaction=True) as pipe:
+        pipe.delete(session_key(sid))
+        pipe.zrem(user_sessions_key(session["user_id"]), sid)
+        pipe.execute()
+    return True
+
+
+def delete_user_sessions(user_id):
+    """Revoke every session of a user, e.g. after a password reset or deactivation."""
+    index_key = user_sessions_key(user_id)
+    sids = session_redis.zrange(index_key, 0, -1)
+
+    with session_redis.pipeline(transaction=True) as pipe:
+        if sids:
+            pipe.delete(*[session_key(sid) for sid in sids])
+        pipe.delete(index_key)
+        pipe.execute()
+    return len(sids)
@@ -0,0 +1,133 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import redis
+from models.models import db, User
+from redis_registry import get_redis
+
+# Read-through cache for "does this user exist" and "who owns this ad account" checks.
+# Lookups go in-process LRU -> Redis -> Postgres. Only positive facts are kept in the LRU,
+# because other processes can only invalidate the shared Redis copy.
+USER_CACHE_DB = int(os.getenv("USER_CACHE_DB", 11))
+USER_CACHE_TTL_SECONDS = int(os.getenv("USER_CACHE_TTL_SECONDS", 300))
+USER_CACHE_NEGATIVE_TTL_SECONDS = 60  # Misses expire quickly so new rows are never hidden for long
+LOCAL_CACHE_TTL_SECONDS = 15
+LOCAL_CACHE_SIZE = 4096
+
+CACHE_PREFIX = "user-cache"
+MISSING = ""  # Stored in Redis for rows that do not exist
+
+user_cache_redis = get_redis(USER_CACHE_DB)
+
+
+class LRUCache:
+    """Thread-safe LRU of `key -> value` entries that expire after `ttl` seconds."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # {key: (expires_at, value)}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+
+local_cache = LRUCache(LOCAL_CACHE_SIZE, LOCAL_CACHE_TTL_SECONDS)
+
+
+def read_through(cache_key, load):
+    """Cached string value for `cache_key`, calling `load()` on a miss. `load` returns a string or None."""
+    value = local_cache.get(cache_key)
+    if value is not None:
+        return value
+
+    try:
+        value = user_cache_redis.get(cache_key)
+    except redis.exceptions.RedisError as e:
+        logging.warning(f"User cache unavailable, reading {cache_key} from Postgres: {e}")
+        return load()
+
+    if value is None:
+        value = load()
+        try:
+            if value is None:
+                user_cache_redis.set(cache_key, MISSING, ex=USER_CACHE_NEGATIVE_TTL_SECONDS)
+            else:
+                user_cache_redis.set(cache_key, value, ex=USER_CACHE_TTL_SECONDS)
+        except redis.exceptions.RedisError as e:
+            logging.warning(f"Failed to cache {cache_key}: {e}")
+    elif value == MISSING:
+        return None
+
+    if value is not None:
+        local_cache.set(cache_key, value)
+    return value
+
+
+def invalidate(cache_key):
+    local_cache.delete(cache_key)
+    try:
+        user_cache_redis.delete(cache_key)
+    except redis.exceptions.RedisError as e:
+        logging.warning(f"Failed to invalidate {cache_key}: {e}")
+
+
+def user_cache_key(user_id):
+    return f"{CACHE_PREFIX}:user:{user_id}"
+
+
+def account_owner_cache_key(model, ad_account_id):
+    return f"{CACHE_PREFIX}:owner:{model.__tablename__}:{ad_account_id}"
+
+
+def user_exists(user_id):
+    """True if a marketing user with this primary key exists."""
+    user_id = str(user_id)
+    if not user_id.isdigit():
+        return False
+
+    def load():
+        return "1" if db.session.query(User.id).filter(User.id == int(user_id)).first() else None
+
+    return read_through(user_cache_key(user_id), load) is not None
+
+
+def account_owner(model, ad_account_id):
+    """user_id (as a string) that owns the ad account's schedule row in `model`, or None."""
+    def load():
+        owner = db.session.query(model.user_id).filter(model.ad_account_id == str(ad_account_id)).scalar()
+        return str(owner) if owner is not None else None
+
+    return read_through(account_owner_cache_key(model, ad_account_id), load)
+
+
+def invalidate_user(user_id):
+    """Call after a user is registered or deleted."""
+    invalidate(user_cache_key(user_id))
+
+
+def invalidate_account_owner(model, ad_account_id):
+    """Call after a schedule row in `model` is created, reassigned or deleted."""
+    invalidate(account_owner_cache_key(model, ad_account_id))
@@ -1,18 +1,21 @@
 import logging
-import re
-import redis
 import pytz
 import requests
 import json
 from celery import shared_task
 from datetime import datetime
-from sqlalchemy.orm.attributes import flag_modified
-from models.models import db, CampaignsScheduled  
+from models.models import db, CampaignsScheduled, EntitySyncState
+from controllers.campaign_entity_controller import record_entity_sync, stored_entities, upsert_campaign_entities
+from controllers.insights_warehouse_controller import last_30d_range, warehouse_cpp
 from workers.on_off_functions.account_message import append_redis_message
 from workers.update_status import process_scheduled_campaigns
+from workers.fetch_planner import plan_fetch
+from workers.campaign_filters import fetch_classified_campaigns
+from workers.entity_sync import entity_row, fetch_changed_entities, full_sync_scope, incremental_scope
+from redis_registry import get_redis
 
 # Redis Client
-redis_client = redis.StrictRedis(host="redisAds", port=6379, db=2, decode_responses=True)
+redis_client = get_redis(2)
 
 # Timezone
 manila_tz = pytz.timezone("Asia/Manila")
@@ -21,25 +24,6 @@ manila_tz = pytz.timezone("Asia/Manila")
 FACEBOOK_API_VERSION = "v22.0"
 FACEBOOK_GRAPH_URL = f"https://graph.facebook.com/{FACEBOOK_API_VERSION}"
 
-# Compile regex once for performance
-NON_ALPHANUMERIC_REGEX = re.compile(r'[^a-zA-Z0-9]+')
-
-
-def normalize_text(text):
-    """Replace all non-alphanumeric characters with spaces and split into words."""
-    return NON_ALPHANUMERIC_REGEX.sub(' ', text).lower().split()
-
-
-def contains_test(text):
-    """Check if 'so1' exists as a separate word in campaign_name."""
-    return "so1" in normalize_text(text)
-
-
-def contains_regular(text):
-    """Check if 'so2' exists as a separate word in campaign_name."""
-    return "so2" in normalize_text(text)
-
-
 def fetch_facebook_data(url, access_token):
     """Fetch data from Facebook API and handle errors."""
     try:
@@ -86,14 +70,28 @@ def get_cpp_from_insights(ad_account_id, access_token, level):
     return cpp_data
 
 
+def get_cpp(ad_account_id, access_token, level):
+    """CPP per entity over Graph's default last_30d window, from the insights warehouse when it is fresh."""
+    since, until = last_30d_range()
+    cpp_data = warehouse_cpp(ad_account_id, level, since, until)
+    if cpp_data is None:
+        cpp_data = get_cpp_from_insights(ad_account_id, access_token, level)
+    return cpp_data
+
+
 @shared_task
 def fetch_campaign(user_id, ad_account_id, access_token, matched_schedule):
-    """Fetch campaigns for an ad account and store structured data in CampaignsScheduled."""
+    """Fetch campaigns for an ad account and store them as rows in campaign_entities.
+    `matched_schedule` is one schedule or the list of schedules that fired together; only what they watch is fetched.
+    """
     lock_key = f"lock:fetch_campaign:{ad_account_id}"
     lock = redis_client.lock(lock_key, timeout=300)
     pending_schedules_key = f"pending_schedules:{ad_account_id}"
 
-    logging.info(f"Schedule Data: {matched_schedule}")
+    matched_schedules = matched_schedule if isinstance(matched_schedule, list) else [matched_schedule]
+    plan = plan_fetch(matched_schedules)
+
+    logging.info(f"Schedule Data: {matched_schedules}, fetch plan: {plan.describe()}")
 
     append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Fetching Campaign Data for {ad_account_id} schedule {matched_schedule}")
 
@@ -103,44 +101,47 @@ def fetch_campaign(user_id, ad_account_id, access_token, matched_schedule):
         return f"Fetch already in progress for {ad_account_id}, queued process_scheduled_campaigns"
 
     try:
-        test_campaigns, regular_campaigns = {}, {}
-
-        # Fetch Campaign & Adset data in one API call
-        campaign_url = f"{FACEBOOK_GRAPH_URL}/act_{ad_account_id}/campaigns?fields=id,name,status,adsets{{id,name,status}}"
-        campaigns_data = fetch_facebook_data(campaign_url, access_token)
+        started_at = datetime.utcnow()
+        sync_state = db.session.get(EntitySyncState, ad_account_id)
+        scope = incremental_scope(sync_state, plan, started_at)
+        full_sync = scope is None
+        logging.info(f"{'Full' if full_sync else 'Incremental'} entity sync for {ad_account_id}")
+
+        if not full_sync:
+            # Only what changed since the last run is fetched and merged into the stored snapshot
+            entities, error_msg = fetch_changed_entities(
+                fetch_facebook_data, FACEBOOK_GRAPH_URL, ad_account_id, access_token,
+                stored_entities(ad_account_id, scope.levels, scope.campaign_types), sync_state.updated_since, scope,
+            )
+        else:
+            # Full reconciliation: Graph filters by name token and effective status; ad sets are nested only when needed
+            scope = full_sync_scope(sync_state, plan, started_at)
+            campaigns, error_msg = fetch_classified_campaigns(
+                fetch_facebook_data, FACEBOOK_GRAPH_URL, ad_account_id, access_token,
+                scope.campaign_types, scope.campaign_fields(), scope.adset_fields(),
+            )
+            entities = []
+            for campaign in campaigns or []:
+                if "campaign" in scope.levels:
+                    entities.append(entity_row(
+                        campaign["id"], None, "campaign", campaign["campaign_type"], campaign["name"], campaign["status"]
+                    ))
+                if scope.fetch_adsets:
+                    entities.extend(
+                        entity_row(adset["id"], campaign["id"], "adset", campaign["campaign_type"], adset["name"], adset["status"])
+                        for adset in campaign.get("adsets", {}).get("data", [])
+                    )
 
-        if "error" in campaigns_data:
-            error_msg = campaigns_data["error"].get("message", "Unknown error")
+        if error_msg:
             logging.error(f"Facebook API Error: {error_msg}")
             append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}")
             return f"Error fetching campaign data for {ad_account_id}: {error_msg}"
 
-        # Fetch CPP data before processing campaigns
-        cpp_campaign_data = get_cpp_from_insights(ad_account_id, access_token, "campaign")
-        cpp_adset_data = get_cpp_from_insights(ad_account_id, access_token, "adset")
-
-        for campaign in campaigns_data.get("data", []):
-            campaign_id = campaign["id"]
-            campaign_name = campaign["name"]
-            campaign_status = campaign["status"]
-            campaign_CPP = cpp_campaign_data.get(campaign_id, 0)
-
-            target_dict = test_campaigns if contains_test(campaign_name) else regular_campaigns if contains_regular(campaign_name) else None
-
-            if target_dict is not None:
-                target_dict[campaign_id] = {
-                    "campaign_name": campaign_name,
-                    "STATUS": campaign_status,
-                    "CPP": campaign_CPP,
-                    "ADSETS": {
-                        adset["id"]: {
-                            "NAME": adset["name"],
-                            "STATUS": adset["status"],
-                            "CPP": cpp_adset_data.get(adset["id"], 0),
-                        }
-                        for adset in campaign.get("adsets", {}).get("data", [])
-                    },
-                }
+        # Fetch CPP data only for the levels being watched; other levels are refreshed when their own schedules run
+        cpp_data = {level: get_cpp(ad_account_id, access_token, level) for level in plan.insight_levels()}
+        for entity in entities:
+            if entity["level"] in cpp_data:
+                entity["cpp"] = cpp_data[entity["level"]].get(entity["entity_id"], 0)
 
         # Update database
         campaign_entry = CampaignsScheduled.query.filter_by(ad_account_id=ad_account_id).first()
@@ -148,28 +149,28 @@ def fetch_campaign(user_id, ad_account_id, access_token, matched_schedule):
         if not campaign_entry:
             campaign_entry = CampaignsScheduled(
                 ad_account_id=ad_account_id,
-                test_campaign_data={},
-                regular_campaign_data={},
                 last_time_checked=datetime.now(),
                 last_check_status="Ongoing",
                 last_check_message=f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaigns saved successfully."
             )
             db.session.add(campaign_entry)
 
-        campaign_entry.test_campaign_data = test_campaigns
-        campaign_entry.regular_campaign_data = regular_campaigns
+        upsert_campaign_entities(ad_account_id, entities, levels=scope.levels, campaign_types=scope.campaign_types)
+        if full_sync:
+            record_entity_sync(ad_account_id, started_at, scope.levels, scope.campaign_types)
+        else:
+            record_entity_sync(ad_account_id, started_at)
+
         campaign_entry.last_time_checked = datetime.now()
         campaign_entry.last_check_status = "Success"
         campaign_entry.last_check_message = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaign data updated."
-
-        flag_modified(campaign_entry, "test_campaign_data")
-        flag_modified(campaign_entry, "regular_campaign_data")
         db.session.commit()
 
         logging.info(f"Successfully fetched and saved campaigns for Ad Account {ad_account_id}")
         append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaigns updated successfully.")
 
-        process_scheduled_campaigns.apply_async(args=[user_id, ad_account_id, access_token, matched_schedule])
+        for schedule in matched_schedules:
+            process_scheduled_campaigns.apply_async(args=[user_id, ad_account_id, access_token, schedule])
 
         return f"Fetched campaign data for Ad Account {ad_account_id}"
 
@@ -0,0 +1,105 @@
+import json
+import re
+
+# SO1/SO2 classification pushed down to Graph: campaigns are requested with a name CONTAIN filter
+# per token and an effective_status filter, then validated locally against the exact token.
+
+NON_ALPHANUMERIC_REGEX = re.compile(r'[^a-zA-Z0-9]+')
+
+# Name token per campaign type, in classification order (a name with both tokens is TEST)
+CAMPAIGN_TYPE_TOKENS = {"TEST": "so1", "REGULAR": "so2"}
+
+# Campaigns and ad sets that can still be toggled; deleted and archived ones are never fetched
+CAMPAIGN_EFFECTIVE_STATUSES = ["ACTIVE", "PAUSED", "IN_PROCESS", "WITH_ISSUES"]
+ADSET_EFFECTIVE_STATUSES = ["ACTIVE", "PAUSED", "CAMPAIGN_PAUSED", "IN_PROCESS", "WITH_ISSUES"]
+
+CAMPAIGN_PAGE_SIZE = 100
+ADSET_PAGE_SIZE = 100
+
+
+def normalize_text(text):
+    """Replace all non-alphanumeric characters with spaces and split into words."""
+    return NON_ALPHANUMERIC_REGEX.sub(' ', text).lower().split()
+
+
+def classify_campaign(name):
+    """"TEST" for names with the so1 token, "REGULAR" for so2, otherwise None."""
+    words = normalize_text(name)
+    for campaign_type, token in CAMPAIGN_TYPE_TOKENS.items():
+        if token in words:
+            return campaign_type
+    return None
+
+
+def campaign_filtering(token):
+    return json.dumps([
+        {"field": "name", "operator": "CONTAIN", "value": token},
+        {"field": "effective_status", "operator": "IN", "value": CAMPAIGN_EFFECTIVE_STATUSES},
+    ], separators=(",", ":"))
+
+
+def nested_adsets_field(adset_fields):
+    statuses = json.dumps(ADSET_EFFECTIVE_STATUSES, separators=(",", ":"))
+    return f"adsets.limit({ADSET_PAGE_SIZE}).effective_status({statuses}){{{adset_fields}}}"
+
+
+def fetch_classified_campaigns(fetch_facebook_data, graph_url, ad_account_id, access_token, campaign_types, campaign_fields, adset_fields=None):
+    """
+    Fetch the campaigns of the given types, following every page of campaigns and nested ad sets.
+
+    Args:
+        fetch_facebook_data (callable): The worker's `(url, access_token) -> dict` Graph helper.
+        campaign_types (iterable): Subset of {"TEST", "REGULAR"}.
+        adset_fields (str | None): Nested ad set fields, or None to skip ad sets.
+
+    Returns:
+        tuple: ([campaign dicts with "campaign_type" set], None) or (None, Graph error message).
+    """
+    fields = campaign_fields if adset_fields is None else f"{campaign_fields},{nested_adsets_field(adset_fields)}"
+    campaigns = {}
+
+    for campaign_type in CAMPAIGN_TYPE_TOKENS:
+        if campaign_type not in campaign_types:
+            continue
+
+        url = (
+            f"{graph_url}/act_{ad_account_id}/campaigns?fields={fields}&limit={CAMPAIGN_PAGE_SIZE}"
+            f"&filtering={campaign_filtering(CAMPAIGN_TYPE_TOKENS[campaign_type])}"
+        )
+        while url:
+            page = fetch_facebook_data(url, access_token)
+            if "error" in page:
+                return None, page["error"].get("message", "Unknown error")
+
+            for campaign in page.get("data", []):
+                # CONTAIN is a substring match ("so10", "also2"), so confirm the exact token locally
+                if classify_campaign(campaign["name"]) != campaign_type or campaign["id"] in campaigns:
+                    continue
+
+                if adset_fields is not None:
+                    adsets, error = fetch_remaining_adsets(fetch_facebook_data, campaign.get("adsets", {}), access_token)
+                    if error:
+                        return None, error
+                    campaign["adsets"] = {"data": adsets}
+
+                campaign["campaign_type"] = campaign_type
+                campaigns[campaign["id"]] = campaign
+
+            url = page.get("paging", {}).get("next")
+
+    return list(campaigns.values()), None
+
+
+def fetch_remaining_adsets(fetch_facebook_data, adsets_edge, access_token):
+    """All ad sets of a nested `adsets` edge, following its own paging."""
+    adsets = list(adsets_edge.get("data", []))
+    url = adsets_edge.get("paging", {}).get("next")
+
+    while url:
+        page = fetch_facebook_data(url, access_token)
+        if "error" in page:
+            return None, page["error"].get("message", "Unknown error")
+        adsets.extend(page.get("data", []))
+        url = page.get("paging", {}).get("next")
+
+    return adsets, None
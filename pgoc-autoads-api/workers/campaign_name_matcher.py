@@ -0,0 +1,151 @@
+import re
+from collections import deque
+from functools import lru_cache
+from user_cache import LRUCache
+
+# Campaign name patterns for the ON/OFF-by-name schedules, compiled into a single automaton so
+# matching a campaign costs one pass over its name however many patterns the schedule holds.
+#
+#   "Sale Bundle"    exact match
+#   "Sale Bundle*"   name starts with the pattern
+#   "*Sale Bundle*"  name contains the pattern
+#
+# Names and patterns are compared after normalize_text, so spacing, punctuation and case are ignored.
+
+NON_ALPHANUMERIC_REGEX = re.compile(r"[^a-zA-Z0-9]+")
+
+WILDCARD = "*"
+EXACT, PREFIX, SUBSTRING = "exact", "prefix", "substring"
+
+# Normalized names are kept per campaign ID across runs; a renamed campaign is re-normalized
+NAME_CACHE_SIZE = 50000
+NAME_CACHE_TTL_SECONDS = 6 * 60 * 60
+
+normalized_names = LRUCache(NAME_CACHE_SIZE, NAME_CACHE_TTL_SECONDS)
+
+
+def normalize_text(text):
+    """Drop all non-alphanumeric characters and lowercase."""
+    return NON_ALPHANUMERIC_REGEX.sub("", text).lower()
+
+
+def normalized_campaign_name(campaign_id, name):
+    cached = normalized_names.get(campaign_id)
+    if cached is not None and cached[0] == name:
+        return cached[1]
+
+    normalized = normalize_text(name)
+    normalized_names.set(campaign_id, (name, normalized))
+    return normalized
+
+
+def parse_name_pattern(raw):
+    """[kind, normalized value] for one user-entered pattern; raises ValueError for unsupported wildcards."""
+    text = str(raw).strip()
+    if text.startswith(WILDCARD) and text.endswith(WILDCARD) and len(text) > 1:
+        kind, body = SUBSTRING, text[1:-1]
+    elif text.endswith(WILDCARD):
+        kind, body = PREFIX, text[:-1]
+    else:
+        kind, body = EXACT, text
+
+    if WILDCARD in body:
+        raise ValueError(f"Unsupported wildcard in campaign name pattern '{raw}'. Use 'name', 'name*' or '*name*'.")
+
+    value = normalize_text(body)
+    if not value:
+        raise ValueError(f"Campaign name pattern '{raw}' has no letters or digits.")
+
+    return [kind, value]
+
+
+def compile_name_patterns(campaign_names):
+    """JSON-ready pattern list stored with a schedule at save time; raises ValueError on a bad pattern."""
+    return [parse_name_pattern(name) for name in campaign_names]
+
+
+class CampaignNameMatcher:
+    """
+    Exact names sit in a set; prefix and substring patterns share one Aho-Corasick automaton.
+    A prefix pattern only counts while every character read so far is still on the root path.
+    """
+
+    def __init__(self, patterns):
+        self.exact = frozenset(value for kind, value in patterns if kind == EXACT)
+
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        self.prefix_end = [False]
+        self.substring_out = [False]  # a substring pattern ends here or on a fail-link suffix
+
+        for kind, value in patterns:
+            if kind == EXACT:
+                continue
+            node = self.insert(value)
+            if kind == PREFIX:
+                self.prefix_end[node] = True
+            else:
+                self.substring_out[node] = True
+
+        self.build_fail_links()
+
+    def insert(self, value):
+        node = 0
+        for char in value:
+            child = self.goto[node].get(char)
+            if child is None:
+                child = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.depth.append(self.depth[node] + 1)
+                self.prefix_end.append(False)
+                self.substring_out.append(False)
+                self.goto[node][char] = child
+            node = child
+        return node
+
+    def build_fail_links(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.substring_out[child] = self.substring_out[child] or self.substring_out[self.fail[child]]
+                queue.append(child)
+
+    def matches(self, normalized_name):
+        if normalized_name in self.exact:
+            return True
+        if len(self.goto) == 1:
+            return False
+
+        node = 0
+        for position, char in enumerate(normalized_name, start=1):
+            while node and char not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(char, 0)
+
+            if self.substring_out[node]:
+                return True
+            if self.prefix_end[node] and self.depth[node] == position:
+                return True
+        return False
+
+
+@lru_cache(maxsize=256)
+def compiled_matcher(patterns):
+    return CampaignNameMatcher(patterns)
+
+
+def matcher_for_schedule(schedule):
+    """Matcher for a schedule entry, built once per process from the patterns stored at save time."""
+    patterns = schedule.get("name_patterns")
+    if patterns is None:
+        # Schedules saved before patterns were stored; their names are plain exact matches
+        names = schedule.get("campaign_name", [])
+        patterns = [[EXACT, normalize_text(name)] for name in (names if isinstance(names, list) else [names])]
+    return compiled_matcher(tuple((kind, value) for kind, value in patterns))
@@ -1,37 +1,91 @@
 from celery import shared_task
 from datetime import datetime, timedelta
-from pytz import timezone
-from sqlalchemy.orm import joinedload
+from sqlalchemy import text
 from models.models import db, Campaign
+from models.migrations import MIGRATION_LOCK_ID, create_campaign_default_partition, create_campaign_partition, manila_now
 import logging
+import os
 
-manila_tz = timezone("Asia/Manila")
+# Campaign rows are kept for this many days
+CAMPAIGN_RETENTION_DAYS = int(os.getenv("CAMPAIGN_RETENTION_DAYS", 2))
 
-@shared_task
-def delete_old_campaigns():
-    try:
+# Daily partitions created ahead of time so inserts never miss one
+CAMPAIGN_PARTITION_DAYS_AHEAD = int(os.getenv("CAMPAIGN_PARTITION_DAYS_AHEAD", 7))
+
+# Rows per DELETE when trimming the partition that straddles the cutoff
+DELETE_BATCH_SIZE = 5000
+
+
+def ensure_campaign_partitions(days_ahead=CAMPAIGN_PARTITION_DAYS_AHEAD):
+    """Create the default campaign_table partition and the daily ones for today and the next `days_ahead` days."""
+    # The API, worker and beat all run this at boot; the lock keeps them from racing on the same partition
+    db.session.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MIGRATION_LOCK_ID})
+    create_campaign_default_partition()
+    today = manila_now().date()
+
+    for offset in range(days_ahead + 1):
+        create_campaign_partition(today + timedelta(days=offset))
+
+    db.session.commit()
+
+
+def drop_expired_campaign_partitions(cutoff):
+    """Drop every partition whose whole range is older than `cutoff`. Returns the dropped partition names."""
+    partitions = db.session.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "WHERE pg_inherits.inhparent = to_regclass(:table)"
+    ), {"table": Campaign.__tablename__}).scalars().all()
 
-        two_days_ago = datetime.now(manila_tz) - timedelta(days=2)
+    dropped = []
+    prefix = f"{Campaign.__tablename__}_"
+    for partition in sorted(partitions):
+        try:
+            day = datetime.strptime(partition[len(prefix):], "%Y_%m_%d")
+        except ValueError:
+            continue  # Not one of our daily partitions
 
-        # Fetch campaigns that were created 2 or more days ago
-        old_campaigns = db.session.query(Campaign).filter(Campaign.created_at <= two_days_ago).all()
+        if day + timedelta(days=1) <= cutoff:
+            db.session.execute(text(f"ALTER TABLE {Campaign.__tablename__} DETACH PARTITION {partition}"))
+            db.session.execute(text(f"DROP TABLE {partition}"))
+            db.session.commit()
+            dropped.append(partition)
+            logging.info(f"[INFO] Dropped campaign partition {partition}")
 
-        if not old_campaigns:
-            logging.info("[INFO] No old campaigns found for deletion.")
-            return {"status": "success", "message": "No old campaigns found."}
+    return dropped
 
-        deleted_campaigns = []
-        
-        for campaign in old_campaigns:
-            logging.info(f"[INFO] Deleting campaign ID: {campaign.campaign_id}, created at: {campaign.created_at}")
-            deleted_campaigns.append(campaign.campaign_id)
-            db.session.delete(campaign)
 
-        # Commit deletion
+def delete_campaigns_before(cutoff, batch_size=DELETE_BATCH_SIZE):
+    """Set-based delete of rows created at or before `cutoff`, committed in batches. Returns the row count."""
+    deleted = 0
+    while True:
+        result = db.session.execute(text(
+            f"DELETE FROM {Campaign.__tablename__} WHERE (campaign_id, created_at) IN ("
+            f"SELECT campaign_id, created_at FROM {Campaign.__tablename__} WHERE created_at <= :cutoff LIMIT :batch_size)"
+        ), {"cutoff": cutoff, "batch_size": batch_size})
         db.session.commit()
-        logging.info(f"[INFO] Successfully deleted {len(deleted_campaigns)} old campaigns.")
 
-        return {"status": "success", "deleted_campaigns": deleted_campaigns}
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+
+@shared_task
+def delete_old_campaigns():
+    """Drop campaign partitions past retention, batch-delete the leftovers, and create upcoming partitions."""
+    try:
+        # Manila wall-clock time, the same clock create_ads_routes writes created_at with
+        cutoff = manila_now() - timedelta(days=CAMPAIGN_RETENTION_DAYS)
+
+        dropped_partitions = drop_expired_campaign_partitions(cutoff)
+
+        # Only the partition straddling the cutoff and the default partition have rows left to delete
+        deleted_rows = delete_campaigns_before(cutoff)
+
+        ensure_campaign_partitions()
+
+        logging.info(f"[INFO] Dropped {len(dropped_partitions)} campaign partitions and deleted {deleted_rows} old campaigns.")
+        return {"status": "success", "dropped_partitions": dropped_partitions, "deleted_rows": deleted_rows}
 
     except Exception as e:
         db.session.rollback()
@@ -0,0 +1,173 @@
+import json
+import os
+from datetime import timedelta, timezone
+from workers.campaign_filters import ADSET_EFFECTIVE_STATUSES, CAMPAIGN_EFFECTIVE_STATUSES, classify_campaign
+from workers.fetch_planner import ADSET_FIELDS, FetchPlan
+
+# Incremental campaign_entities sync: between full reconciliations only campaigns and ad sets whose
+# updated_time moved past the account's watermark are fetched and merged into the stored snapshot.
+
+# Hours between full reconciliations, which also catch anything the incremental runs can't see
+ENTITY_FULL_SYNC_HOURS = int(os.getenv("ENTITY_FULL_SYNC_HOURS", 6))
+
+# The watermark is re-read with this overlap so clock skew against Graph never drops a change
+ENTITY_SYNC_OVERLAP_MINUTES = int(os.getenv("ENTITY_SYNC_OVERLAP_MINUTES", 5))
+
+REMOVED_EFFECTIVE_STATUSES = ["DELETED", "ARCHIVED"]
+
+CHANGED_PAGE_SIZE = 200
+CHANGED_CAMPAIGN_FIELDS = "id,name,status,effective_status"
+CHANGED_ADSET_FIELDS = "id,name,status,effective_status,campaign_id,campaign{name}"
+
+
+def full_sync_due(state, now):
+    return state is None or now - state.last_full_sync_at >= timedelta(hours=ENTITY_FULL_SYNC_HOURS)
+
+
+def incremental_scope(state, plan, now):
+    """FetchPlan for an incremental sync, or None when the snapshot can't answer `plan` and a full sync is needed."""
+    if full_sync_due(state, now):
+        return None
+    if not plan.levels <= set(state.levels) or not plan.campaign_types <= set(state.campaign_types):
+        return None
+    return FetchPlan(state.campaign_types, state.levels)
+
+
+def full_sync_scope(state, plan, now):
+    """What a full sync stores: the plan, widened to what the snapshot already covers while that is still fresh."""
+    if full_sync_due(state, now):
+        return plan
+    return FetchPlan(plan.campaign_types | set(state.campaign_types), plan.levels | set(state.levels))
+
+
+def changed_filtering(since, effective_statuses):
+    since_timestamp = int(since.replace(tzinfo=timezone.utc).timestamp())
+    return json.dumps([
+        {"field": "updated_time", "operator": "GREATER_THAN", "value": since_timestamp},
+        {"field": "effective_status", "operator": "IN", "value": effective_statuses + REMOVED_EFFECTIVE_STATUSES},
+    ], separators=(",", ":"))
+
+
+def fetch_all_pages(fetch_facebook_data, url, access_token):
+    items = []
+    while url:
+        page = fetch_facebook_data(url, access_token)
+        if "error" in page:
+            return None, page["error"].get("message", "Unknown error")
+        items.extend(page.get("data", []))
+        url = page.get("paging", {}).get("next")
+    return items, None
+
+
+def entity_row(entity_id, parent_id, level, campaign_type, name, status, cpp=0):
+    return {
+        "entity_id": entity_id,
+        "parent_id": parent_id,
+        "level": level,
+        "campaign_type": campaign_type,
+        "name": name,
+        "status": status,
+        "cpp": cpp,
+    }
+
+
+def fetch_changed_entities(fetch_facebook_data, graph_url, ad_account_id, access_token, stored, watermark, scope):
+    """
+    Merge the campaigns and ad sets changed after `watermark` into the `stored` snapshot rows.
+
+    Deleted, archived or renamed-out-of-so1/so2 entities are dropped, renamed campaigns carry their
+    ad sets to the new campaign type, and campaigns that newly enter the scope get their ad sets fetched.
+    CPP values are carried over from `stored`; the caller refreshes them.
+
+    Returns:
+        tuple: ([entity dicts covering `scope`], None) or (None, Graph error message).
+    """
+    since = watermark - timedelta(minutes=ENTITY_SYNC_OVERLAP_MINUTES)
+    entities = {entity["entity_id"]: entity for entity in stored}
+
+    # Campaign type per campaign ID as the snapshot knows it; ad set rows carry it when campaigns aren't stored
+    known_types = {
+        entity["entity_id"] if entity["level"] == "campaign" else entity["parent_id"]: entity["campaign_type"]
+        for entity in stored
+    }
+
+    changed_campaigns, error = fetch_all_pages(
+        fetch_facebook_data,
+        f"{graph_url}/act_{ad_account_id}/campaigns?fields={CHANGED_CAMPAIGN_FIELDS}&limit={CHANGED_PAGE_SIZE}"
+        f"&filtering={changed_filtering(since, CAMPAIGN_EFFECTIVE_STATUSES)}",
+        access_token,
+    )
+    if error:
+        return None, error
+
+    campaign_types = {}  # Changed campaign ID -> new type, None when it left the scope
+    for campaign in changed_campaigns:
+        campaign_type = None
+        if campaign.get("effective_status") not in REMOVED_EFFECTIVE_STATUSES:
+            campaign_type = classify_campaign(campaign["name"])
+        if campaign_type not in scope.campaign_types:
+            campaign_type = None
+        campaign_types[campaign["id"]] = campaign_type
+
+        previous = entities.pop(campaign["id"], None)
+        if campaign_type and "campaign" in scope.levels:
+            entities[campaign["id"]] = entity_row(
+                campaign["id"], None, "campaign", campaign_type, campaign["name"], campaign["status"],
+                previous["cpp"] if previous else 0,
+            )
+
+    if not scope.fetch_adsets:
+        return list(entities.values()), None
+
+    # Ad sets follow their campaign's new type, or leave with it
+    for entity_id, entity in list(entities.items()):
+        if entity["level"] == "adset" and entity["parent_id"] in campaign_types:
+            if campaign_types[entity["parent_id"]] is None:
+                del entities[entity_id]
+            else:
+                entity["campaign_type"] = campaign_types[entity["parent_id"]]
+
+    changed_adsets, error = fetch_all_pages(
+        fetch_facebook_data,
+        f"{graph_url}/act_{ad_account_id}/adsets?fields={CHANGED_ADSET_FIELDS}&limit={CHANGED_PAGE_SIZE}"
+        f"&filtering={changed_filtering(since, ADSET_EFFECTIVE_STATUSES)}",
+        access_token,
+    )
+    if error:
+        return None, error
+
+    # A campaign renamed into the scope brings ad sets that never changed, so they are fetched once here
+    entering = [
+        campaign_id for campaign_id, campaign_type in campaign_types.items()
+        if campaign_type and known_types.get(campaign_id) != campaign_type
+    ]
+    for campaign_id in entering:
+        adsets, error = fetch_all_pages(
+            fetch_facebook_data,
+            f"{graph_url}/{campaign_id}/adsets?fields={ADSET_FIELDS},effective_status&limit={CHANGED_PAGE_SIZE}",
+            access_token,
+        )
+        if error:
+            return None, error
+        changed_adsets.extend({**adset, "campaign_id": campaign_id} for adset in adsets)
+
+    for adset in changed_adsets:
+        campaign_id = adset["campaign_id"]
+        if campaign_id in campaign_types:
+            campaign_type = campaign_types[campaign_id]
+        elif "campaign" in adset:
+            campaign_type = classify_campaign(adset["campaign"]["name"])
+        else:
+            campaign_type = known_types.get(campaign_id)
+
+        previous = entities.pop(adset["id"], None)
+        if (
+            campaign_type in scope.campaign_types
+            and adset.get("effective_status") not in REMOVED_EFFECTIVE_STATUSES
+        ):
+            entities[adset["id"]] = entity_row(
+                adset["id"], campaign_id, "adset", campaign_type, adset["name"], adset["status"],
+                previous["cpp"] if previous else 0,
+            )
+
+    return list(entities.values()), None
@@ -0,0 +1,47 @@
+# Decides what fetch_campaign has to pull for the schedules that fired, so a campaign-level
+# schedule never pays for nested ad sets or ad set insights.
+
+CAMPAIGN_FIELDS = "id,name,status"
+ADSET_FIELDS = "id,name,status"
+
+
+def schedule_campaign_type(schedule):
+    """Same mapping process_scheduled_campaigns uses to pick CampaignEntity rows."""
+    return "REGULAR" if schedule.get("campaign_type") == "REGULAR" else "TEST"
+
+
+def schedule_level(schedule):
+    return "campaign" if schedule.get("what_to_watch") == "Campaigns" else "adset"
+
+
+class FetchPlan:
+    """Campaign types and levels a fetch has to cover."""
+
+    def __init__(self, campaign_types, levels):
+        self.campaign_types = frozenset(campaign_types)  # {"TEST", "REGULAR"}
+        self.levels = frozenset(levels)  # {"campaign", "adset"}: levels whose rows and CPP are stored
+
+    @property
+    def fetch_adsets(self):
+        return "adset" in self.levels
+
+    def campaign_fields(self):
+        return CAMPAIGN_FIELDS
+
+    def adset_fields(self):
+        """Nested ad set fields for the Graph call; None unless an ad set schedule needs them."""
+        return ADSET_FIELDS if self.fetch_adsets else None
+
+    def insight_levels(self):
+        return sorted(self.levels)
+
+    def describe(self):
+        return f"levels={','.join(sorted(self.levels))} types={','.join(sorted(self.campaign_types))}"
+
+
+def plan_fetch(schedules):
+    """Smallest FetchPlan covering every schedule in `schedules`."""
+    return FetchPlan(
+        campaign_types={schedule_campaign_type(schedule) for schedule in schedules},
+        levels={schedule_level(schedule) for schedule in schedules},
+    )
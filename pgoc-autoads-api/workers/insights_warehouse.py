@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+import pytz
+import requests
+from celery import shared_task
+from models.models import db, CampaignsScheduled, InsightsSyncState
+from controllers.insights_warehouse_controller import insight_row, upsert_adset_insights
+from redis_registry import get_redis
+
+redis_client = get_redis(2)
+
+manila_tz = pytz.timezone("Asia/Manila")
+
+FACEBOOK_API_VERSION = "v22.0"
+FACEBOOK_GRAPH_URL = f"https://graph.facebook.com/{FACEBOOK_API_VERSION}"
+
+# Days fetched the first time an account is synced
+INSIGHTS_BACKFILL_DAYS = int(os.getenv("INSIGHTS_BACKFILL_DAYS", 90))
+
+# Recent days are re-pulled on every sync because Facebook restates them as conversions attribute
+INSIGHTS_LOOKBACK_DAYS = int(os.getenv("INSIGHTS_LOOKBACK_DAYS", 3))
+
+INSIGHTS_PAGE_SIZE = 500
+INSIGHTS_FIELDS = "adset_id,campaign_id,spend,impressions,actions"
+
+
+def fetch_daily_adset_insights(ad_account_id, access_token, since, until):
+    """Yield daily adset-level insight items for [since, until], page by page."""
+    url = f"{FACEBOOK_GRAPH_URL}/act_{ad_account_id}/insights"
+    params = {
+        "level": "adset",
+        "fields": INSIGHTS_FIELDS,
+        "time_increment": 1,
+        "time_range": json.dumps({"since": since.isoformat(), "until": until.isoformat()}),
+        "limit": INSIGHTS_PAGE_SIZE,
+    }
+
+    with requests.Session() as session:
+        session.headers["Authorization"] = f"Bearer {access_token}"
+        while url:
+            response = session.get(url, params=params, timeout=60)
+            response.raise_for_status()
+            data = response.json()
+            if "error" in data:
+                raise Exception(data["error"].get("message", "Unknown API error"))
+
+            yield from data.get("data", [])
+
+            url = data.get("paging", {}).get("next")
+            params = None  # `next` already carries every query parameter
+
+
+def set_sync_state(ad_account_id, **values):
+    state = db.session.get(InsightsSyncState, ad_account_id)
+    if not state:
+        state = InsightsSyncState(ad_account_id=ad_account_id)
+        db.session.add(state)
+    for column, value in values.items():
+        setattr(state, column, value)
+    return state
+
+
+@shared_task
+def sync_adset_insights(ad_account_id, access_token):
+    """Pull daily adset insights after the account's watermark (minus a lookback window) into adset_daily_insights."""
+    lock = redis_client.lock(f"lock:sync_adset_insights:{ad_account_id}", timeout=600)
+    if not lock.acquire(blocking=False):
+        return f"Insights sync already running for {ad_account_id}"
+
+    try:
+        today = datetime.now(manila_tz).date()
+        state = db.session.get(InsightsSyncState, ad_account_id)
+
+        if state and state.synced_until:
+            since = min(state.synced_until, today) - timedelta(days=INSIGHTS_LOOKBACK_DAYS)
+            backfilled_since = state.backfilled_since
+        else:
+            since = today - timedelta(days=INSIGHTS_BACKFILL_DAYS)
+            backfilled_since = since
+
+        rows = [insight_row(ad_account_id, item) for item in fetch_daily_adset_insights(ad_account_id, access_token, since, today)]
+        upsert_adset_insights(rows)
+
+        set_sync_state(
+            ad_account_id,
+            backfilled_since=backfilled_since,
+            synced_until=today,
+            last_synced_at=datetime.now(),
+            last_sync_status="Success",
+            last_sync_message=f"Synced {len(rows)} adset-days from {since} to {today}.",
+        )
+        db.session.commit()
+
+        logging.info(f"Synced {len(rows)} adset-days of insights for {ad_account_id} ({since} to {today})")
+        return f"Synced {len(rows)} adset-days for {ad_account_id}"
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error syncing insights for {ad_account_id}: {e}")
+
+        # The watermark stays put, so the next run retries the same window
+        set_sync_state(ad_account_id, last_sync_status="Failed", last_sync_message=str(e))
+        db.session.commit()
+        return f"Error syncing insights for {ad_account_id}: {e}"
+
+    finally:
+        if lock.locked():
+            lock.release()
+
+
+@shared_task
+def sync_all_insights():
+    """Queue an insights sync for every scheduled ad account."""
+    accounts = db.session.query(CampaignsScheduled.ad_account_id, CampaignsScheduled.access_token).all()
+
+    for ad_account_id, access_token in accounts:
+        sync_adset_insights.apply_async(args=[ad_account_id, access_token])
+
+    logging.info(f"Queued insights sync for {len(accounts)} ad accounts")
+    return f"Queued insights sync for {len(accounts)} ad accounts"
@@ -0,0 +1,161 @@
+import csv
+import io
+import logging
+import os
+from datetime import datetime, timezone
+from celery import shared_task
+from sqlalchemy import text
+from models.models import db
+from workers.on_off_functions.message_bus import (
+    STREAM_PREFIX,
+    message_bus_redis,
+    parse_message_key,
+    parse_stream_key,
+)
+from workers.on_off_functions.message_stream import midnight_after_timestamp, stream_expiry_timestamp, stream_id_tuple
+
+# Entries kept live in each Redis stream once they are safely archived
+MESSAGE_LIVE_MAXLEN = int(os.getenv("MESSAGE_LIVE_MAXLEN", 500))
+
+# Entries read per XRANGE and rows sent per COPY
+ARCHIVE_READ_BATCH = 1000
+ARCHIVE_COPY_BATCH = 5000
+
+# Last archived entry per stream; expires with the stream
+ARCHIVE_CURSOR_PREFIX = "messages-archive-cursor"
+
+# EXPIREAT only if nothing was appended after the archived entry, checked atomically against new XADDs
+EXPIRE_IF_ARCHIVED = message_bus_redis.register_script("""
+local newest = redis.call('XREVRANGE', KEYS[1], '+', '-', 'COUNT', 1)
+if newest[1] and newest[1][1] == ARGV[1] then
+    return redis.call('EXPIREAT', KEYS[1], ARGV[2])
+end
+return 0
+""")
+
+ARCHIVE_COLUMNS = ("redis_key", "entry_id", "ts", "seq", "domain", "user_id", "ad_account_id", "message")
+
+
+def month_start(value):
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value):
+    return month_start(value.replace(year=value.year + 1, month=1) if value.month == 12 else value.replace(month=value.month + 1))
+
+
+def ensure_message_archive_partitions(months_ahead=1):
+    """Create the monthly message_archive partitions for this month and the next `months_ahead`."""
+    start = month_start(datetime.now(timezone.utc))
+
+    for _ in range(months_ahead + 1):
+        end = next_month(start)
+        db.session.execute(text(
+            f"CREATE TABLE IF NOT EXISTS message_archive_{start:%Y_%m} PARTITION OF message_archive "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        ))
+        start = end
+
+    db.session.commit()
+
+
+def entry_row(redis_key, entry_id, message):
+    domain, specific_key = parse_stream_key(redis_key)
+    user_id, ad_account_id = parse_message_key(domain, specific_key)
+    milliseconds, seq = stream_id_tuple(entry_id)
+    ts = datetime.fromtimestamp(milliseconds / 1000, tz=timezone.utc)
+    return (redis_key, entry_id, ts.isoformat(), seq, domain, user_id, ad_account_id, message)
+
+
+def copy_archive_rows(rows):
+    """Bulk load rows with COPY into a temp table, then insert them, skipping entries archived before."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(["\\N" if value is None else value for value in row])
+    buffer.seek(0)
+
+    columns = ", ".join(ARCHIVE_COLUMNS)
+    connection = db.engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE message_archive_load (LIKE message_archive INCLUDING DEFAULTS) ON COMMIT DROP")
+            cursor.copy_expert(f"COPY message_archive_load ({columns}) FROM STDIN WITH (FORMAT csv, NULL '\\N')", buffer)
+            cursor.execute(
+                f"INSERT INTO message_archive ({columns}) SELECT {columns} FROM message_archive_load "
+                "ON CONFLICT DO NOTHING"
+            )
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+
+
+def expire_archived_stream(redis_key, cursor_id):
+    """Move a fully archived stream's expiry back to the 12 AM after its newest entry."""
+    newest_at = datetime.fromtimestamp(stream_id_tuple(cursor_id)[0] / 1000)
+    EXPIRE_IF_ARCHIVED(keys=[redis_key], args=[cursor_id, midnight_after_timestamp(newest_at)])
+
+
+def trim_archived_stream(redis_key, cursor_id):
+    """Keep the newest MESSAGE_LIVE_MAXLEN entries, never dropping anything after `cursor_id`."""
+    newest = message_bus_redis.xrevrange(redis_key, count=MESSAGE_LIVE_MAXLEN)
+    if len(newest) < MESSAGE_LIVE_MAXLEN:
+        return
+
+    oldest_kept = newest[-1][0]
+    min_id = oldest_kept if stream_id_tuple(oldest_kept) <= stream_id_tuple(cursor_id) else cursor_id
+    message_bus_redis.xtrim(redis_key, minid=min_id)
+
+
+@shared_task
+def archive_message_streams():
+    """Copy new stream entries into message_archive, then trim the live streams to MESSAGE_LIVE_MAXLEN
+    and let fully archived streams expire at 12 AM."""
+    try:
+        ensure_message_archive_partitions()
+
+        rows = []
+        pending_cursors = {}  # {redis_key: last entry ID in rows}
+        archived = 0
+
+        def flush():
+            nonlocal rows, pending_cursors, archived
+            if rows:
+                copy_archive_rows(rows)
+                archived += len(rows)
+
+            # Only advance cursors, trim and expire once the rows are committed
+            expires_at = stream_expiry_timestamp()
+            for redis_key, cursor_id in pending_cursors.items():
+                message_bus_redis.set(f"{ARCHIVE_CURSOR_PREFIX}:{redis_key}", cursor_id, exat=expires_at)
+                trim_archived_stream(redis_key, cursor_id)
+                expire_archived_stream(redis_key, cursor_id)
+
+            rows, pending_cursors = [], {}
+
+        for redis_key in message_bus_redis.scan_iter(match=f"{STREAM_PREFIX}:*", count=500, _type="stream"):
+            cursor_id = message_bus_redis.get(f"{ARCHIVE_CURSOR_PREFIX}:{redis_key}") or "0-0"
+
+            while True:
+                entries = message_bus_redis.xrange(redis_key, min=f"({cursor_id}", count=ARCHIVE_READ_BATCH)
+                if not entries:
+                    break
+
+                rows.extend(entry_row(redis_key, entry_id, fields.get("message", "")) for entry_id, fields in entries)
+                cursor_id = entries[-1][0]
+                pending_cursors[redis_key] = cursor_id
+
+                if len(rows) >= ARCHIVE_COPY_BATCH:
+                    flush()
+
+        flush()
+        logging.info(f"[INFO] Archived {archived} stream messages.")
+        return {"status": "success", "archived": archived}
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"[ERROR] Failed to archive message streams: {str(e)}")
+        return {"status": "error", "message": str(e)}
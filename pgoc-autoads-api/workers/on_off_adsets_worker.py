@@ -1,9 +1,7 @@
 import json
 import logging
-import re
 import time
 import pytz
-import redis
 import requests
 from celery import shared_task
 from datetime import datetime
@@ -11,14 +9,12 @@ from flask import request, jsonify
 from sqlalchemy.orm.attributes import flag_modified
 from workers.on_off_functions.on_off_adsets import append_redis_message_adsets
 from workers.update_status import process_adsets
+from workers.campaign_filters import fetch_classified_campaigns
+from controllers.insights_warehouse_controller import warehouse_cpp
+from redis_registry import get_redis
 
 # Set up Redis clients
-redis_client_as = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=15,
-    decode_responses=True
-)
+redis_client_as = get_redis(15)
 
 # Timezone
 manila_tz = pytz.timezone("Asia/Manila")
@@ -27,24 +23,6 @@ manila_tz = pytz.timezone("Asia/Manila")
 FACEBOOK_API_VERSION = "v22.0"
 FACEBOOK_GRAPH_URL = f"https://graph.facebook.com/{FACEBOOK_API_VERSION}"
 
-# Compile regex once for performance
-NON_ALPHANUMERIC_REGEX = re.compile(r'[^a-zA-Z0-9]+')
-
-
-def normalize_text(text):
-    """Replace all non-alphanumeric characters with spaces and split into words."""
-    return NON_ALPHANUMERIC_REGEX.sub(' ', text).lower().split()
-
-
-def contains_test(text):
-    """Check if 'so1' exists as a separate word in campaign_name."""
-    return "so1" in normalize_text(text)
-
-
-def contains_regular(text):
-    """Check if 'so2' exists as a separate word in campaign_name."""
-    return "so2" in normalize_text(text)
-
 
 def fetch_facebook_data(url, access_token):
     """Fetch data from Facebook API and handle errors."""
@@ -93,6 +71,19 @@ def get_cpp_from_insights(ad_account_id, access_token, level, cpp_date_start, cp
 
     return cpp_data
 
+def get_cpp(ad_account_id, access_token, level, cpp_date_start, cpp_date_end):
+    """CPP per entity for the schedule's date range, from the insights warehouse when it covers the range."""
+    try:
+        since = datetime.strptime(cpp_date_start, "%Y-%m-%d").date()
+        until = datetime.strptime(cpp_date_end, "%Y-%m-%d").date()
+        cpp_data = warehouse_cpp(ad_account_id, level, since, until)
+    except ValueError:
+        cpp_data = None  # Let the insights API interpret the dates as before
+
+    if cpp_data is None:
+        cpp_data = get_cpp_from_insights(ad_account_id, access_token, level, cpp_date_start, cpp_date_end)
+    return cpp_data
+
 @shared_task
 def fetch_adsets(user_id, ad_account_id, access_token, matched_schedule):
     """Fetch campaigns for an ad account, including CPP data, and store structured data."""
@@ -113,8 +104,7 @@ def fetch_adsets(user_id, ad_account_id, access_token, matched_schedule):
         return f"Fetch already in progress for {ad_account_id}, queued process_scheduled_campaigns"
 
     try:
-        test_campaigns = {}
-        regular_campaigns = {}
+        campaign_data = {}
 
         # Extract date range from matched_schedule
         cpp_date_start = matched_schedule.get("cpp_date_start")
@@ -127,12 +117,14 @@ def fetch_adsets(user_id, ad_account_id, access_token, matched_schedule):
             logging.error("Missing cpp_date_start or cpp_date_end in matched_schedule")
             return f"Error: Missing date range for {ad_account_id}"
 
-        # Fetch Campaign & Adset data
-        campaign_url = f"{FACEBOOK_GRAPH_URL}/act_{ad_account_id}/campaigns?fields=id,name,status,adsets{{id,name,status}}"
-        campaigns_data = fetch_facebook_data(campaign_url, access_token)
+        # Fetch Campaign & Adset data for the schedule's campaign type only, filtered by Graph
+        campaign_type = matched_schedule.get("campaign_type", "").upper()
+        campaigns, error_msg = fetch_classified_campaigns(
+            fetch_facebook_data, FACEBOOK_GRAPH_URL, ad_account_id, access_token,
+            {campaign_type}, "id,name,status", "id,name,status",
+        )
 
-        if "error" in campaigns_data:
-            error_msg = campaigns_data["error"].get("message", "Unknown error")
+        if error_msg:
             logging.error(f"Facebook API Error: {error_msg}")
             append_redis_message_adsets(
                 user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {error_msg}"
@@ -144,26 +136,19 @@ def fetch_adsets(user_id, ad_account_id, access_token, matched_schedule):
         )
 
         # Fetch CPP data for campaigns & adsets
-        cpp_campaign_data = get_cpp_from_insights(ad_account_id, access_token, "campaign", cpp_date_start, cpp_date_end)
-        cpp_adset_data = get_cpp_from_insights(ad_account_id, access_token, "adset", cpp_date_start, cpp_date_end)
+        cpp_campaign_data = get_cpp(ad_account_id, access_token, "campaign", cpp_date_start, cpp_date_end)
+        cpp_adset_data = get_cpp(ad_account_id, access_token, "adset", cpp_date_start, cpp_date_end)
 
         logging.info(f"CPP CAMPAIGNS: {cpp_campaign_data}")
         logging.info(f"CPP ADSETS: {cpp_adset_data}")
 
-        for campaign in campaigns_data.get("data", []):
+        for campaign in campaigns:
             campaign_id = campaign["id"]
             campaign_name = campaign["name"]
             campaign_status = campaign["status"]
             campaign_CPP = cpp_campaign_data.get(campaign_id, 0)
 
-            if contains_test(campaign_name):
-                target_dict = test_campaigns
-            elif contains_regular(campaign_name):
-                target_dict = regular_campaigns
-            else:
-                continue  # Skip campaigns that do not match TEST or REGULAR
-
-            target_dict[campaign_id] = {
+            campaign_data[campaign_id] = {
                 "campaign_name": campaign_name,
                 "STATUS": campaign_status,
                 "CPP": campaign_CPP,
@@ -172,20 +157,16 @@ def fetch_adsets(user_id, ad_account_id, access_token, matched_schedule):
 
             for adset in campaign.get("adsets", {}).get("data", []):
                 adset_id = adset["id"]
-                target_dict[campaign_id]["ADSETS"][adset_id] = {
+                campaign_data[campaign_id]["ADSETS"][adset_id] = {
                     "NAME": adset["name"],
                     "STATUS": adset["status"],
                     "CPP": cpp_adset_data.get(adset_id, 0),
                 }
 
         logging.info(
-            f"Successfully fetched campaigns for Ad Account {ad_account_id}. Data: TEST:{test_campaigns}, REGULAR:{regular_campaigns}"
+            f"Successfully fetched campaigns for Ad Account {ad_account_id}. Data: {campaign_type}:{campaign_data}"
         )
 
-        # Determine which data to pass based on campaign_type
-        campaign_type = matched_schedule.get("campaign_type", "").lower()
-        campaign_data = {"test": test_campaigns, "regular": regular_campaigns}.get(campaign_type, {})
-
         # Pass only the relevant campaigns to the next Celery task
         process_adsets.apply_async(
             args=[user_id, ad_account_id, access_token, matched_schedule, campaign_data]
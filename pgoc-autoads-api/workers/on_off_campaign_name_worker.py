@@ -1,25 +1,17 @@
 import json
 import logging
-import re
 import time
 import pytz
-import redis
 import requests
 from celery import shared_task
 from datetime import datetime
 from flask import request, jsonify
-from workers.on_off_functions.on_off_campaign_name import append_redis_message_campaigns
+from workers.on_off_functions.on_off_campaign_name import append_redis_message_campaigns, buffered_redis_messages_campaigns
+from workers.campaign_name_matcher import matcher_for_schedule, normalized_campaign_name
+from redis_registry import get_redis
 
 # Set up Redis clients
-redis_client = redis.StrictRedis(
-    host="redisAds",
-    port=6379,
-    db=3,
-    decode_responses=True
-)
-
-redis_on_off = redis.StrictRedis(host="redisAds", port=6379, db=5, decode_responses=True)
-redis_on_off_websocket = redis.StrictRedis(host="redisAds", port=6379, db=6, decode_responses=True)
+redis_client = get_redis(3)
 
 manila_tz = pytz.timezone("Asia/Manila")
 
@@ -45,13 +37,16 @@ def fetch_facebook_data(url, access_token):
         return {"error": {"message": str(e), "type": "RequestException"}}
 
 
-def normalize_text(text):
-    """Replace all non-alphanumeric characters with spaces and normalize capitalization."""
-    return " ".join(re.sub(r"[^a-zA-Z0-9]+", "", text).lower().split())
-
+def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token, message_writer=None):
+    """Update the status of a Facebook campaign or ad set using the Graph API.
+    Progress messages go to `message_writer` when the caller buffers them.
+    """
+    def append_message(message):
+        if message_writer is not None:
+            message_writer.append(message)
+        else:
+            append_redis_message_campaigns(user_id, message)
 
-def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token):
-    """Update the status of a Facebook campaign or ad set using the Graph API."""
     url = f"{FACEBOOK_GRAPH_URL}/{entity_id}"
     payload = {"status": new_status}
     headers = {
@@ -63,11 +58,11 @@ def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access
         response = requests.post(url, json=payload, headers=headers)
         response.raise_for_status()
         logging.info(f"Successfully updated {entity_id} to {new_status}")
-        append_redis_message_campaigns(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Successfully updated {entity_id} to {new_status}")
+        append_message(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Successfully updated {entity_id} to {new_status}")
         return True
     except requests.exceptions.RequestException as e:
         logging.error(f"Error updating {entity_id} to {new_status}: {e}")
-        append_redis_message_campaigns(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error updating {entity_id} to {new_status}: {e}")
+        append_message(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error updating {entity_id} to {new_status}: {e}")
         return False
 
 @shared_task
@@ -85,65 +80,62 @@ def fetch_campaign_off(user_id, ad_account_id, access_token, matched_schedule):
     try:
         logging.info(f"SCHEDULE DATA: {matched_schedule}")
 
-        # ✅ Use set for O(1) lookup on large data
-        scheduled_campaign_names = {normalize_text(name) for name in matched_schedule.get("campaign_name", [])}
+        # ✅ Compiled once per schedule; one pass over each campaign name
+        name_matcher = matcher_for_schedule(matched_schedule)
         on_off_value = matched_schedule.get("on_off", "").upper()  # Ensure it is a string
         target_status = "ACTIVE" if on_off_value == "ON" else "PAUSED"
 
 
-        message = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Fetching Campaign Data for {ad_account_id} ({operation})"
-        append_redis_message_campaigns(user_id, message)
-
-        url = f"{FACEBOOK_GRAPH_URL}/act_{ad_account_id}/campaigns?fields=id,name,status&limit=500"
-        campaigns_to_update = []
-
-        while url:
-            response_data = fetch_facebook_data(url, access_token)
-
-            if "error" in response_data:
-                raise Exception(response_data["error"].get("message", "Unknown API error"))
-
-            for campaign in response_data.get("data", []):
-                campaign_id = campaign["id"]
-                campaign_name = campaign["name"]
-                campaign_status = campaign["status"]
-                normalized_campaign_name = normalize_text(campaign_name)
-
-                if normalized_campaign_name in scheduled_campaign_names:
-                    if campaign_status != target_status:
-                        campaigns_to_update.append((campaign_id, campaign_name))
-                    else:
-                        append_redis_message_campaigns(
-                            user_id, 
-                            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠ Campaign {campaign_name} ({campaign_id}) REMAINS {target_status}."
-                        )
-
-            url = response_data.get("paging", {}).get("next")  # ✅ Handle pagination
-
-        # ✅ Ensure "No campaigns needed updates." is appended BEFORE completion
-        if not campaigns_to_update:
-            append_redis_message_campaigns(
-                user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] No campaigns needed updates."
-            )
-
-        # ✅ Batch update campaigns instead of API calls per campaign
-        for campaign_id, campaign_name in campaigns_to_update:
-            success = update_facebook_status(user_id, ad_account_id, campaign_id, target_status, access_token)
-
-            status_message = (
-                f"✅ Updated {campaign_name} ({campaign_id}) to {target_status}"
-                if success
-                else f"❌ Failed to update {campaign_name} ({campaign_id})"
+        with buffered_redis_messages_campaigns(user_id) as messages:
+            message = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Fetching Campaign Data for {ad_account_id} ({operation})"
+            messages.append(message)
+
+            url = f"{FACEBOOK_GRAPH_URL}/act_{ad_account_id}/campaigns?fields=id,name,status&limit=500"
+            campaigns_to_update = []
+
+            while url:
+                response_data = fetch_facebook_data(url, access_token)
+
+                if "error" in response_data:
+                    raise Exception(response_data["error"].get("message", "Unknown API error"))
+
+                for campaign in response_data.get("data", []):
+                    campaign_id = campaign["id"]
+                    campaign_name = campaign["name"]
+                    campaign_status = campaign["status"]
+                    if name_matcher.matches(normalized_campaign_name(campaign_id, campaign_name)):
+                        if campaign_status != target_status:
+                            campaigns_to_update.append((campaign_id, campaign_name))
+                        else:
+                            messages.append(
+                                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ⚠ Campaign {campaign_name} ({campaign_id}) REMAINS {target_status}."
+                            )
+
+                url = response_data.get("paging", {}).get("next")  # ✅ Handle pagination
+
+            # ✅ Ensure "No campaigns needed updates." is appended BEFORE completion
+            if not campaigns_to_update:
+                messages.append(
+                    f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] No campaigns needed updates."
+                )
+
+            # ✅ Batch update campaigns instead of API calls per campaign
+            for campaign_id, campaign_name in campaigns_to_update:
+                success = update_facebook_status(user_id, ad_account_id, campaign_id, target_status, access_token, messages)
+
+                status_message = (
+                    f"✅ Updated {campaign_name} ({campaign_id}) to {target_status}"
+                    if success
+                    else f"❌ Failed to update {campaign_name} ({campaign_id})"
+                )
+                messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {status_message}")
+
+            #  Append final success message
+            messages.append(
+                f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaign updates completed for {ad_account_id} ({operation})"
             )
-            append_redis_message_campaigns(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {status_message}")
-
-        #  Append final success message
-        append_redis_message_campaigns(
-            user_id,
-            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaign updates completed for {ad_account_id} ({operation})"
-        )
 
-        return f"Campaign updates completed for Ad Account {ad_account_id} ({operation})."
+            return f"Campaign updates completed for Ad Account {ad_account_id} ({operation})."
 
     except Exception as e:
         error_message = f"❌ Error fetching campaigns for {ad_account_id} ({operation}): {e}"
@@ -1,64 +1,15 @@
-import json
-import redis
-import logging
-from datetime import datetime, timedelta
+from workers.on_off_functions.message_bus import append_message, buffered_messages
 
-# Set up Redis client
-redis_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=10,
-    decode_responses=True  # Ensures Redis returns strings
-)
+# Scheduled campaign on/off messages, one stream per ad account on the message bus
+MESSAGE_DOMAIN = "on_off"
 
 def append_redis_message(user_id, ad_account_id, new_message):
-    """Append a new message inside a dictionary structure while keeping old messages.
-    Ensure Redis key expires at 12 AM the next day.
+    """Append a new message to the account's stream while keeping old messages.
+    The stream expires at 12 AM the next day.
     """
-    redis_key = f"{user_id}-{ad_account_id}-key"
+    append_message(MESSAGE_DOMAIN, f"{user_id}-{ad_account_id}-key", new_message)
 
-    try:
-        # Check if Redis is accessible
-        if not redis_websocket.ping():
-            logging.error("Redis is not responding.")
-            return
 
-        # Retrieve existing messages from Redis
-        existing_data = redis_websocket.get(redis_key)
-
-        if existing_data:
-            try:
-                data_dict = json.loads(existing_data)
-
-                # Ensure proper structure (message should be a list)
-                if not isinstance(data_dict, dict) or not isinstance(data_dict.get("message"), list):
-                    logging.warning(f"Invalid format at {redis_key}, resetting.")
-                    data_dict = {"message": []}  # Reset format
-            except json.JSONDecodeError:
-                logging.warning(f"Corrupt JSON at {redis_key}, resetting.")
-                data_dict = {"message": []}
-        else:
-            data_dict = {"message": []}
-
-        # Append new message (convert everything to string)
-        data_dict["message"].append(str(new_message))
-
-        # Convert entire dictionary to string format and store in Redis
-        redis_websocket.set(redis_key, json.dumps(data_dict, ensure_ascii=False))
-
-        # **Set Expiry Time to 12 AM Tomorrow**
-        now = datetime.now()
-        midnight_tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        expiry_timestamp = int(midnight_tomorrow.timestamp())  # Convert to Unix timestamp
-
-        redis_websocket.expireat(redis_key, expiry_timestamp)  # Set exact expiration
-
-        # Debugging: Verify Redis storage
-        stored_data = redis_websocket.get(redis_key)
-        if stored_data is None:
-            logging.error(f"Failed to write {redis_key} to Redis.")
-        else:
-            logging.info(f"Redis key {redis_key} successfully updated: {stored_data} (expires at {midnight_tomorrow})")
-
-    except Exception as e:
-        logging.error(f"Error updating Redis key {redis_key}: {str(e)}")
+def buffered_redis_messages(user_id, ad_account_id, **kwargs):
+    """Buffered writer for a task's messages on the account stream; use it as a context manager."""
+    return buffered_messages(MESSAGE_DOMAIN, f"{user_id}-{ad_account_id}-key", **kwargs)
@@ -0,0 +1,115 @@
+import os
+import redis
+import logging
+from redis_registry import get_redis
+from workers.on_off_functions.message_stream import (
+    BufferedStreamWriter,
+    append_stream_message,
+    read_recent_stream_messages,
+    read_stream_messages,
+)
+
+# All message domains share one Redis DB and connection pool.
+# Streams are namespaced as messages:{domain}:{key} and every append
+# publishes to message-events:{domain}:{key}, so no keyspace notifications are needed.
+MESSAGE_BUS_DB = int(os.getenv("MESSAGE_BUS_DB", 10))
+
+MESSAGE_DOMAINS = (
+    "on_off",              # Scheduled campaign on/off per ad account
+    "only",                # Campaign off-only schedules per ad account
+    "off",                 # Campaign on/off by name per user
+    "campaign_creations",  # Campaign creation progress per user
+    "adsets",              # Ad set on/off per user
+)
+
+# Domains keyed per ad account ({user_id}-{ad_account_id}-key); the rest are per user ({user_id}-key)
+ACCOUNT_DOMAINS = ("on_off", "only")
+
+STREAM_PREFIX = "messages"
+CHANNEL_PREFIX = "message-events"
+
+message_bus_redis = get_redis(MESSAGE_BUS_DB)
+
+
+def stream_key(domain, specific_key):
+    return f"{STREAM_PREFIX}:{domain}:{specific_key}"
+
+
+def parse_stream_key(redis_key):
+    """Split `messages:{domain}:{key}` back into `(domain, key)`."""
+    _, domain, specific_key = redis_key.split(":", 2)
+    return domain, specific_key
+
+
+def parse_message_key(domain, specific_key):
+    """`(user_id, ad_account_id)` encoded in a message key; `ad_account_id` is None for per-user domains."""
+    owner = specific_key[:-len("-key")] if specific_key.endswith("-key") else specific_key
+    if domain in ACCOUNT_DOMAINS:
+        user_id, _, ad_account_id = owner.partition("-")
+        return user_id, ad_account_id or None
+    return owner, None
+
+
+def notify_channel(domain, specific_key):
+    return f"{CHANNEL_PREFIX}:{domain}:{specific_key}"
+
+
+def parse_notify_channel(channel):
+    """Split `message-events:{domain}:{key}` back into `(domain, key)`."""
+    _, domain, specific_key = channel.split(":", 2)
+    return domain, specific_key
+
+
+def append_message(domain, specific_key, new_message):
+    """Append a message to a domain stream and notify listeners. Expires at 12 AM the next day."""
+    redis_key = stream_key(domain, specific_key)
+
+    try:
+        entry_id = append_stream_message(message_bus_redis, redis_key, new_message, channel=notify_channel(domain, specific_key))
+        logging.info(f"Redis key {redis_key} appended entry {entry_id}: {new_message}")
+        return entry_id
+
+    except Exception as e:
+        logging.error(f"Error updating Redis key {redis_key}: {str(e)}")
+
+
+def buffered_messages(domain, specific_key, **kwargs):
+    """Buffered writer for a task's messages on a domain stream; use it as a context manager."""
+    return BufferedStreamWriter(
+        message_bus_redis,
+        stream_key(domain, specific_key),
+        channel=notify_channel(domain, specific_key),
+        **kwargs
+    )
+
+
+def read_messages(domain, specific_key, last_id="0-0", count=None):
+    """Messages appended after `last_id`. Returns `(last_id, messages)`."""
+    return read_stream_messages(message_bus_redis, stream_key(domain, specific_key), last_id=last_id, count=count)
+
+
+def read_recent_messages(domain, specific_key, count):
+    """The newest `count` messages in append order. Returns `(last_id, messages)`."""
+    return read_recent_stream_messages(message_bus_redis, stream_key(domain, specific_key), count)
+
+
+def read_entries(domain, specific_key, last_id, count=None):
+    """Raw `[(entry_id, message), ...]` appended after `last_id`."""
+    response = message_bus_redis.xread({stream_key(domain, specific_key): last_id}, count=count)
+    return [(entry_id, fields.get("message", "")) for _, stream in response or [] for entry_id, fields in stream]
+
+
+def latest_entry_id(domain, specific_key):
+    try:
+        entries = message_bus_redis.xrevrange(stream_key(domain, specific_key), count=1)
+    except redis.exceptions.ResponseError:
+        entries = []
+    return entries[0][0] if entries else "0-0"
+
+
+def message_key_exists(domain, specific_key):
+    return bool(message_bus_redis.exists(stream_key(domain, specific_key)))
+
+
+def delete_messages(domain, specific_key):
+    message_bus_redis.delete(stream_key(domain, specific_key))
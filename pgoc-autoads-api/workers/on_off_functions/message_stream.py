@@ -0,0 +1,173 @@
+import logging
+import os
+import redis
+import threading
+from datetime import datetime, timedelta
+
+# Safety cap on entries per message key, far above what one archive interval (1 minute) can produce.
+# The live size is kept by the archive task (MESSAGE_LIVE_MAXLEN), which only trims archived entries.
+# XADD trims approximately ("~"), so appends stay constant time.
+MESSAGE_STREAM_MAXLEN = int(os.getenv("MESSAGE_STREAM_MAXLEN", 100000))
+
+# Streams outlive 12 AM by this much on append, so the archive task copies their last entries first;
+# it moves the expiry back to 12 AM once a stream is fully archived.
+MESSAGE_EXPIRY_GRACE_SECONDS = int(os.getenv("MESSAGE_EXPIRY_GRACE_SECONDS", 6 * 60 * 60))
+
+def stream_id_tuple(entry_id):
+    """Turn a stream entry ID like '1712345678901-3' into a sortable tuple."""
+    milliseconds, _, sequence = entry_id.partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def midnight_after_timestamp(moment):
+    """Unix timestamp for the 12 AM following `moment` (a local datetime)."""
+    midnight = (moment + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return int(midnight.timestamp())
+
+
+def midnight_tomorrow_timestamp():
+    """Unix timestamp for 12 AM the next day (message keys expire there once archived)."""
+    return midnight_after_timestamp(datetime.now())
+
+
+def stream_expiry_timestamp():
+    """Expiry set on append: 12 AM plus the grace period the archive task needs."""
+    return midnight_tomorrow_timestamp() + MESSAGE_EXPIRY_GRACE_SECONDS
+
+
+def _xadd_with_expiry(redis_instance, redis_key, new_messages, maxlen, channel):
+    pipe = redis_instance.pipeline(transaction=True)
+    for new_message in new_messages:
+        pipe.xadd(redis_key, {"message": str(new_message)}, maxlen=maxlen, approximate=True)
+    pipe.expireat(redis_key, stream_expiry_timestamp())
+    if channel:
+        pipe.publish(channel, "xadd")
+    return pipe.execute()[:len(new_messages)]
+
+
+def append_stream_messages(redis_instance, redis_key, new_messages, maxlen=MESSAGE_STREAM_MAXLEN, channel=None):
+    """Append messages to the Redis Stream at `redis_key` and keep it alive past 12 AM until archived.
+
+    All XADDs and the EXPIREAT (plus a PUBLISH to `channel`, if given) go out in a single
+    MULTI, so concurrent workers never overwrite each other's lines. Returns the stream entry IDs.
+    """
+    try:
+        return _xadd_with_expiry(redis_instance, redis_key, new_messages, maxlen, channel)
+    except redis.exceptions.ResponseError as e:
+        if "WRONGTYPE" not in str(e):
+            raise
+
+        # Key still holds the legacy JSON blob from before the stream migration
+        logging.warning(f"Replacing legacy JSON message blob at {redis_key} with a stream.")
+        redis_instance.delete(redis_key)
+        return _xadd_with_expiry(redis_instance, redis_key, new_messages, maxlen, channel)
+
+
+def append_stream_message(redis_instance, redis_key, new_message, maxlen=MESSAGE_STREAM_MAXLEN, channel=None):
+    """Append one message in a single round trip. Returns the stream entry ID."""
+    return append_stream_messages(redis_instance, redis_key, [new_message], maxlen, channel)[0]
+
+
+def read_stream_messages(redis_instance, redis_key, last_id="0-0", block_ms=None, count=None):
+    """Read messages appended after `last_id`.
+
+    Returns `(last_id, messages)`; `last_id` is unchanged when nothing new arrived.
+    Pass `block_ms` to wait for new entries instead of returning immediately.
+    """
+    try:
+        response = redis_instance.xread({redis_key: last_id}, count=count, block=block_ms)
+    except redis.exceptions.ResponseError as e:
+        if "WRONGTYPE" not in str(e):
+            raise
+        logging.warning(f"Key {redis_key} is not a message stream yet.")
+        return last_id, []
+
+    messages = []
+    for _, entries in response or []:
+        for entry_id, fields in entries:
+            messages.append(fields.get("message", ""))
+            last_id = entry_id
+
+    return last_id, messages
+
+
+def read_recent_stream_messages(redis_instance, redis_key, count):
+    """Read the newest `count` messages in append order. Returns `(last_id, messages)`."""
+    try:
+        entries = redis_instance.xrevrange(redis_key, count=count)
+    except redis.exceptions.ResponseError as e:
+        if "WRONGTYPE" not in str(e):
+            raise
+        logging.warning(f"Key {redis_key} is not a message stream yet.")
+        return "0-0", []
+
+    if not entries:
+        return "0-0", []
+
+    entries.reverse()
+    return entries[-1][0], [fields.get("message", "") for _, fields in entries]
+
+
+class BufferedStreamWriter:
+    """Collects a task's progress messages and appends them to a stream in batches.
+
+    Messages are flushed every `max_messages` appends or every `flush_interval_ms`,
+    whichever comes first, and always when the `with` block exits.
+    """
+
+    def __init__(self, redis_instance, redis_key, max_messages=25, flush_interval_ms=500, maxlen=MESSAGE_STREAM_MAXLEN, channel=None):
+        self.redis_instance = redis_instance
+        self.redis_key = redis_key
+        self.channel = channel
+        self.max_messages = max_messages
+        self.flush_interval = flush_interval_ms / 1000
+        self.maxlen = maxlen
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # Keeps batches in append order
+        self._closed = threading.Event()
+        self._flusher = None
+
+    def __enter__(self):
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def append(self, new_message):
+        with self._lock:
+            self._buffer.append(str(new_message))
+            should_flush = len(self._buffer) >= self.max_messages
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered messages with one pipelined XADD batch and EXPIREAT."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+
+            if not batch:
+                return
+
+            try:
+                append_stream_messages(self.redis_instance, self.redis_key, batch, self.maxlen, self.channel)
+                logging.info(f"Redis key {self.redis_key} flushed {len(batch)} messages")
+            except Exception as e:
+                logging.error(f"Error flushing {len(batch)} messages to {self.redis_key}: {e}")
+
+    def close(self):
+        """Stop the periodic flusher and write whatever is still buffered."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+            self._flusher = None
+        self.flush()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
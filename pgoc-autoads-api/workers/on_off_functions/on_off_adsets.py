@@ -1,47 +1,15 @@
-import json
-import redis
-import logging
-from datetime import datetime, timedelta
+from workers.on_off_functions.message_bus import append_message, buffered_messages
 
-# Set up Redis client
-redis_websocket_as = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=15,
-    decode_responses=True  # Ensures Redis returns strings
-)
+# Ad set on/off messages, one stream per user on the message bus
+MESSAGE_DOMAIN = "adsets"
 
 def append_redis_message_adsets(user_id, new_message):
-    """Append a new message inside a dictionary structure while keeping old messages.
-    Ensure Redis key expires at 12 AM the next day.
+    """Append a new message to the user's stream in a single round trip.
+    The stream expires at 12 AM the next day.
     """
-    redis_key = f"{user_id}-key"
+    append_message(MESSAGE_DOMAIN, f"{user_id}-key", new_message)
 
-    try:
-        # Check if Redis is accessible
-        if not redis_websocket_as.ping():
-            logging.error("Redis is not responding.")
-            return
 
-        # Set new message (overwriting any existing message)
-        data_dict = {"message": [str(new_message)]}
-
-        # Store in Redis
-        redis_websocket_as.set(redis_key, json.dumps(data_dict, ensure_ascii=False))
-
-        # **Set Expiry Time to 12 AM Tomorrow**
-        now = datetime.now()
-        midnight_tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        expiry_timestamp = int(midnight_tomorrow.timestamp())  # Convert to Unix timestamp
-
-        redis_websocket_as.expireat(redis_key, expiry_timestamp)  # Set exact expiration
-
-        # Debugging: Verify Redis storage
-        stored_data = redis_websocket_as.get(redis_key)
-        if stored_data is None:
-            logging.error(f"Failed to write {redis_key} to Redis.")
-        else:
-            logging.info(f"Redis key {redis_key} successfully updated: {stored_data} (expires at {midnight_tomorrow})")
-
-    except Exception as e:
-        logging.error(f"Error updating Redis key {redis_key}: {str(e)}")
+def buffered_redis_messages_adsets(user_id, **kwargs):
+    """Buffered writer for a task's messages on the user's ad set stream; use it as a context manager."""
+    return buffered_messages(MESSAGE_DOMAIN, f"{user_id}-key", **kwargs)
@@ -1,33 +1,22 @@
 import json
 import logging
-import re
 import pytz
-import redis
 from celery import shared_task
+from flask import current_app
 from datetime import datetime
 from models.models import db, CampaignOffOnly
+from models.json_queries import any_schedule_matches
+from controllers.campaign_off_only_controller import record_off_only_check
 from workers.campaign_fetcher import fetch_campaign
+from workers.campaign_name_matcher import matcher_for_schedule, normalized_campaign_name
 from workers.on_off_functions.only_add_message import append_redis_message2
-from app import create_app
-from sqlalchemy.orm.attributes import flag_modified
 import requests
 from sqlalchemy.orm import scoped_session, sessionmaker
+from redis_registry import get_redis
 
 
 # Set up Redis clients
-redis_client = redis.StrictRedis(
-    host="redisAds",
-    port=6379,
-    db=3,
-    decode_responses=True
-)
-
-redis_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=11,
-    decode_responses=True
-)
+redis_client = get_redis(3)
 
 manila_tz = pytz.timezone("Asia/Manila")
 
@@ -52,8 +41,8 @@ def fetch_facebook_data(url, access_token):
 def check_campaign_off_only():
     """Check campaigns in CampaignOffOnly and trigger fetch_campaign based on schedule data."""
 
-    app = create_app()
-    with app.app_context():
+    # The task already runs in the worker's app; building a new one each minute re-ran every startup migration
+    with current_app.app_context():
         SessionLocal = scoped_session(sessionmaker(bind=db.engine))
         session = SessionLocal()
 
@@ -61,7 +50,14 @@ def check_campaign_off_only():
         current_time = datetime.now(manila_tz).strftime("%Y-%m-%d %H:%M:%S")
 
         try:
-            campaigns = session.query(CampaignOffOnly).all()
+            # Only load accounts with a running schedule at this minute (GIN index scan on schedule_data)
+            campaigns = session.query(CampaignOffOnly).filter(
+                any_schedule_matches(
+                    CampaignOffOnly.schedule_data,
+                    equals={"time": datetime.now().strftime("%H:%M")},
+                    not_equals={"status": "Paused"},
+                )
+            ).all()
             checked_ad_account_ids = []
 
             for campaign in campaigns:
@@ -108,6 +104,9 @@ def check_campaign_off_only():
 FACEBOOK_API_VERSION = "v22.0"
 FACEBOOK_GRAPH_URL = f"https://graph.facebook.com/{FACEBOOK_API_VERSION}"
 
+# Graph's limit on IDs per multi-ID read
+VERIFY_BATCH_SIZE = 50
+
 def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token):
     """Update the status of a Facebook campaign or ad set using the Graph API."""
     url = f"{FACEBOOK_GRAPH_URL}/{entity_id}"
@@ -127,10 +126,21 @@ def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access
         logging.error(f"Error updating {entity_id} to {new_status}: {e}")
         append_redis_message2(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error updating {entity_id} to {new_status}: {e}")
         return False
-    
-def normalize_text(text):
-    """Replace all non-alphanumeric characters with spaces and normalize capitalization."""
-    return " ".join(re.sub(r"[^a-zA-Z0-9]+", "", text).lower().split())
+
+def fetch_statuses(entity_ids, access_token):
+    """Current status per entity ID, read with one `?ids=` request per VERIFY_BATCH_SIZE IDs.
+    IDs missing from a response (or from a failed batch) are left out.
+    """
+    statuses = {}
+    for start in range(0, len(entity_ids), VERIFY_BATCH_SIZE):
+        batch = entity_ids[start:start + VERIFY_BATCH_SIZE]
+        response_data = fetch_facebook_data(f"{FACEBOOK_GRAPH_URL}/?ids={','.join(batch)}&fields=status", access_token)
+        if "error" in response_data:
+            logging.error(f"Error verifying statuses for {batch}: {response_data['error'].get('message', 'Unknown error')}")
+            continue
+
+        statuses.update({entity_id: data["status"] for entity_id, data in response_data.items() if "status" in data})
+    return statuses
 
 @shared_task
 def fetch_campaign_only(user_id, ad_account_id, access_token, matched_schedule):
@@ -151,7 +161,7 @@ def fetch_campaign_only(user_id, ad_account_id, access_token, matched_schedule):
         return f"Fetch already in progress for {ad_account_id}, queued process_scheduled_campaigns_only"
 
     try:
-        scheduled_campaign_names = {normalize_text(name) for name in matched_schedule.get("campaign_name", [])}
+        name_matcher = matcher_for_schedule(matched_schedule)
         on_off_value = matched_schedule.get("on_off", "").upper()  # Ensure it is a string
         target_status = "ACTIVE" if on_off_value == "ON" else "PAUSED"
 
@@ -172,55 +182,43 @@ def fetch_campaign_only(user_id, ad_account_id, access_token, matched_schedule):
                     "UPDATED": False,
                 }
                 for campaign in response_data.get("data", [])
-                if normalize_text(campaign["name"]) in scheduled_campaign_names
+                if name_matcher.matches(normalized_campaign_name(campaign["id"], campaign["name"]))
             }
 
             campaigns_data.update(campaign_batch)
             url = response_data.get("paging", {}).get("next")
 
-        with db.session.begin():
-            campaign_entry = CampaignOffOnly.query.filter_by(ad_account_id=ad_account_id).first()
-            if campaign_entry:
-                existing_campaigns = campaign_entry.campaigns_data or {}
-                updated_campaigns = {**existing_campaigns, **campaigns_data}
-                campaign_entry.campaigns_data = updated_campaigns
-                campaign_entry.last_time_checked = datetime.now()
-                campaign_entry.last_check_status = "Ongoing"
-                campaign_entry.last_check_message = f"Campaigns fetched but not updated yet."
-                flag_modified(campaign_entry, "campaigns_data")
-            else:
-                campaign_entry = CampaignOffOnly(
-                    ad_account_id=ad_account_id,
-                    campaigns_data=campaigns_data,
-                    last_time_checked=datetime.now(),
-                    last_check_status="Ongoing",
-                    last_check_message="Campaigns fetched but not updated yet.",
-                )
-                db.session.add(campaign_entry)
-            db.session.commit()
+        record_off_only_check(
+            ad_account_id, user_id, access_token, "Ongoing", "Campaigns fetched but not updated yet.",
+            campaigns_data=campaigns_data,
+        )
 
         append_redis_message2(
             user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Filtered campaigns saved."
         )
 
+        # Write every status first, then confirm them with batched multi-ID reads
+        write_results = {}
+        for campaign_id, campaign_info in campaigns_data.items():
+            if campaign_info["CURRENT_STATUS"] != target_status:
+                write_results[campaign_id] = update_facebook_status(user_id, ad_account_id, campaign_id, target_status, access_token)
+
+        verified_statuses = fetch_statuses(
+            [campaign_id for campaign_id, success in write_results.items() if success], access_token
+        )
+
         updated_campaigns = {}
         for campaign_id, campaign_info in campaigns_data.items():
             campaign_name = campaign_info["NAME"]
             current_status = campaign_info["CURRENT_STATUS"]
 
-            if current_status == target_status:
+            if campaign_id not in write_results:
                 status_message = f"Campaign {campaign_name}: {campaign_id} REMAINS {target_status}."
                 success = "REMAINS"
                 new_status = current_status  # ✅ Ensure new_status is set
             else:
-                success = update_facebook_status(user_id, ad_account_id, campaign_id, target_status, access_token)
-
-                if success:
-                    new_status = fetch_facebook_data(f"{FACEBOOK_GRAPH_URL}/{campaign_id}?fields=status", access_token).get(
-                        "status", target_status
-                    )
-                else:
-                    new_status = current_status
+                success = write_results[campaign_id]
+                new_status = verified_statuses.get(campaign_id, target_status) if success else current_status
 
                 status_message = (
                     f"Campaign {campaign_name}: {campaign_id} changed to {target_status}."
@@ -238,15 +236,12 @@ def fetch_campaign_only(user_id, ad_account_id, access_token, matched_schedule):
                 "STATUS_MESSAGE": status_message,
             }
 
-        with db.session.begin():
-            campaign_entry = CampaignOffOnly.query.filter_by(ad_account_id=ad_account_id).first()
-            if campaign_entry:
-                campaign_entry.campaigns_data = updated_campaigns
-                campaign_entry.last_time_checked = datetime.now()
-                campaign_entry.last_check_status = "Success"
-                campaign_entry.last_check_message = f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaigns updated."
-                flag_modified(campaign_entry, "campaigns_data")
-                db.session.commit()
+        # One write for every status outcome of this run
+        record_off_only_check(
+            ad_account_id, user_id, access_token, "Success",
+            f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaigns updated.",
+            campaigns_data=updated_campaigns, merge=False,
+        )
 
         append_redis_message2(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaign updates saved.")
         return f"Fetched and updated selected campaigns for {ad_account_id}."
@@ -256,23 +251,10 @@ def fetch_campaign_only(user_id, ad_account_id, access_token, matched_schedule):
         logging.error(error_message)
         append_redis_message2(user_id, ad_account_id, f"ERROR: {error_message}")
 
-        with db.session.begin():
-            campaign_entry = CampaignOffOnly.query.filter_by(ad_account_id=ad_account_id).first()
-            if campaign_entry:
-                campaign_entry.last_time_checked = datetime.now()
-                campaign_entry.last_check_status = "Failed"
-                campaign_entry.last_check_message = error_message
-                db.session.commit()
-            else:
-                new_entry = CampaignOffOnly(
-                    ad_account_id=ad_account_id,
-                    campaigns_data={},
-                    last_time_checked=datetime.now(),
-                    last_check_status="Failed",
-                    last_check_message=error_message,
-                )
-                db.session.add(new_entry)
-                db.session.commit()
+        try:
+            record_off_only_check(ad_account_id, user_id, access_token, "Failed", error_message)
+        except Exception as db_error:
+            logging.error(f"Failed to record check failure for {ad_account_id}: {db_error}")
 
         return error_message
 
@@ -0,0 +1,137 @@
+import numpy as np
+
+# Threshold rules evaluated over a whole account at once: every entity's metrics sit in NumPy
+# columns, so a rule is a handful of vectorized comparisons instead of a Python loop per entity.
+
+OPERATORS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+METRICS = ("spend", "checkouts", "cpp")
+
+
+def totals_columns(ids, totals):
+    """(spend, checkouts) columns for `ids` from {entity_id: (spend, checkouts)}; None totals leave both unknown."""
+    if totals is None:
+        return None, None
+    # The warehouse has no row for entities without delivery, which is zero spend rather than unknown
+    pairs = [totals.get(entity_id, (0, 0)) for entity_id in ids]
+    return [spend for spend, _ in pairs], [checkouts for _, checkouts in pairs]
+
+
+def float_column(values, size):
+    """Float64 column; unknown metrics are NaN so no threshold ever matches them."""
+    if values is None:
+        return np.full(size, np.nan)
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+
+class EntitySnapshot:
+    """Columnar view of an account's campaigns or ad sets."""
+
+    def __init__(self, ids, names, levels, statuses, spend=None, checkouts=None, cpp=None):
+        size = len(ids)
+        self.ids = np.array(ids, dtype=object)
+        self.names = np.array(names, dtype=object)
+        self.levels = np.array(levels, dtype=object)
+        self.statuses = np.array(statuses, dtype=object)
+        self.spend = float_column(spend, size)
+        self.checkouts = float_column(checkouts, size)
+        self.cpp = float_column(cpp, size)
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_entities(cls, entities, totals=None):
+        """Snapshot of CampaignEntity rows; `totals` is {entity_id: (spend, checkouts)} or None if unknown."""
+        ids = [entity.entity_id for entity in entities]
+        spend, checkouts = totals_columns(ids, totals)
+        return cls(
+            ids=ids,
+            names=[entity.name for entity in entities],
+            levels=[entity.level for entity in entities],
+            statuses=[entity.status for entity in entities],
+            spend=spend,
+            checkouts=checkouts,
+            cpp=[entity.cpp for entity in entities],
+        )
+
+    @classmethod
+    def from_campaigns_data(cls, campaigns_data, level, totals=None):
+        """Snapshot of the nested {campaign_id: {..., "ADSETS": {...}}} dicts built by the ad set workers."""
+        if level == "campaign":
+            rows = [
+                (campaign_id, info.get("campaign_name", "Unknown"), info.get("STATUS", ""), info.get("CPP", 0))
+                for campaign_id, info in campaigns_data.items()
+            ]
+        else:
+            rows = [
+                (adset_id, adset.get("NAME", "Unknown"), adset.get("STATUS", ""), adset.get("CPP", 0))
+                for info in campaigns_data.values()
+                for adset_id, adset in info.get("ADSETS", {}).items()
+            ]
+
+        ids, names, statuses, cpp = zip(*rows) if rows else ((), (), (), ())
+        spend, checkouts = totals_columns(ids, totals)
+        return cls(
+            ids=ids, names=names, levels=[level] * len(ids), statuses=statuses,
+            spend=spend, checkouts=checkouts, cpp=cpp,
+        )
+
+
+class ChangeSet:
+    """Result of a rule: which entities matched, and which of those need a status change."""
+
+    def __init__(self, snapshot, target_status, matched):
+        self.snapshot = snapshot
+        self.target_status = target_status
+        self.matched = matched
+        self.changes = matched & (snapshot.statuses != target_status)
+
+    def changed_indices(self):
+        return np.flatnonzero(self.changes)
+
+    def __len__(self):
+        return int(self.changes.sum())
+
+
+class Rule:
+    """
+    Move entities to `target_status` when every condition holds.
+
+    Args:
+        conditions (list[tuple] | None): (metric, operator, threshold) triples ANDed together;
+            None never matches.
+        target_status (str): "ACTIVE" or "PAUSED".
+    """
+
+    def __init__(self, conditions, target_status):
+        for metric, operator, _ in conditions or []:
+            if metric not in METRICS or operator not in OPERATORS:
+                raise ValueError(f"Unsupported condition: {metric} {operator}")
+        self.conditions = conditions
+        self.target_status = target_status
+
+    def evaluate(self, snapshot):
+        if self.conditions is None:
+            return ChangeSet(snapshot, self.target_status, np.zeros(len(snapshot), dtype=bool))
+
+        matched = np.ones(len(snapshot), dtype=bool)
+        for metric, operator, threshold in self.conditions:
+            matched &= OPERATORS[operator](getattr(snapshot, metric), threshold)
+        return ChangeSet(snapshot, self.target_status, matched)
+
+
+def cpp_rule(on_off, cpp_metric):
+    """The scheduler's rule: turn ON below the CPP threshold, turn OFF at or above it."""
+    if on_off == "ON":
+        return Rule([("cpp", "<", cpp_metric)], "ACTIVE")
+    if on_off == "OFF":
+        return Rule([("cpp", ">=", cpp_metric)], "PAUSED")
+    return Rule(None, "PAUSED")
@@ -1,27 +1,16 @@
 import logging
-import redis
 import pytz
 from celery import shared_task
 from datetime import datetime
 from models.models import db, CampaignsScheduled
+from models.json_queries import any_schedule_matches
 from workers.campaign_fetcher import fetch_campaign
 from workers.on_off_functions.account_message import append_redis_message
 from sqlalchemy.orm import scoped_session, sessionmaker
+from redis_registry import get_redis
 
 # Set up Redis clients
-redis_client = redis.StrictRedis(
-    host="redisAds",
-    port=6379,
-    db=2,
-    decode_responses=True
-)
-
-redis_websocket = redis.Redis(
-    host="redisAds",
-    port=6379,
-    db=10,
-    decode_responses=True
-)
+redis_client = get_redis(2)
 
 manila_tz = pytz.timezone("Asia/Manila")
 
@@ -36,8 +25,14 @@ def check_scheduled_adaccounts():
     session = SessionLocal()
 
     try:
-        # Fetch all campaigns with schedules
-        campaigns = session.query(CampaignsScheduled).all()
+        # Only load accounts with a running schedule at this minute (GIN index scan on schedule_data)
+        campaigns = session.query(CampaignsScheduled).filter(
+            any_schedule_matches(
+                CampaignsScheduled.schedule_data,
+                equals={"time": datetime.now().strftime("%H:%M")},
+                not_equals={"status": "Paused"},
+            )
+        ).all()
         checked_ad_account_ids = []
 
         for campaign in campaigns:
@@ -61,9 +56,10 @@ def check_scheduled_adaccounts():
 
             if matched_schedules:
                 try:
-                    for schedule in matched_schedules:
-                        fetch_campaign.apply_async(args=[user_id, ad_account_id, access_token, schedule])
+                    # One planned fetch covers every schedule that fired for this account
+                    fetch_campaign.apply_async(args=[user_id, ad_account_id, access_token, matched_schedules])
 
+                    for schedule in matched_schedules:
                         success_message = f"[{current_time}] Triggered fetch_campaign for ad_account_id: {ad_account_id} with schedule: {schedule}"
                         logging.info(success_message)
                         append_redis_message(user_id, ad_account_id, success_message)
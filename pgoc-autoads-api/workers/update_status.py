@@ -1,13 +1,16 @@
 import logging
+import numpy as np
 import requests
 from celery import shared_task
-from models.models import db, CampaignsScheduled
+from models.models import db, CampaignsScheduled, CampaignEntity
 from datetime import datetime
-from sqlalchemy.orm.attributes import flag_modified
 from pytz import timezone
+from controllers.campaign_entity_controller import update_campaign_entity_status
+from controllers.insights_warehouse_controller import last_30d_range, warehouse_spend_checkouts
+from workers.rule_engine import EntitySnapshot, cpp_rule
 
-from workers.on_off_functions.account_message import append_redis_message
-from workers.on_off_functions.on_off_adsets import append_redis_message_adsets
+from workers.on_off_functions.account_message import append_redis_message, buffered_redis_messages
+from workers.on_off_functions.on_off_adsets import append_redis_message_adsets, buffered_redis_messages_adsets
 
 # Manila timezone
 manila_tz = timezone("Asia/Manila")
@@ -16,8 +19,16 @@ manila_tz = timezone("Asia/Manila")
 FACEBOOK_API_VERSION = "v22.0"
 FACEBOOK_GRAPH_URL = f"https://graph.facebook.com/{FACEBOOK_API_VERSION}"
 
-def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token):
-    """Update the status of a Facebook campaign or ad set using the Graph API."""
+def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token, message_writer=None):
+    """Update the status of a Facebook campaign or ad set using the Graph API.
+    Progress messages go to `message_writer` when the caller buffers them.
+    """
+    def append_message(message):
+        if message_writer is not None:
+            message_writer.append(message)
+        else:
+            append_redis_message(user_id, ad_account_id, message)
+
     url = f"{FACEBOOK_GRAPH_URL}/{entity_id}"
     payload = {"status": new_status}
     headers = {
@@ -29,11 +40,11 @@ def update_facebook_status(user_id, ad_account_id, entity_id, new_status, access
         response = requests.post(url, json=payload, headers=headers)
         response.raise_for_status()
         logging.info(f"Successfully updated {entity_id} to {new_status}")
-        append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Successfully updated {entity_id} to {new_status}")
+        append_message(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Successfully updated {entity_id} to {new_status}")
         return True
     except requests.exceptions.RequestException as e:
         logging.error(f"Error updating {entity_id} to {new_status}: {e}")
-        append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error updating {entity_id} to {new_status}: {e}")
+        append_message(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error updating {entity_id} to {new_status}: {e}")
         return False
 
 @shared_task
@@ -50,102 +61,72 @@ def process_scheduled_campaigns(user_id, ad_account_id, access_token, schedule_d
         cpp_metric = int(schedule_data.get("cpp_metric"))  # Ensure conversion to int
         on_off = schedule_data["on_off"]
 
-        # Fetch campaign data from the database
-        campaign_entry = CampaignsScheduled.query.filter_by(ad_account_id=ad_account_id).first()
-        if not campaign_entry:
-            logging.warning(f"No campaign data found for Ad Account {ad_account_id}")
-            campaign_entry.last_time_checked = datetime.now(manila_tz)
-            campaign_entry.last_check_status = "Success"
-            campaign_entry.last_check_message = (
-                f"[{datetime.now(manila_tz).strftime('%Y-%m-%d %H:%M:%S')}] "
-                f"No campaign data found for Ad Account {ad_account_id}"
-            )
-            return f"No campaign data found for Ad Account {ad_account_id}"
-
-        # Select the correct dataset based on campaign type
-        campaign_data = (
-            campaign_entry.regular_campaign_data if campaign_type == "REGULAR"
-            else campaign_entry.test_campaign_data
-        )
-
-        if not campaign_data:
-            logging.warning(f"No {campaign_type} campaigns available for processing.")
-            append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] No {campaign_type} campaigns available for processing.")
-            return f"No {campaign_type} campaigns available for processing."
-
-        update_success = False  # Track if any updates are successful
-
-        if what_to_watch == "Campaigns":
-            for campaign_id, campaign_info in campaign_data.items():
-                current_status = campaign_info["STATUS"]
-                campaign_cpp = campaign_info["CPP"]
-                campaign_name = campaign_info["campaign_name"]
-
-                # Determine the new status based on the CPP metric
-                if on_off == "ON" and campaign_cpp < cpp_metric:
-                    new_status = "ACTIVE"
-                elif on_off == "OFF" and campaign_cpp >= cpp_metric:
-                    new_status = "PAUSED"
-                else:
-                    logging.info(f"Campaign {campaign_id} remains {current_status}")
-                    append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaign {campaign_name} ID: {campaign_id}  Remains {current_status}")
-                    continue  # Skip if no change is needed
-
-                if current_status != new_status:
-                    success = update_facebook_status(user_id, ad_account_id, campaign_id, new_status, access_token)
-                    if success:
-                        campaign_info["STATUS"] = new_status
-                        update_success = True
-                        logging.info(f"Updated Campaign {campaign_id} -> {new_status}")
-                        append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Updated Campaign {campaign_name} ID: {campaign_id}  -> {new_status}")
-
-        elif what_to_watch == "AdSets":
-            for campaign_id, campaign_info in campaign_data.items():
-                adsets = campaign_info.get("ADSETS", {})  # Get AdSets dictionary
-
-                for adset_id, adset_info in adsets.items():
-                    current_status = adset_info["STATUS"]
-                    adset_cpp = adset_info["CPP"]
-                    adset_name = adset_info["NAME"]
-
-                    # Determine the new status based on the CPP metric
-                    if on_off == "ON" and adset_cpp < cpp_metric:
-                        new_status = "ACTIVE"
-                    elif on_off == "OFF" and adset_cpp >= cpp_metric:
-                        new_status = "PAUSED"
-                    else:
-                        logging.info(f"AdSet {adset_id} remains {current_status}")
-                        append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Adset {adset_name} ID: {adset_id}  Remains {current_status}")
-                        continue  
-
-                    if current_status != new_status:
-                        success = update_facebook_status(user_id, ad_account_id, adset_id, new_status, access_token)
-                        if success:
-                            adset_info["STATUS"] = new_status
-                            update_success = True
-                            logging.info(f"Updated AdSet {adset_id} -> {new_status}")
-                            append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Updated {adset_name} ID: {adset_id}  -> {new_status}")
-
-        if update_success:
-            if campaign_type == "REGULAR":
-                campaign_entry.regular_campaign_data = campaign_data
-                flag_modified(campaign_entry, "regular_campaign_data")
-            else:
-                campaign_entry.test_campaign_data = campaign_data
-                flag_modified(campaign_entry, "test_campaign_data")
-
-            campaign_entry.last_time_checked = datetime.now(manila_tz)
-            campaign_entry.last_check_status = "Success"
-            campaign_entry.last_check_message = (
-                f"[{datetime.now(manila_tz).strftime('%Y-%m-%d %H:%M:%S')}] "
-                f"Successfully updated {what_to_watch} statuses."
-            )
-
-            db.session.commit()
-            logging.info(f"Successfully saved updated {what_to_watch} statuses in DB.")
-            append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Successfully updated {what_to_watch} statuses.")
-
-        return f"Processed scheduled {what_to_watch} for Ad Account {ad_account_id}"
+        with buffered_redis_messages(user_id, ad_account_id) as messages:
+            # Fetch campaign data from the database
+            campaign_entry = CampaignsScheduled.query.filter_by(ad_account_id=ad_account_id).first()
+            if not campaign_entry:
+                logging.warning(f"No campaign data found for Ad Account {ad_account_id}")
+                campaign_entry.last_time_checked = datetime.now(manila_tz)
+                campaign_entry.last_check_status = "Success"
+                campaign_entry.last_check_message = (
+                    f"[{datetime.now(manila_tz).strftime('%Y-%m-%d %H:%M:%S')}] "
+                    f"No campaign data found for Ad Account {ad_account_id}"
+                )
+                return f"No campaign data found for Ad Account {ad_account_id}"
+
+            # Load only the rows for this campaign type and level
+            level = "campaign" if what_to_watch == "Campaigns" else "adset"
+            entities = CampaignEntity.query.filter_by(
+                ad_account_id=ad_account_id,
+                campaign_type="REGULAR" if campaign_type == "REGULAR" else "TEST",
+                level=level,
+            ).all()
+
+            if not entities:
+                logging.warning(f"No {campaign_type} campaigns available for processing.")
+                messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] No {campaign_type} campaigns available for processing.")
+                return f"No {campaign_type} campaigns available for processing."
+
+            update_success = False  # Track if any updates are successful
+
+            # Evaluate the CPP rule over every entity in one vectorized pass; spend and checkouts
+            # come from the insights warehouse over the same last_30d window as the stored CPP
+            totals = warehouse_spend_checkouts(ad_account_id, level, *last_30d_range())
+            snapshot = EntitySnapshot.from_entities(entities, totals)
+            change_set = cpp_rule(on_off, cpp_metric).evaluate(snapshot)
+            new_status = change_set.target_status
+            remains_label, updated_label = ("Campaign", "Campaign ") if what_to_watch == "Campaigns" else ("Adset", "")
+
+            # Entities that matched but already have the target status need no message
+            for index in np.flatnonzero(~change_set.matched | change_set.changes):
+                entity_id = snapshot.ids[index]
+                entity_name = snapshot.names[index]
+
+                if not change_set.changes[index]:
+                    logging.info(f"{remains_label} {entity_id} remains {snapshot.statuses[index]}")
+                    messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {remains_label} {entity_name} ID: {entity_id}  Remains {snapshot.statuses[index]}")
+                    continue
+
+                success = update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token, messages)
+                if success:
+                    update_campaign_entity_status(ad_account_id, entity_id, new_status)
+                    update_success = True
+                    logging.info(f"Updated {remains_label} {entity_id} -> {new_status}")
+                    messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Updated {updated_label}{entity_name} ID: {entity_id}  -> {new_status}")
+
+            if update_success:
+                campaign_entry.last_time_checked = datetime.now(manila_tz)
+                campaign_entry.last_check_status = "Success"
+                campaign_entry.last_check_message = (
+                    f"[{datetime.now(manila_tz).strftime('%Y-%m-%d %H:%M:%S')}] "
+                    f"Successfully updated {what_to_watch} statuses."
+                )
+
+                db.session.commit()
+                logging.info(f"Successfully saved updated {what_to_watch} statuses in DB.")
+                messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Successfully updated {what_to_watch} statuses.")
+
+            return f"Processed scheduled {what_to_watch} for Ad Account {ad_account_id}"
 
     except Exception as e:
         logging.error(f"Error processing scheduled {what_to_watch} for Ad Account {ad_account_id}: {e}")
@@ -158,6 +139,15 @@ def process_scheduled_campaigns(user_id, ad_account_id, access_token, schedule_d
         append_redis_message(user_id, ad_account_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Error processing scheduled {what_to_watch} for Ad Account {ad_account_id}: {e}")
         return f"Error processing scheduled {what_to_watch} for Ad Account {ad_account_id}: {e}"
     
+def schedule_totals(ad_account_id, level, schedule_data):
+    """Warehouse spend and checkouts over the schedule's CPP date range, or None when unavailable."""
+    try:
+        since = datetime.strptime(schedule_data.get("cpp_date_start", ""), "%Y-%m-%d").date()
+        until = datetime.strptime(schedule_data.get("cpp_date_end", ""), "%Y-%m-%d").date()
+    except ValueError:
+        return None
+    return warehouse_spend_checkouts(ad_account_id, level, since, until)
+
 @shared_task
 def process_adsets(user_id, ad_account_id, access_token, schedule_data, campaigns_data):
     try:
@@ -174,45 +164,36 @@ def process_adsets(user_id, ad_account_id, access_token, schedule_data, campaign
         # Determine new status
         new_status = "ACTIVE" if on_off == "ON" else "PAUSED"
 
-        if not campaigns_data:
-            logging.warning(f"No campaigns data received for processing in {campaign_type}")
-            return f"No campaigns found for {campaign_type} in Ad Account {ad_account_id}"
+        with buffered_redis_messages_adsets(user_id) as messages:
+            if not campaigns_data:
+                logging.warning(f"No campaigns data received for processing in {campaign_type}")
+                return f"No campaigns found for {campaign_type} in Ad Account {ad_account_id}"
 
-        for campaign_id, campaign_info in campaigns_data.items():
-            campaign_name = campaign_info.get("campaign_name", "Unknown")
-            campaign_cpp = campaign_info.get("CPP", 0)
-            campaign_status = campaign_info.get("STATUS", "")
-
-            if what_to_watch == "campaigns":
-                # Check if campaign meets CPP condition
-                if (on_off == "ON" and campaign_cpp < cpp_metric) or (on_off == "OFF" and campaign_cpp >= cpp_metric):
-                    if campaign_status != new_status:
-                        success = update_facebook_status(user_id, ad_account_id, campaign_id, new_status, access_token)
+            if what_to_watch not in ("campaigns", "adsets"):
+                logging.warning(f"Unknown what_to_watch: {what_to_watch}")
+            else:
+                label = "Campaign" if what_to_watch == "campaigns" else "AdSet"
+                level = "campaign" if what_to_watch == "campaigns" else "adset"
+                snapshot = EntitySnapshot.from_campaigns_data(
+                    campaigns_data, level, schedule_totals(ad_account_id, level, schedule_data)
+                )
+                change_set = cpp_rule(on_off, cpp_metric).evaluate(snapshot)
+
+                for index in np.flatnonzero(change_set.matched):
+                    entity_id = snapshot.ids[index]
+                    entity_name = snapshot.names[index]
+
+                    if change_set.changes[index]:
+                        success = update_facebook_status(user_id, ad_account_id, entity_id, new_status, access_token, messages)
                         if success:
-                            logging.info(f"Updated Campaign {campaign_name} ({campaign_id}) to {new_status}")
-                            append_redis_message_adsets(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Updated Campaign {campaign_name} ({campaign_id}) to {new_status}")
+                            logging.info(f"Updated {label} {entity_name} ({entity_id}) to {new_status}")
+                            messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Updated {label} {entity_name} ({entity_id}) to {new_status}")
                     else:
-                        logging.info(f"Campaign {campaign_name} ({campaign_id}) already in {new_status} status")
-                        append_redis_message_adsets(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Campaign {campaign_name} ({campaign_id}) already in {new_status} status")
-
-            elif what_to_watch == "adsets":
-                for adset_id, adset_info in campaign_info.get("ADSETS", {}).items():
-                    adset_name = adset_info.get("NAME", "Unknown")
-                    adset_cpp = adset_info.get("CPP", 0)
-                    adset_status = adset_info.get("STATUS", "")
-
-                    if (on_off == "ON" and adset_cpp < cpp_metric) or (on_off == "OFF" and adset_cpp >= cpp_metric):
-                        if adset_status != new_status:
-                            success = update_facebook_status(user_id, ad_account_id, adset_id, new_status, access_token)
-                            if success:
-                                logging.info(f"Updated AdSet {adset_name} ({adset_id}) to {new_status}")
-                                append_redis_message_adsets(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Updated AdSet {adset_name} ({adset_id}) to {new_status}")
-                        else:
-                            logging.info(f"AdSet {adset_name} ({adset_id}) already in {new_status} status")
-                            append_redis_message_adsets(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] AdSet {adset_name} ({adset_id}) already in {new_status} status")
+                        logging.info(f"{label} {entity_name} ({entity_id}) already in {new_status} status")
+                        messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {label} {entity_name} ({entity_id}) already in {new_status} status")
         
-        append_redis_message_adsets(user_id, f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Processing {ad_account_id} Completed")
-        return f"Processing {ad_account_id} Completed"
+            messages.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Processing {ad_account_id} Completed")
+            return f"Processing {ad_account_id} Completed"
 
     except Exception as e:
         logging.error(f"Error processing schedule: {e}")